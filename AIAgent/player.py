@@ -6,169 +6,259 @@ from skeleton.states import GameState, TerminalState, RoundState
 from skeleton.states import NUM_ROUNDS, STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from skeleton.bot import Bot
 from skeleton.runner import parse_args, run_bot
+from skeleton.equity import equity
+from skeleton.cache import LRUCache
+
+import os
+import random
+import numpy as np
+
+FEATURE_NAMES = ["hand_strength", "pot_odds", "effective_stack", "opp_aggression", "position", "street", "bluff_potential", "bias"]
+NUM_FEATURES = len(FEATURE_NAMES)
+# every action the agent considers falls in one of these kinds, and each kind has its own weight vector
+FOLD, CALL, CHECK, RAISE_SMALL, RAISE_MEDIUM, RAISE_LARGE = range(6)
+NUM_KINDS = 6
+RAISE_FRACTIONS = ((RAISE_SMALL, .1), (RAISE_MEDIUM, .5), (RAISE_LARGE, .8))
+# written by train_aiagent.py; bump the version whenever the meaning of the weights changes
+WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weights.npz")
+WEIGHTS_VERSION = 1
+
+
+def loadWeights(path=WEIGHTS_PATH):
+    '''
+    Returns the trained weights in a weights file, or None if there is no file for
+    this version and these features.
+    '''
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if int(data["version"]) != WEIGHTS_VERSION or data["features"].tolist() != FEATURE_NAMES:
+            return None
+        return data["weights"]
+
+
+def saveWeights(weights, path=WEIGHTS_PATH, **info):
+    '''
+    Writes weights to a weights file, with any extra arrays in info, replacing it atomically.
+    '''
+    with open(path + ".tmp", "wb") as file:
+        np.savez(file, version=WEIGHTS_VERSION, features=np.array(FEATURE_NAMES), weights=np.asarray(weights), **info)
+    os.replace(path + ".tmp", path)
+
+
+class ReplayBuffer():
+    '''
+    A fixed-size ring buffer of transitions, stored in arrays allocated up front.
+    '''
+
+    def __init__(self, capacity=50000):
+        self.capacity = capacity
+        self.features = np.zeros((capacity, NUM_FEATURES), dtype=np.float32)
+        self.kinds = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.nextFeatures = np.zeros((capacity, NUM_FEATURES), dtype=np.float32)
+        self.nextKinds = np.zeros((capacity, NUM_KINDS), dtype=bool)  # the kinds legal in the next state
+        self.done = np.zeros(capacity, dtype=bool)
+        self.size = 0
+        self.position = 0
+        self.added = 0
+
+    def add(self, features, kind, reward, nextFeatures, nextKinds, done):
+        i = self.position
+        self.features[i] = features
+        self.kinds[i] = kind
+        self.rewards[i] = reward
+        self.nextFeatures[i] = nextFeatures
+        self.nextKinds[i] = nextKinds
+        self.done[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.added += 1
+
+    def sample(self, batchSize, rng):
+        return rng.integers(0, self.size, batchSize)
+
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.features, self.kinds, self.rewards, self.nextFeatures,
+                                              self.nextKinds, self.done))
 
-import random,eval7
 
 class QLearningAgent():
-    def __init__(self,epsilon=0.05,discount=0.80,alpha=0.2,numTraining=20,weights=False):
+    '''
+    Approximate Q-learning with a linear function of state-action features.
+
+    Q(s, a) is the dot product of the state's features with the weight vector of
+    the action's kind, so the weights are a (NUM_KINDS, NUM_FEATURES) array. Every
+    transition goes into a ReplayBuffer, and each update is a TD step on a random
+    mini-batch of stored transitions. Rewards are in units of the starting stack.
+    '''
+
+    def __init__(self,epsilon=0.05,discount=0.80,alpha=0.05,numTraining=20,weights=None,capacity=50000,batchSize=32,seed=None):
         self.epsilon=epsilon
         self.discount=discount
         self.alpha=alpha
-        #self.reader = 
         self.numTraining=numTraining
-        #self.values = util.Counter()
-        if(weights==False):
-            self.weights = {}
+        self.batchSize=batchSize
+        if weights is None:
+            self.weights = np.zeros((NUM_KINDS, NUM_FEATURES))
         else:
-           self.weights=weights
+            self.weights = np.array(weights, dtype=np.float64).reshape(NUM_KINDS, NUM_FEATURES)
+        self.replay = ReplayBuffer(capacity)
+        self.rng = np.random.default_rng(seed)
+        # features of the last few decision points, keyed by the identity of the state tuple
+        self.featureCache = LRUCache(maxsize=8)
 
     def getWeights(self):
         return self.weights
 
+    def isTerminal(self,state):
+        return state==False or state[1]==False
+
     def getLegalActions(self,state):
-        if(state==False or state[1]==False):
-           return[CheckAction(),FoldAction(),CallAction()]
-        thisState=list(state)
-        game_state = thisState[0]
-        round_state = thisState[1]
-        active = thisState[2]
+        return [action for _, action in self.getLegalKinds(state)]
+
+    def getLegalKinds(self,state):
+        '''
+        Returns the actions the agent considers in a state as [(kind, action)].
+        '''
+        if self.isTerminal(state):
+            return [(CHECK, CheckAction()), (FOLD, FoldAction()), (CALL, CallAction())]
+        game_state, round_state, active = state
         legal_actions = round_state.legal_actions()
         myActions=[]
-        my_pip = round_state.pips[active]
         if RaiseAction in legal_actions:
             min_raise, max_raise = round_state.raise_bounds()  # the smallest and largest numbers of chips for a legal bet/raise
-            min_cost = min_raise - my_pip  # the cost of a minimum bet/raise
-            max_cost = max_raise - my_pip  # the cost of a maximum bet/raise
-            myActions+=[RaiseAction(min_raise+(max_raise-min_raise)*.1)]
-            myActions+=[RaiseAction(min_raise+(max_raise-min_raise)*.5)]
-            myActions+=[RaiseAction(min_raise+(max_raise-min_raise)*.8)]
+            for kind, fraction in RAISE_FRACTIONS:
+                myActions+=[(kind, RaiseAction(min_raise+(max_raise-min_raise)*fraction))]
         if CheckAction in legal_actions:  # check-call
-            myActions+=[CheckAction()]
+            myActions+=[(CHECK, CheckAction())]
         if random.random() < 0.25:
-            myActions+=[FoldAction()]
-        myActions+=[CallAction()]
+            myActions+=[(FOLD, FoldAction())]
+        myActions+=[(CALL, CallAction())]
         return myActions
 
-    def evaluateHandStrength(self, my_cards, board_cards, num_simulations=10):
+    def evaluateHandStrength(self, my_cards, board_cards, num_simulations=200):
         """ 
-        Monte Carlo simulation to estimate hand strength using eval7.
+        Estimates hand strength with the skeleton's shared equity engine.
         """
-        deck = [eval7.Card(str(c)) for c in eval7.Deck() if str(c) not in my_cards + board_cards]
-        my_hand = [eval7.Card(str(c)) for c in my_cards]
-        board = [eval7.Card(str(c)) for c in board_cards]
+        return equity(my_cards, board_cards, samples=num_simulations)
 
-        wins = 0
-        for _ in range(num_simulations):
-            random.shuffle(deck)
-            opp_hand = deck[:2]
-            remaining_board = deck[2: 7 - len(board)]  # Fill the board to 5 cards
-
-            full_board = board + remaining_board
-            my_strength = eval7.evaluate(my_hand + full_board)
-            opp_strength = eval7.evaluate(opp_hand + full_board)
-
-            if my_strength > opp_strength:
-                wins += 1
+    def getFeatures(self,state):
+        # a decision asks for the same state's features once per action and twice more per
+        # action for its value; the cache keeps a reference to the state, so its id can't be reused
+        if self.isTerminal(state):
+            return np.zeros(NUM_FEATURES)
+        return self.featureCache.get(id(state), lambda: (state, self.computeFeatures(state)))[1]
 
-        return wins / num_simulations  # Returns estimated win probability
+    def computeFeatures(self,state):
+        '''
+        Returns the state's features as an array in FEATURE_NAMES order.
+        '''
+        game_state, round_state, active = state
+        features = np.zeros(NUM_FEATURES)
 
-    def getFeatures(self,state):
-        features = {}
-        if(state==False or state[1]==False):
-           features["hand_strength"] =0
-           features["pot_odds"] =0
-           features["effective_stack"] =0
-           features["opp_aggression"] =0
-           features["position"] =0
-           features["street"] =0
-           features["bluff_potential"] =0
-           return features
-        thisState=list(state)
-        game_state = thisState[0]
-        round_state = thisState[1]
-        active = thisState[2]
-
-
-        # 1. Hand Strength (Placeholder: Should be calculated using a hand evaluator)
+        # 1. Hand Strength
         my_cards = round_state.hands[active]
         board_cards = round_state.deck[:round_state.street]  # Cards revealed so far
-        features["hand_strength"] = self.evaluateHandStrength(my_cards, board_cards)
+        features[0] = self.evaluateHandStrength(my_cards, board_cards)
 
         # 2. Pot Odds
         my_pip = round_state.pips[active]
         opp_pip = round_state.pips[1 - active]
         pot_size = sum(round_state.pips)
         continue_cost = opp_pip - my_pip
-        features["pot_odds"] = continue_cost / (pot_size + continue_cost) if continue_cost > 0 else 0
+        features[1] = continue_cost / (pot_size + continue_cost) if continue_cost > 0 else 0
 
-        # 3. Effective Stack Size (Relative to Big Blind)
+        # 3. Effective Stack Size (relative to the starting stack, so every feature is on a similar scale)
         my_stack = round_state.stacks[active]
-        features["effective_stack"] = my_stack / BIG_BLIND
+        features[2] = my_stack / STARTING_STACK
 
-        # 4. Opponent's Betting Behavior (Aggression Factor)
+        # 4. Opponent's Betting Behavior (Aggression Factor): its share of all the chips in the pot
         opp_contribution = STARTING_STACK - round_state.stacks[1 - active]
-        features["opp_aggression"] = opp_contribution / (pot_size + 1)  # +1 to avoid division by zero
+        my_contribution = STARTING_STACK - my_stack
+        features[3] = opp_contribution / (opp_contribution + my_contribution + 1)  # +1 to avoid division by zero
 
         # 5. Position (1 if acting last, 0 if first)
-        features["position"] = 1 if active == 1 else 0
+        features[4] = 1 if active == 1 else 0
 
-        # 6. Street (Pre-Flop = 0, Flop = 1, Turn = 2, River = 3)
-        features["street"] = round_state.street / 5  # Normalize between 0 and 1
+        # 6. Street (Pre-Flop = 0, Flop = 2, River = 4)
+        features[5] = round_state.street / 5  # Normalize between 0 and 1
 
         # 7. Bluff Potential (Simple metric: If opponent has checked, it might be a bluff spot)
-        features["bluff_potential"] = 1 if CheckAction in round_state.legal_actions() else 0
+        features[6] = 1 if CheckAction in round_state.legal_actions() else 0
 
+        features[7] = 1  # bias
         return features
 
+    def kindsMask(self,kinds):
+        mask = np.zeros(NUM_KINDS, dtype=bool)
+        mask[kinds] = True
+        return mask
+
     def update(self, state, action, nextState, reward):
+        '''
+        Stores the transition and takes a TD step on a mini-batch from the replay buffer.
+        '''
         if(self.numTraining>0):
-           self.numTraining-=1
+            self.numTraining-=1
         else:
-           self.epsilon=0
-        difference = reward + self.discount*self.computeValueFromQValues(nextState) - self.getQValue(state,action)
-        features = self.getFeatures(state)
-        #newWeights=[]
-        for i,feature in enumerate(features):
-          thisWeight=0
-          if(feature in self.weights):
-            thisWeight=self.weights[feature]
-          self.weights[feature] = thisWeight - self.alpha*difference*features[feature]
+            self.epsilon=0
+        if self.isTerminal(state) or action is False:  # field-less actions are empty tuples, so falsy
+            return
+        kind = self.getKind(state, action)
+        done = self.isTerminal(nextState)
+        nextKinds = self.kindsMask([CALL] if done else [kind for kind, _ in self.getLegalKinds(nextState)])
+        self.replay.add(self.getFeatures(state), kind, reward / STARTING_STACK, self.getFeatures(nextState), nextKinds, done)
+        self.train(self.replay.sample(min(self.batchSize, self.replay.size), self.rng))
+
+    def train(self, batch):
+        '''
+        One TD(0) step on the transitions at the given replay buffer indices.
+        '''
+        replay = self.replay
+        features = replay.features[batch]
+        kinds = replay.kinds[batch]
+        nextValues = np.where(replay.nextKinds[batch], replay.nextFeatures[batch] @ self.weights.T, -np.inf).max(axis=1)
+        targets = replay.rewards[batch] + self.discount * np.where(replay.done[batch], 0., nextValues)
+        differences = targets - (self.weights[kinds] * features).sum(axis=1)
+        np.add.at(self.weights, kinds, self.alpha / len(batch) * differences[:, None] * features)
+
+    def getKind(self, state, action):
+        '''
+        Returns the kind of an action, matching raises to the nearest raise size.
+        '''
+        if isinstance(action, FoldAction):
+            return FOLD
+        if isinstance(action, CheckAction):
+            return CHECK
+        if not isinstance(action, RaiseAction) or self.isTerminal(state):
+            return CALL
+        min_raise, max_raise = state[1].raise_bounds()
+        fraction = (action.amount - min_raise) / max(max_raise - min_raise, 1)
+        return min(RAISE_FRACTIONS, key=lambda kindFraction: abs(kindFraction[1] - fraction))[0]
+
+    def getQValues(self, state):
+        '''
+        Returns [(kind, action)] for the state and the Q-value of each.
+        '''
+        kinds = self.getLegalKinds(state)
+        return kinds, self.weights[[kind for kind, _ in kinds]] @ self.getFeatures(state)
 
     def getQValue(self, state, action):
-        features = self.getFeatures(state)
-        output=0
-        for i,feature in enumerate(features):
-          thisWeight=0
-          if(feature in self.weights):
-            thisWeight=self.weights[feature]
-          output += thisWeight*features[feature]
-        return output
-    
+        return float(self.weights[self.getKind(state, action)] @ self.getFeatures(state))
+
     def computeActionFromQValues(self, state):
-        legalActions = [action for action in self.getLegalActions(state)]
-        #print(legalActions)
-        if(len(legalActions)==0):
-          return None
-        else:
-          bestAction = [legalActions[0]]
-          bestActionScore=-9999999999999999999
-          for action in legalActions:
-            thisActionScore=self.getQValue(state,action)
-            #print(thisActionScore)
-            if(thisActionScore==bestActionScore):
-              bestAction+=[action]
-            elif(thisActionScore>bestActionScore):
-              bestActionScore=thisActionScore
-              bestAction=[action]
-          if(random.random()<self.epsilon):
-             return random.choice(legalActions)
-          return random.choice(bestAction)
-    
+        kinds, values = self.getQValues(state)
+        if(len(kinds)==0):
+            return None
+        if(random.random()<self.epsilon):
+            return random.choice(kinds)[1]
+        best = np.flatnonzero(values == values.max())
+        return kinds[random.choice(best.tolist())][1]
+
     def computeValueFromQValues(self, state):
-        if(len([self.getQValue(state,action) for action in self.getLegalActions(state)])==0):
-          return 0.0
-        else:
-          return max([self.getQValue(state,action) for action in self.getLegalActions(state)])
+        kinds, values = self.getQValues(state)
+        return float(values.max()) if len(kinds) else 0.0
 
 
 class Player(Bot):
@@ -188,7 +278,8 @@ class Player(Bot):
         '''
         self.previousAction=False
         self.previousState=False
-        self.myAgent = QLearningAgent()
+        # start from the weights trained offline by train_aiagent.py, if there are any
+        self.myAgent = QLearningAgent(weights=loadWeights())
 
     def handle_new_round(self, game_state, round_state, active):
         '''
@@ -225,7 +316,11 @@ class Player(Bot):
         thisGameState=game_state,False,active
         self.myAgent.numTraining-=1
         if(self.myAgent.numTraining>0):
-           self.myAgent.update(self.previousState,self.previousAction,thisGameState,terminal_state.deltas[active])
+           # learn on the opponent's time rather than before the round-over ack
+           self.deferred.submit(self.myAgent.update,self.previousState,self.previousAction,thisGameState,terminal_state.deltas[active])
+        # the round's last transition ends here, so the next round doesn't continue it
+        self.previousState=False
+        self.previousAction=False
         
         print(self.myAgent.getWeights())
         #my_delta = terminal_state.deltas[active]  # your bankroll change from this round
@@ -254,7 +349,7 @@ class Player(Bot):
         thisGameState=tuple([game_state,round_state,active])
         #print(list(thisGameState))
         if(self.myAgent.numTraining>0):
-           self.myAgent.update(self.previousState,self.previousAction,thisGameState,0)
+           self.deferred.submit(self.myAgent.update,self.previousState,self.previousAction,thisGameState,0)
 
         action = self.myAgent.computeActionFromQValues(thisGameState)
         self.previousAction=action
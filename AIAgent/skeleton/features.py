@@ -0,0 +1,78 @@
+'''
+Memory-mapped per-situation hand strength features, as written by gen_hand_features.py.
+
+For every suit-isomorphic class of hole cards (preflop) or hole cards plus the
+2 flop cards (flop), a street's files hold:
+    <street>_keys.npy   sorted uint32 situation keys, one per class
+    <street>_stats.npy  uint16 (classes, 4): EHS, EHS^2, positive and negative potential,
+                        scaled by STAT_SCALE
+    <street>_hist.npy   uint8 (classes, bins): the distribution of final equity over
+                        runouts, scaled to sum to about HIST_SCALE
+Arrays are opened with mmap_mode='r', so only the pages that are read are loaded.
+The tables are an offline input to card abstraction and are not shipped with bots.
+'''
+import os
+import numpy as np
+
+from .canonical import canonical
+from .equity import combo_index, parse_cards
+
+STREET_NAMES = {0: 'preflop', 2: 'flop'}
+STAT_NAMES = ('ehs', 'ehs2', 'ppot', 'npot')
+STAT_SCALE = 65535
+HIST_SCALE = 255
+NUM_PAIRS = 52 * 51 // 2
+
+
+def pair_index(indices):
+    '''
+    Returns the colexicographic position of a 2-card set among all C(52, 2).
+    '''
+    low, high = sorted(indices)
+    return low + high * (high - 1) // 2
+
+
+def situation_key(hole, board=()):
+    '''
+    Returns the key of the canonical class of hole cards and 0 or 2 board cards (as indices).
+    '''
+    hole, board = canonical(hole, board)
+    key = combo_index(hole)
+    if board:
+        key = key * NUM_PAIRS + pair_index(board)
+    return key
+
+
+class FeatureTable():
+    '''
+    Read-only access to one street's features.
+    '''
+
+    def __init__(self, directory, street):
+        name = os.path.join(directory, STREET_NAMES[street])
+        self.street = street
+        self.keys = np.load(name + '_keys.npy', mmap_mode='r')
+        self.stats = np.load(name + '_stats.npy', mmap_mode='r')
+        self.hist = np.load(name + '_hist.npy', mmap_mode='r')
+
+    def row(self, hole, board=()):
+        '''
+        Returns the row of the situation's class, given card codes.
+        '''
+        key = situation_key(parse_cards(hole), parse_cards(board))
+        row = int(np.searchsorted(self.keys, key))
+        if row == len(self.keys) or self.keys[row] != key:
+            raise KeyError('{} {} is not in the {} table'.format(hole, board, STREET_NAMES[self.street]))
+        return row
+
+    def lookup(self, hole, board=()):
+        '''
+        Returns a dict of EHS, EHS^2, ppot and npot, and the normalized equity histogram.
+        '''
+        row = self.row(hole, board)
+        stats = dict(zip(STAT_NAMES, self.stats[row] / STAT_SCALE))
+        hist = np.asarray(self.hist[row], dtype=np.float64)
+        return stats, hist / max(1., hist.sum())
+
+    def __len__(self):
+        return len(self.keys)
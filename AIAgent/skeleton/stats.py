@@ -0,0 +1,148 @@
+'''
+Running statistics about the opponent, kept up to date by the runner.
+
+Every update is O(1): the runner reports each of the opponent's actions with the
+RoundState it was taken in, and the hole cards of every showdown. The statistics
+are ratios of fixed-size counters, so reading them is O(1) as well.
+'''
+from .actions import FoldAction, CallAction, CheckAction, RaiseAction
+from .states import BIG_BLIND, STARTING_STACK
+
+NUM_STREETS = 3  # statistics per street are indexed by street // 2
+FOLD, CALL, CHECK, RAISE = range(4)
+ACTION_SLOTS = {FoldAction: FOLD, CallAction: CALL, CheckAction: CHECK, RaiseAction: RAISE}
+# upper edges of the raise size bins, as the chips added over the call relative to the pot after calling
+SIZING_EDGES = (0.4, 0.6, 0.85, 1.15, 1.6, 2.5, 4.0, float('inf'))
+STRENGTH_BINS = 10
+
+
+def ratio(count, total):
+    '''
+    Returns count / total, or None if there is nothing to divide by.
+    '''
+    return count / total if total else None
+
+
+class OpponentStats():
+    '''
+    Counts of the opponent's actions per street, and of the hands it showed down.
+    '''
+
+    def __init__(self, strength=None):
+        '''
+        Arguments:
+        strength: an optional function strength(hole, board) in [0, 1] of the hands
+            the opponent shows down, such as equity.river_equity. Without it only the
+            number of showdowns is counted.
+        '''
+        self.strength = strength
+        self.rounds = 0
+        self.vpip_rounds = 0
+        self.preflop_raise_rounds = 0
+        self.actions = [[0] * len(ACTION_SLOTS) for _ in range(NUM_STREETS)]
+        self.facing_raise = [0] * NUM_STREETS
+        self.folds_to_raise = [0] * NUM_STREETS
+        self.sizings = [[0] * len(SIZING_EDGES) for _ in range(NUM_STREETS)]
+        self.showdowns = 0
+        self.strength_total = 0.
+        self.strength_counts = [0] * STRENGTH_BINS
+        self.voluntary = False
+        self.raised_preflop = False
+
+    def new_round(self):
+        '''
+        Called by the runner when a round starts.
+        '''
+        self.rounds += 1
+        self.voluntary = False
+        self.raised_preflop = False
+
+    def observe(self, round_state, action):
+        '''
+        Called by the runner with each opponent action and the RoundState it was taken in.
+        '''
+        street = round_state.street // 2
+        kind = ACTION_SLOTS[type(action)]
+        self.actions[street][kind] += 1
+        active = round_state.button % 2
+        continue_cost = round_state.pips[1-active] - round_state.pips[active]
+        # the small blind's first decision faces only the big blind, not a raise
+        if continue_cost > 0 and (street > 0 or round_state.button > 0):
+            self.facing_raise[street] += 1
+            if kind == FOLD:
+                self.folds_to_raise[street] += 1
+        if street == 0 and not self.voluntary and (kind == CALL or kind == RAISE):
+            self.voluntary = True
+            self.vpip_rounds += 1
+        if kind == RAISE:
+            if street == 0 and not self.raised_preflop:
+                self.raised_preflop = True
+                self.preflop_raise_rounds += 1
+            pot = 2 * STARTING_STACK - round_state.stacks[0] - round_state.stacks[1] + continue_cost
+            size = (action.amount - round_state.pips[1-active]) / max(pot, BIG_BLIND)
+            index = 0
+            while size > SIZING_EDGES[index]:
+                index += 1
+            self.sizings[street][index] += 1
+
+    def showdown(self, hole, board):
+        '''
+        Called by the runner with the hole cards the opponent showed and the board.
+        '''
+        self.showdowns += 1
+        if self.strength is not None:
+            value = self.strength(hole, board)
+            self.strength_total += value
+            self.strength_counts[min(int(value * STRENGTH_BINS), STRENGTH_BINS - 1)] += 1
+
+    def vpip(self):
+        '''
+        Returns the share of rounds the opponent voluntarily put chips in preflop.
+        '''
+        return ratio(self.vpip_rounds, self.rounds)
+
+    def preflop_raise(self):
+        '''
+        Returns the share of rounds the opponent raised preflop.
+        '''
+        return ratio(self.preflop_raise_rounds, self.rounds)
+
+    def raise_frequency(self, street):
+        '''
+        Returns the share of the opponent's actions on a street (0, 2 or 4) that were raises.
+        '''
+        counts = self.actions[street // 2]
+        return ratio(counts[RAISE], sum(counts))
+
+    def fold_to_raise(self, street):
+        '''
+        Returns how often the opponent folded when facing a bet or raise on a street.
+        '''
+        return ratio(self.folds_to_raise[street // 2], self.facing_raise[street // 2])
+
+    def sizing_distribution(self, street):
+        '''
+        Returns the share of the opponent's raises on a street in each SIZING_EDGES bin.
+        '''
+        counts = self.sizings[street // 2]
+        total = sum(counts)
+        return [ratio(count, total) for count in counts]
+
+    def showdown_rate(self):
+        '''
+        Returns the share of rounds that reached showdown.
+        '''
+        return ratio(self.showdowns, self.rounds)
+
+    def showdown_strength(self):
+        '''
+        Returns the mean strength of the hands the opponent showed down.
+        '''
+        return ratio(self.strength_total, sum(self.strength_counts))
+
+    def strength_distribution(self):
+        '''
+        Returns the share of the opponent's shown hands in each of STRENGTH_BINS equal strength bins.
+        '''
+        total = sum(self.strength_counts)
+        return [ratio(count, total) for count in self.strength_counts]
@@ -0,0 +1,296 @@
+'''
+A depth-limited subgame solver for flop and river decisions, run inside get_action.
+
+The subgame starts at the current RoundState and covers the rest of the current
+street over the betting abstraction of skeleton/betting.py. Its leaves are folds
+and showdowns; a street that closes before the river is valued as if both players
+checked it down, over as many sampled river cards as the deadline leaves time
+for. Both players' holdings are grouped into equal-size strength groups, and each
+iteration of CFR+ updates the regrets and reach of every group at once with array
+operations. Every step is checked against the time left before it starts, and the
+solver plays the action its average strategy favours for our own hand.
+'''
+import time
+import numpy as np
+
+from .actions import CallAction, CheckAction, FoldAction, RaiseAction
+from .betting import abstract_actions, history
+from .clock import Deadline, anytime
+from .equity import BOARD_SIZE, CARD_BITS, COMBO_MASKS, cards_mask, combo_index, parse_cards, river_scores
+from .ranges import percentiles, remove_blockers, uniform
+from .states import BIG_BLIND, SMALL_BLIND, STARTING_STACK, RoundState, TerminalState
+
+GROUPS = 64
+PERCENTILE_BINS = 256
+FLOP_RUNOUTS = 8
+# share of the time left that sampling flop runouts may use; grouping them costs a little more again
+SETUP_SHARE = 0.2
+
+
+class SolveCosts():
+    '''
+    Running estimates of how long grouping one runout and one CFR+ iteration take,
+    so solve() only starts a step that fits in the time left. A skipped solve moves
+    them back toward their defaults, so one slow measurement can't keep the solver
+    off for the rest of the match.
+    '''
+
+    def __init__(self, group=0.004, iteration=0.002, weight=0.2):
+        self.defaults = {'group': group, 'iteration': iteration}
+        self.group = group
+        self.iteration = iteration
+        self.weight = weight
+
+    def record(self, name, seconds):
+        setattr(self, name, (1. - self.weight) * getattr(self, name) + self.weight * seconds)
+
+    def relax(self):
+        for name, default in self.defaults.items():
+            if getattr(self, name) > default:
+                self.record(name, default)
+
+
+COSTS = SolveCosts()
+
+
+class Node():
+    '''
+    A decision of the subgame tree, or one of its leaves.
+
+    Decisions have an acting player and [(slot, action, child)] children; folds have
+    player 0's payoff in delta, and showdowns the chips each player has put in.
+    '''
+
+    def __init__(self, player=None, children=(), delta=None, contributions=None):
+        self.player = player
+        self.children = children
+        self.delta = delta
+        self.contributions = contributions
+        self.regrets = None
+        self.strategy_sum = None
+
+
+def build_tree(round_state, raises):
+    '''
+    Expands the abstract betting from a RoundState until every line folds or closes the street.
+    '''
+    active = round_state.button % 2
+    children = []
+    for slot, action in abstract_actions(round_state, raises):
+        following = round_state.proceed(action)
+        if isinstance(action, FoldAction):
+            child = Node(delta=following.deltas[0])
+        elif isinstance(following, TerminalState) or following.street != round_state.street:
+            stacks = following.previous_state.stacks if isinstance(following, TerminalState) else following.stacks
+            child = Node(contributions=(STARTING_STACK - stacks[0], STARTING_STACK - stacks[1]))
+        else:
+            child = build_tree(following, raises + (slot >= 2))
+        children.append((slot, action, child))
+    return Node(player=active, children=children)
+
+
+def runout_scores(board, dead, runouts, rng, deadline=None):
+    '''
+    Returns a (runouts, holdings) array of river scores: the board itself on the river,
+    otherwise the board completed with random cards that avoid the dead cards (card codes).
+    With a deadline, fewer runouts are sampled if they would not fit, but always at least one.
+    '''
+    if len(board) == BOARD_SIZE:
+        return river_scores(cards_mask(board))[None, :]
+    dead_mask = cards_mask(dead)
+    live = [card for card in range(52) if not dead_mask & int(CARD_BITS[card])]
+    board_mask = cards_mask(board)
+    scores = []
+
+    def sample():
+        extra = rng.choice(live, BOARD_SIZE - len(board), replace=False)
+        scores.append(river_scores(board_mask | int(CARD_BITS[extra].sum())))
+
+    if deadline is None:
+        for _ in range(runouts):
+            sample()
+    else:
+        anytime(sample, deadline, max_steps=runouts)
+    return np.array(scores)
+
+
+def group_matrix(scores, weights, groups, bins):
+    '''
+    Groups holdings by strength and returns how often each group beats each other group.
+
+    Arguments:
+    scores: a (runouts, holdings) array of river scores, negative where a holding is blocked.
+    weights: the (2, holdings) range weights of both players.
+    groups, bins: the number of strength groups and of percentile bins used to compare them.
+
+    Returns:
+    (group of each holding, (2, groups) starting weights, wins) where wins[i, j] is the
+    share of showdowns player 0's group i wins against player 1's group j, ties counting half.
+    '''
+    valid = scores >= 0
+    percentile = percentiles(scores)
+    strength = percentile.sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    # equal-size groups by mean percentile, over the holdings either player can have
+    live = np.flatnonzero(weights.sum(axis=0) > 0)
+    group = np.zeros(scores.shape[1], dtype=np.int64)
+    group[live[np.argsort(strength[live], kind='stable')]] = np.arange(len(live)) * groups // len(live)
+    cells = group * bins + np.minimum((percentile * bins).astype(np.int64), bins - 1)
+    wins = np.zeros((groups, groups))
+    pairs = np.zeros((groups, groups))
+    for runout in range(scores.shape[0]):
+        histograms = [np.bincount(cells[runout], weights[player] * valid[runout], groups * bins).reshape(groups, bins)
+                      for player in (0, 1)]
+        beaten = np.cumsum(histograms[1], axis=1) - 0.5 * histograms[1]
+        wins += histograms[0] @ beaten.T
+        pairs += np.outer(histograms[0].sum(axis=1), histograms[1].sum(axis=1))
+    starts = np.array([np.bincount(group, weights[player], groups) for player in (0, 1)])
+    return group, starts, np.where(pairs > 0, wins / np.where(pairs > 0, pairs, 1.), 0.5)
+
+
+class Subgame():
+    '''
+    The tree, strength groups and CFR+ tables of one decision.
+    '''
+
+    def __init__(self, round_state, hole, weights, runouts=FLOP_RUNOUTS, groups=GROUPS, bins=PERCENTILE_BINS,
+                 rng=None, deadline=None, scores=None):
+        '''
+        Arguments:
+        round_state: the RoundState of the decision.
+        hole: our hole cards, which the sampled river cards avoid.
+        weights: the (2, holdings) range weights of both players, blockers already removed.
+        deadline: an optional Deadline for sampling the flop runouts, of which up to runouts are taken.
+        scores: the runout_scores to group, if they were already sampled.
+        '''
+        if scores is None:
+            rng = rng if rng is not None else np.random.default_rng()
+            board = round_state.deck[:round_state.street]
+            scores = runout_scores(board, board + list(hole), runouts, rng, deadline)
+        self.group, starts, self.wins = group_matrix(scores, weights, groups, bins)
+        self.reach = starts / np.maximum(starts.sum(axis=1, keepdims=True), 1e-12)
+        self.root = build_tree(round_state, history(round_state)[1])
+        self.iterations = 0
+
+    def values(self, node, reach):
+        '''
+        Returns both players' counterfactual values per group below a node, updating its regrets.
+        '''
+        if node.player is None:
+            totals = reach.sum(axis=1)
+            if node.delta is not None:
+                return np.array([node.delta * totals[1] * np.ones(len(reach[0])),
+                                 -node.delta * totals[0] * np.ones(len(reach[1]))])
+            pot = node.contributions[0] + node.contributions[1]
+            return np.array([(self.wins @ reach[1]) * pot - node.contributions[0] * totals[1],
+                             node.contributions[0] * totals[0] - (self.wins.T @ reach[0]) * pot])
+        player = node.player
+        strategy = self.current_strategy(node)
+        child_values = []
+        for index, (_, _, child) in enumerate(node.children):
+            child_reach = reach.copy()
+            child_reach[player] *= strategy[:, index]
+            child_values.append(self.values(child, child_reach))
+        child_values = np.array(child_values)
+        mine = child_values[:, player].T  # (groups, actions)
+        value = child_values.sum(axis=0)
+        value[player] = (strategy * mine).sum(axis=1)
+        # CFR+: regrets never go below zero, and later iterations weigh more in the average
+        node.regrets = np.maximum(node.regrets + mine - value[player][:, None], 0.)
+        node.strategy_sum += (self.iterations + 1) * reach[player][:, None] * strategy
+        return value
+
+    def current_strategy(self, node):
+        '''
+        Regret matching for every group at once.
+        '''
+        if node.regrets is None:
+            shape = (len(self.reach[node.player]), len(node.children))
+            node.regrets = np.zeros(shape)
+            node.strategy_sum = np.zeros(shape)
+        positive = node.regrets
+        totals = positive.sum(axis=1, keepdims=True)
+        return np.where(totals > 0, positive / np.where(totals > 0, totals, 1.), 1. / positive.shape[1])
+
+    def iterate(self):
+        '''
+        Runs one iteration of CFR+ over the whole subgame.
+        '''
+        self.values(self.root, self.reach)
+        self.iterations += 1
+
+    def average_strategy(self, hole):
+        '''
+        Returns the root's average strategy for the group of our hole cards.
+        '''
+        row = self.root.strategy_sum[self.group[combo_index(parse_cards(hole))]]
+        total = row.sum()
+        return row / total if total > 0 else np.full(len(row), 1. / len(row))
+
+
+def warm():
+    '''
+    Solves a fixed flop and river spot with a generous deadline, so the first solve of
+    a match does not pay for NumPy's and the evaluator's first calls. Call it from the
+    bot's __init__, which is not on the game clock.
+    '''
+    flop = RoundState(0, 0, [SMALL_BLIND, BIG_BLIND], [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND],
+                      [['Ah', 'Kd', '7c'], ['9s', '9h', '2d']], ['Qs', 'Jd', '4c', '5h'], None)
+    flop = flop.proceed(RaiseAction(40)).proceed(CallAction())
+    river = flop.proceed(CheckAction()).proceed(CheckAction())
+    # the first pass pays the first-call costs, the second records the steady ones in COSTS
+    for spot in (flop, river, flop, river):
+        spot = spot.proceed(RaiseAction(40))
+        solve(spot, spot.button % 2, Deadline(0.1), max_iterations=5)
+
+
+def solve(round_state, active, deadline, villain_weights=None, min_pot=80, min_seconds=0.008, max_iterations=500,
+          rng=None):
+    '''
+    Solves the current decision's subgame and returns the action to take, or None for
+    spots that are not worth it (preflop, small pots, too little time), which should
+    be played by the bot's fast path. Setting up a river subgame takes about 4 ms and a
+    flop subgame about 5 ms per sampled runout, so the flop samples only as many runouts
+    as fit in SETUP_SHARE of the time left; each iteration then takes about 1.5 ms.
+    Grouping the runouts and every iteration only start if COSTS says they fit in the
+    time left, so with the default TimeBudget's 10-15 ms per decision a solve gets one
+    or two runouts and a few iterations. Call warm() first, off the clock.
+
+    Arguments:
+    round_state: the RoundState of the decision.
+    active: our player index.
+    deadline: the Deadline the solve must finish by.
+    villain_weights: an optional range over all holdings for the opponent, uniform otherwise.
+    min_pot: the smallest pot, in chips, that is solved.
+    min_seconds: the least time left on the deadline for a solve to start, enough for a
+        one-runout setup and an iteration.
+    max_iterations: a cap on CFR+ iterations.
+    '''
+    pot = 2 * STARTING_STACK - round_state.stacks[0] - round_state.stacks[1]
+    if round_state.street == 0 or pot < min_pot or deadline.remaining() < min_seconds:
+        return None
+    street = round_state.street
+    board = round_state.deck[:street]
+    hole = round_state.hands[active]
+    rng = rng if rng is not None else np.random.default_rng()
+    scores = runout_scores(board, board + list(hole), FLOP_RUNOUTS, rng, Deadline(deadline.remaining() * SETUP_SHARE))
+    # grouping the runouts and a first iteration have to fit in what is left
+    if deadline.remaining() < COSTS.group * len(scores) + COSTS.iteration:
+        COSTS.relax()
+        return None
+    weights = np.empty((2, len(COMBO_MASKS)))
+    # the opponent can't hold our cards, while we are modeled with everything the board allows
+    weights[active] = remove_blockers(uniform(), board)
+    weights[1-active] = remove_blockers(villain_weights if villain_weights is not None else uniform(), board + hole)
+    start = time.perf_counter()
+    subgame = Subgame(round_state, hole, weights, scores=scores)
+    COSTS.record('group', (time.perf_counter() - start) / len(scores))
+    if len(subgame.root.children) == 1:
+        return subgame.root.children[0][1]
+    if deadline.remaining() < COSTS.iteration:
+        COSTS.relax()
+        return None
+    start = time.perf_counter()
+    iterations = anytime(subgame.iterate, deadline, max_steps=max_iterations)
+    COSTS.record('iteration', (time.perf_counter() - start) / iterations)
+    strategy = subgame.average_strategy(hole)
+    return subgame.root.children[int(np.argmax(strategy))][1]
@@ -0,0 +1,135 @@
+'''
+The betting abstraction shared by the CFR trainer and bots that play from its strategy.
+
+At every decision the abstract game offers at most five actions, kept in fixed
+slots: fold (only when facing a bet), check or call, a half-pot and a pot-sized
+raise, and all-in. Raises are capped at MAX_RAISES per street. Real actions,
+including off-tree raise sizes, are translated to the nearest slot, and an
+information set is identified by the street, the card bucket and the translated
+betting history.
+'''
+import hashlib
+from .actions import FoldAction, CallAction, CheckAction, RaiseAction
+from .states import STARTING_STACK
+
+FOLD, CALL, HALF_POT, POT, ALL_IN = range(5)
+NUM_ACTIONS = 5
+SLOT_CODES = 'fchpa'
+RAISE_FRACTIONS = ((HALF_POT, 0.5), (POT, 1.0))
+MAX_RAISES = 3
+
+
+def raise_to(round_state, fraction):
+    '''
+    Returns the raise amount (in pips) that adds fraction of the pot after calling.
+    '''
+    active = round_state.button % 2
+    pot = 2 * STARTING_STACK - round_state.stacks[0] - round_state.stacks[1]
+    continue_cost = round_state.pips[1-active] - round_state.pips[active]
+    return round_state.pips[1-active] + int(fraction * (pot + continue_cost))
+
+
+def raise_slots(round_state):
+    '''
+    Returns [(slot, amount)] for the distinct abstract raises available, ending with all-in.
+    '''
+    low, high = round_state.raise_bounds()
+    slots = []
+    for slot, fraction in RAISE_FRACTIONS:
+        amount = min(max(raise_to(round_state, fraction), low), high)
+        if amount < high and all(amount != seen for _, seen in slots):
+            slots.append((slot, amount))
+    slots.append((ALL_IN, high))
+    return slots
+
+
+def abstract_actions(round_state, raises):
+    '''
+    Returns the abstract actions at a decision as [(slot, action)].
+
+    Arguments:
+    round_state: the RoundState of the decision.
+    raises: the number of raises already made on this street.
+    '''
+    legal_actions = round_state.legal_actions()
+    if CallAction in legal_actions:
+        actions = [(FOLD, FoldAction()), (CALL, CallAction())]
+    else:
+        actions = [(CALL, CheckAction())]
+    if RaiseAction in legal_actions and raises < MAX_RAISES:
+        actions.extend((slot, RaiseAction(amount)) for slot, amount in raise_slots(round_state))
+    return actions
+
+
+def translate(round_state, action):
+    '''
+    Returns the slot of a real action; raises go to the abstract raise nearest in size.
+    '''
+    if isinstance(action, FoldAction):
+        return FOLD
+    if not isinstance(action, RaiseAction):
+        return CALL
+    return min(raise_slots(round_state), key=lambda slot: abs(slot[1] - action.amount))[0]
+
+
+def replay(round_state):
+    '''
+    Recovers the decisions leading to a RoundState from its previous_state chain.
+
+    Returns:
+    A list of (state, action) pairs in the order they were played.
+    '''
+    states = []
+    while round_state is not None:
+        states.append(round_state)
+        round_state = round_state.previous_state
+    states.reverse()
+    decisions = []
+    index = 0
+    while index < len(states) - 1:
+        state, following = states[index], states[index + 1]
+        active = state.button % 2
+        index += 1
+        if following.street != state.street:
+            action = CheckAction()  # a check that closed the street
+        elif following.pips[active] == state.pips[active]:
+            action = CheckAction()
+        elif following.pips[active] == state.pips[1-active]:
+            action = CallAction()
+            if state.button > 0:
+                index += 1  # a call that closes the street passes through a state nobody acts in
+        else:
+            action = RaiseAction(following.pips[active])
+        decisions.append((state, action))
+    return decisions
+
+
+def history(round_state):
+    '''
+    Returns the abstract betting history leading to a RoundState, and the raises on its street.
+
+    Each street's slots are written with SLOT_CODES and streets are separated by '/'.
+    '''
+    codes = []
+    raises = 0
+    street = 0
+    for state, action in replay(round_state):
+        if state.street != street:
+            codes.append('/')
+            street = state.street
+            raises = 0
+        slot = translate(state, action)
+        raises += slot >= HALF_POT
+        codes.append(SLOT_CODES[slot])
+    if round_state.street != street:
+        codes.append('/')
+        raises = 0
+    return ''.join(codes), raises
+
+
+def infoset_key(street, bucket, betting):
+    '''
+    Hashes a street, card bucket and betting history to a stable 64-bit key.
+    '''
+    text = '{}:{}:{}'.format(street, bucket, betting)
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little')
@@ -0,0 +1,254 @@
+'''
+Summarizes engine game logs (gamelog.txt) without loading them into memory.
+
+Each log is read as a pipeline of generators: lines, then one Round at a time
+with its blinds, actions per street, showdown and deltas, folded into a Summary
+of running counts. Only the current round and the counts are ever held, so
+memory stays flat however long the log is. Many logs are summarized in
+parallel, one per worker process.
+
+For every bot in a log, the summary has action frequencies per street
+(Preflop, Flop and Turn, the engine's name for the last street), how often its
+rounds reached a showdown and how often it won there, its win rate and chips as
+small and big blind, illegal actions and timeouts, and its bankroll every
+--every rounds. One compact JSON line per log is written to --out, and a table
+is printed. With --merge, the logs are also summed per bot name.
+
+Usage: python analyze_logs.py LOG [LOG ...] [--out PATH] [--every N] [--workers W] [--merge]
+'''
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import time
+
+STREETS = ('Preflop', 'Flop', 'Turn')
+VERBS = ('fold', 'check', 'call', 'bet', 'raise')
+POSITIONS = ('small_blind', 'big_blind')
+# line endings and markers of the engine's log phrases, checked in this order
+ENDINGS = ((' folds', 'fold'), (' checks', 'check'), (' calls', 'call'), (' ran out of time', 'timeout'),
+           (' disconnected', 'timeout'))
+MARKERS = ((' raises to ', 'raise'), (' bets ', 'bet'), (' awarded ', 'awarded'), (' shows ', 'shows'),
+           (' posts the blind of ', 'blind'), (' attempted illegal ', 'illegal'), (' response misformatted', 'illegal'))
+
+Round = collections.namedtuple('Round', ['number', 'blinds', 'actions', 'showdown', 'deltas', 'errors'])
+
+
+def read_lines(path):
+    '''
+    Yields the lines of a log one at a time, without their line endings.
+    '''
+    with open(path) as file:
+        for line in file:
+            yield line.rstrip('\n')
+
+
+def parse_rounds(lines):
+    '''
+    Yields a Round for every complete round in a stream of log lines.
+
+    blinds is (small blind, big blind), actions a list of (street, name, verb, amount),
+    deltas a {name: delta} dict and errors a list of (name, kind).
+    '''
+    number = None
+    for line in lines:
+        if line.startswith('Round #'):
+            number = int(line[7:line.index(',')])
+            blinds, actions, deltas, errors = [], [], {}, []
+            street = 0
+            showdown = False
+            continue
+        if number is None:
+            continue
+        if line.startswith('Flop ['):
+            street = 1
+            continue
+        if line.startswith('Turn ['):
+            street = 2
+            continue
+        if line.startswith('Winning counts'):
+            yield Round(number, tuple(blinds), actions, showdown, deltas, errors)
+            number = None
+            continue
+        for ending, kind in ENDINGS:
+            if line.endswith(ending):
+                name = line[:-len(ending)]
+                if kind == 'timeout':
+                    errors.append((name, kind))
+                else:
+                    actions.append((street, name, kind, 0))
+                break
+        else:
+            for marker, kind in MARKERS:
+                name, found, rest = line.partition(marker)
+                if not found:
+                    continue
+                if kind == 'raise' or kind == 'bet':
+                    actions.append((street, name, kind, int(rest)))
+                elif kind == 'awarded':
+                    deltas[name] = int(rest)
+                elif kind == 'shows':
+                    showdown = True
+                elif kind == 'blind':
+                    blinds.append(name)
+                else:
+                    errors.append((name, kind))
+                break
+
+
+def new_bot():
+    return {
+        'rounds': 0,
+        'chips': 0,
+        'actions': {street: dict.fromkeys(VERBS, 0) for street in STREETS},
+        'saw_flop': 0,
+        'showdowns': 0,
+        'showdowns_won': 0,
+        'positions': {position: {'rounds': 0, 'won': 0, 'chips': 0} for position in POSITIONS},
+        'illegal': 0,
+        'timeouts': 0,
+        'bankroll': [],
+    }
+
+
+class Summary():
+    '''
+    Running counts per bot over a stream of Rounds.
+    '''
+
+    def __init__(self, every=100):
+        '''
+        Arguments:
+        every: record each bot's bankroll once every this many rounds.
+        '''
+        self.every = every
+        self.rounds = 0
+        self.bots = {}
+
+    def add(self, round):
+        self.rounds += 1
+        streets = {street for street, _, _, _ in round.actions}
+        for position, name in zip(POSITIONS, round.blinds):
+            bot = self.bots.get(name)
+            if bot is None:
+                bot = self.bots[name] = new_bot()
+            delta = round.deltas.get(name, 0)
+            bot['rounds'] += 1
+            bot['chips'] += delta
+            bot['saw_flop'] += 1 in streets
+            bot['showdowns'] += round.showdown
+            bot['showdowns_won'] += round.showdown and delta > 0
+            seat = bot['positions'][position]
+            seat['rounds'] += 1
+            seat['won'] += delta > 0
+            seat['chips'] += delta
+            if round.number % self.every == 0:
+                bot['bankroll'].append(bot['chips'])
+        for street, name, verb, _ in round.actions:
+            self.bots[name]['actions'][STREETS[street]][verb] += 1
+        for name, kind in round.errors:
+            if name in self.bots:
+                self.bots[name]['illegal' if kind == 'illegal' else 'timeouts'] += 1
+
+    def add_all(self, rounds):
+        for round in rounds:
+            self.add(round)
+        return self
+
+    def merge(self, other):
+        '''
+        Adds the counts of another Summary, matching bots by name; bankrolls are concatenated.
+        '''
+        self.rounds += other['rounds']
+        for name, counts in other['bots'].items():
+            bot = self.bots.setdefault(name, new_bot())
+            for key in ('rounds', 'chips', 'saw_flop', 'showdowns', 'showdowns_won', 'illegal', 'timeouts'):
+                bot[key] += counts[key]
+            for street in STREETS:
+                for verb in VERBS:
+                    bot['actions'][street][verb] += counts['actions'][street][verb]
+            for position in POSITIONS:
+                for key in ('rounds', 'won', 'chips'):
+                    bot['positions'][position][key] += counts['positions'][position][key]
+            offset = bot['bankroll'][-1] if bot['bankroll'] else 0
+            bot['bankroll'].extend(offset + value for value in counts['bankroll'])
+
+    def to_dict(self):
+        '''
+        Returns the counts with the rates derived from them, ready for JSON.
+        '''
+        bots = {}
+        for name, counts in self.bots.items():
+            bot = dict(counts)
+            bot['frequencies'] = {street: {verb: ratio(count, sum(actions.values())) for verb, count in actions.items()}
+                                  for street, actions in counts['actions'].items()}
+            bot['showdown_rate'] = ratio(counts['showdowns'], counts['rounds'])
+            bot['went_to_showdown'] = ratio(counts['showdowns'], counts['saw_flop'])
+            bot['won_at_showdown'] = ratio(counts['showdowns_won'], counts['showdowns'])
+            bot['win_rate'] = {position: ratio(seat['won'], seat['rounds']) for position, seat in counts['positions'].items()}
+            bots[name] = bot
+        return {'rounds': self.rounds, 'every': self.every, 'bots': bots}
+
+
+def ratio(count, total):
+    return round(count / total, 4) if total else None
+
+
+def summarize(task):
+    '''
+    Summarizes one log. Returns (path, summary dict, lines read, seconds).
+    '''
+    path, every = task
+    start = time.perf_counter()
+    lines = 0
+
+    def counted(stream):
+        nonlocal lines
+        for line in stream:
+            lines += 1
+            yield line
+
+    summary = Summary(every).add_all(parse_rounds(counted(read_lines(path))))
+    return path, summary.to_dict(), lines, time.perf_counter() - start
+
+
+def print_table(label, summary):
+    print('{} ({} rounds)'.format(label, summary['rounds']))
+    print('  {:<12}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}'.format(
+        'bot', 'chips', 'SB win', 'BB win', 'showdown', 'SD won', 'pf raise', 'pf fold', 'illegal'))
+    for name, bot in sorted(summary['bots'].items()):
+        preflop = bot['frequencies']['Preflop']
+        print('  {:<12}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}'.format(
+            name, bot['chips'], *('-' if value is None else '{:.1%}'.format(value) for value in (
+                bot['win_rate']['small_blind'], bot['win_rate']['big_blind'], bot['showdown_rate'],
+                bot['won_at_showdown'], preflop['raise'], preflop['fold'])), bot['illegal'] + bot['timeouts']))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python analyze_logs.py')
+    parser.add_argument('logs', type=str, nargs='+', help='Game logs written by engine.py')
+    parser.add_argument('--out', type=str, default='summary.jsonl', help='File to write one JSON summary per log to')
+    parser.add_argument('--every', type=int, default=100, help='Rounds between bankroll samples')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Worker processes to run')
+    parser.add_argument('--merge', action='store_true', help='Also sum the logs per bot name')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    merged = Summary(args.every)
+    total_lines = 0
+    with multiprocessing.Pool(min(args.workers, len(args.logs))) as pool, open(args.out, 'w') as out:
+        for path, summary, lines, elapsed in pool.imap(summarize, [(path, args.every) for path in args.logs]):
+            out.write(json.dumps(dict(log=os.path.abspath(path), **summary), separators=(',', ':')) + '\n')
+            total_lines += lines
+            print_table('{} ({:.0f} lines/s)'.format(path, lines / max(elapsed, 1e-9)), summary)
+            if args.merge:
+                merged.merge(summary)
+    if args.merge:
+        print_table('all logs', merged.to_dict())
+    elapsed = time.perf_counter() - start
+    print('Wrote {}: {} logs, {} lines in {:.2f}s'.format(args.out, len(args.logs), total_lines, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+'''
+Benchmarks AIAgent's Q-learning updates in transitions per second.
+
+Transitions are recorded from random decisions, with their features computed
+up front so only the learner is timed. The baseline is the old dict-of-weights
+update, which looped over features for one transition at a time and evaluated
+every next action separately; it is reproduced here. The new learner adds each
+transition to the preallocated replay buffer and takes a mini-batch TD step.
+Memory is checked by pushing several times the buffer's capacity through it.
+
+Usage: python bench_aiagent.py [--transitions N] [--batch B] [--capacity C]
+'''
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'AIAgent'))
+import player
+from skeleton.actions import CallAction, CheckAction
+from skeleton.equity import CARD_CODES
+from skeleton.states import BIG_BLIND, SMALL_BLIND, STARTING_STACK, GameState, RoundState
+
+
+def old_update(weights, features, next_action_features, reward, alpha=0.2, discount=0.8):
+    '''
+    The old QLearningAgent.update on feature dicts: one transition, feature by feature.
+    '''
+    def q_value(state_features):
+        output = 0
+        for feature in state_features:
+            output += weights.get(feature, 0) * state_features[feature]
+        return output
+
+    next_value = max([q_value(action_features) for action_features in next_action_features]) if next_action_features else 0.
+    difference = reward + discount * next_value - q_value(features)
+    for feature in features:
+        weights[feature] = weights.get(feature, 0) - alpha * difference * features[feature]
+
+
+def random_states(count, rng):
+    '''
+    Returns (game_state, round_state, active) tuples of random flop and river decisions.
+    '''
+    states = []
+    for index in range(count):
+        cards = rng.sample(CARD_CODES, 10)
+        round_state = RoundState(0, 0, [SMALL_BLIND, BIG_BLIND], [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND],
+                                 [cards[:3], cards[3:6]], cards[6:], None)
+        round_state = round_state.proceed(CallAction()).proceed(CheckAction())
+        if rng.random() < 0.5:
+            round_state = round_state.proceed(CheckAction()).proceed(CheckAction())
+        states.append((GameState(0, 180., index + 1), round_state, round_state.button % 2))
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python bench_aiagent.py')
+    parser.add_argument('--transitions', type=int, default=20000, help='Transitions to time')
+    parser.add_argument('--states', type=int, default=500, help='Distinct random states to draw transitions from')
+    parser.add_argument('--batch', type=int, default=32, help='Mini-batch size')
+    parser.add_argument('--capacity', type=int, default=50000, help='Replay buffer capacity')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    agent = player.QLearningAgent(batchSize=args.batch, capacity=args.capacity, seed=args.seed)
+    states = random_states(args.states, rng)
+    features = [agent.computeFeatures(state) for state in states]
+    kinds = [agent.kindsMask([kind for kind, _ in agent.getLegalKinds(state)]) for state in states]
+    picks = [(rng.randrange(len(states)), rng.randrange(len(states)), rng.randrange(player.NUM_KINDS),
+              rng.uniform(-1., 1.)) for _ in range(args.transitions)]
+
+    # the old learner saw a dict per state, and one per next action, all with the same values
+    dicts = [dict(zip(player.FEATURE_NAMES, row.tolist())) for row in features]
+    weights = {}
+    start = time.perf_counter()
+    for state, following, _, reward in picks:
+        old_update(weights, dicts[state], [dicts[following]] * int(kinds[following].sum()), reward)
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for state, following, kind, reward in picks:
+        agent.replay.add(features[state], kind, reward, features[following], kinds[following], False)
+        agent.train(agent.replay.sample(min(agent.batchSize, agent.replay.size), agent.rng))
+    new_time = time.perf_counter() - start
+
+    batches = args.transitions // args.batch
+    start = time.perf_counter()
+    for _ in range(batches):
+        agent.train(agent.replay.sample(args.batch, agent.rng))
+    train_time = time.perf_counter() - start
+
+    print('{:<44}{:>16}'.format('learner', 'transitions/s'))
+    print('{:<44}{:>16.0f}'.format('old dict update, 1 transition', args.transitions / old_time))
+    print('{:<44}{:>16.0f}'.format('replay add + TD step on {}'.format(args.batch), args.transitions / new_time))
+    print('{:<44}{:>16.0f}'.format('TD steps only, transitions trained on', batches * args.batch / train_time))
+
+    # memory stays flat once the ring buffer wraps around
+    tracemalloc.start()
+    usage = []
+    for lap in range(4):
+        for index in range(args.capacity):
+            state, following, kind, reward = picks[index % len(picks)]
+            agent.replay.add(features[state], kind, reward, features[following], kinds[following], False)
+        usage.append(tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+    print('replay buffer: {} transitions in {} bytes; traced allocations after each of 4 fills: {}'.format(
+        agent.replay.size, agent.replay.nbytes(), ', '.join(str(value) for value in usage)))
+
+
+if __name__ == '__main__':
+    main()
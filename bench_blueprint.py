@@ -0,0 +1,126 @@
+'''
+Benchmarks loading and querying a packed blueprint (see pack_blueprint.py).
+
+Load time is measured in a fresh interpreter for the memory-mapped packed files and
+for the same table as train_cfr.py's float32 .npz, a pickled dict and JSON, the
+formats a bot might otherwise ship. Lookups are timed for keys that are in the
+table and keys that are not, and Blueprint.act is timed per street on random
+decisions, which is the whole cost a bot pays inside get_action.
+
+Usage: python bench_blueprint.py [--blueprint PATH] [--packed PREFIX] [--lookups N] [--decisions D]
+'''
+import argparse
+import json
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'python_skeleton'))
+from skeleton.actions import CallAction, CheckAction
+from skeleton.blueprint import BLUEPRINT_PREFIX, Blueprint, blueprint_paths
+from skeleton.equity import CARD_CODES
+from skeleton.states import BIG_BLIND, SMALL_BLIND, STARTING_STACK, RoundState
+
+# (imports, load) per format; only the load is timed, in a fresh interpreter so nothing is cached in-process
+LOADERS = {
+    'packed, memory-mapped': ('from skeleton.blueprint import Blueprint', 'table = Blueprint({path!r})'),
+    'float32 .npz': ('import numpy as np', 'data = np.load({path!r}); table = (data["keys"], data["probabilities"])'),
+    'pickled dict': ('import pickle', 'table = pickle.load(open({path!r}, "rb"))'),
+    'JSON': ('import json', 'table = json.load(open({path!r}))'),
+}
+
+
+def load_time(loader, path):
+    '''
+    Returns the seconds a fresh interpreter takes to load a table, after its imports.
+    '''
+    imports, load = loader
+    code = ('import sys, time; sys.path.insert(0, {!r}); {}; start = time.perf_counter(); {}; '
+            'print(time.perf_counter() - start)').format(os.path.join(ROOT, 'python_skeleton'), imports,
+                                                         load.format(path=path))
+    return float(subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout)
+
+
+def random_decisions(count, rng):
+    '''
+    Plays random hands, calling or checking through, and returns the RoundState of every decision.
+    '''
+    decisions = []
+    while len(decisions) < count:
+        cards = rng.sample(CARD_CODES, 10)
+        round_state = RoundState(0, 0, [SMALL_BLIND, BIG_BLIND], [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND],
+                                 [cards[:3], cards[3:6]], cards[6:], None)
+        while isinstance(round_state, RoundState):
+            decisions.append(round_state)
+            action = CallAction() if CallAction in round_state.legal_actions() else CheckAction()
+            round_state = round_state.proceed(action)
+    return decisions[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python bench_blueprint.py')
+    parser.add_argument('--blueprint', type=str, default=os.path.join(ROOT, 'blueprint', 'blueprint.npz'),
+                        help='Blueprint written by train_cfr.py')
+    parser.add_argument('--packed', type=str, default=BLUEPRINT_PREFIX, help='Prefix of the packed blueprint')
+    parser.add_argument('--lookups', type=int, default=100000, help='Lookups to time')
+    parser.add_argument('--decisions', type=int, default=2000, help='Random decisions to time Blueprint.act on')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with np.load(args.blueprint) as data:
+        keys, probabilities = data['keys'], data['probabilities']
+    with tempfile.TemporaryDirectory() as directory:
+        table = dict(zip(keys.tolist(), probabilities.tolist()))
+        paths = {
+            'packed, memory-mapped': args.packed,
+            'float32 .npz': args.blueprint,
+            'pickled dict': os.path.join(directory, 'blueprint.pkl'),
+            'JSON': os.path.join(directory, 'blueprint.json'),
+        }
+        with open(paths['pickled dict'], 'wb') as file:
+            pickle.dump(table, file, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(paths['JSON'], 'w') as file:
+            json.dump({str(key): value for key, value in table.items()}, file)
+        del table
+        print('{} information sets'.format(len(keys)))
+        print('{:<24}{:>12}{:>12}'.format('format', 'bytes', 'load ms'))
+        for name, loader in LOADERS.items():
+            size = sum(os.path.getsize(path) for path in blueprint_paths(paths[name])) if name.startswith('packed') \
+                else os.path.getsize(paths[name])
+            print('{:<24}{:>12}{:>12.1f}'.format(name, size, load_time(loader, paths[name]) * 1e3))
+
+    blueprint = Blueprint(args.packed)
+    rng = np.random.default_rng(args.seed)
+    hits = rng.choice(np.asarray(blueprint.keys), args.lookups).tolist()
+    misses = rng.integers(0, 2 ** 63, args.lookups, dtype=np.uint64).tolist()
+    print('{:<24}{:>12}'.format('lookup', 'us/call'))
+    for name, queries in (('hit', hits), ('miss', misses)):
+        start = time.perf_counter()
+        for key in queries:
+            blueprint.strategy(key)
+        print('{:<24}{:>12.2f}'.format(name, (time.perf_counter() - start) / len(queries) * 1e6))
+
+    # Blueprint.act covers the history replay, the card bucket and the lookup
+    decisions = random_decisions(args.decisions, random.Random(args.seed))
+    times = {}
+    found = {}
+    for round_state in decisions:
+        start = time.perf_counter()
+        action = blueprint.act(round_state, round_state.button % 2)
+        times.setdefault(round_state.street, []).append(time.perf_counter() - start)
+        found[round_state.street] = found.get(round_state.street, 0) + (action is not None)
+    print('{:<24}{:>12}{:>12}'.format('act in get_action', 'us/call', 'in table'))
+    for street in sorted(times):
+        print('{:<24}{:>12.1f}{:>12.1%}'.format('street {}'.format(street), np.mean(times[street]) * 1e6,
+                                                 found[street] / len(times[street])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+'''
+Benchmarks the conversation player_chatbot sends to the chat model over a match.
+
+Random rounds are played through the same kind of messages the bot writes, and
+the requests go to mock_chat_server.py, started in-process. The old full history
+sends every earlier message with every request. ChatContext sends the rules
+preamble, a summary and a bounded window of recent rounds. For each, it reports
+request sizes and latency at the start and end of the match and how many
+requests the reply cache saved.
+
+Then random decisions are made through AsyncChat against servers of growing
+latency where a share of requests stall, once with a fixed per-decision deadline
+and once the way player_chatbot plays under the game clock: one decision per round
+over the last rounds of a match, each depositing its TimeBudget into a ClockBank
+that asks the model once enough is saved. For each it reports how often the
+model answered in time, how many requests were skipped while others were still
+running, the mean and worst wall time of a decision, including the local fallback
+policy, and for the clock bank the game clock used and left.
+
+Usage: python bench_chatbot.py [--rounds N] [--latency MS] [--per-kb MS] [--max-rounds R] [--deadline MS] [--min-wait S]
+'''
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'player_chatbot'))
+from context import ChatContext, decision_key
+from fallback import AsyncChat, ClockBank, describe, fallback_action, parse_reply
+from skeleton.actions import CallAction, CheckAction, FoldAction, RaiseAction
+from skeleton.clock import Deadline, TimeBudget
+from skeleton.equity import CARD_CODES
+from skeleton.states import BIG_BLIND, NUM_ROUNDS, SMALL_BLIND, STARTING_STACK, GameState, RoundState
+from mock_chat_server import MockChatServer
+
+PREAMBLE = [
+    {'role': 'system', 'content': 'You are an expert Poker player who is also good at playing different variants.'},
+    {'role': 'user', 'content': 'I want you to play a variant of Poker with me. ' * 40},
+    {'role': 'assistant', 'content': 'Of course, let\'s play this variant of Poker. ' * 6},
+]
+
+
+def round_messages(rng):
+    '''
+    Returns the user messages of one random round, written like player_chatbot's, the
+    decision_key of each decision message, and the round's delta.
+    '''
+    cards = rng.sample(CARD_CODES, 7)
+    messages = []
+    keys = []
+    stack = 490
+    big_blind = rng.random() < 0.5
+    for street in (0, 2, 4)[:rng.randint(1, 3)]:
+        message = ('You are big blind!' if street == 0 and big_blind else '') + \
+            ' Your current cards are: ' + ', '.join(cards[:3]) + '.'
+        message += ' The visible community cards are: ' + ', '.join(cards[3:3 + street]) + '.' if street else \
+            ' There are no visible community cards.'
+        message += ' Your current contribution to the pot is {}. Your remaining stack is {}.'.format(500 - stack, stack)
+        message += ' Your legal actions are: Raise, Fold, Call.'
+        messages.append(message)
+        keys.append(decision_key(cards[:3], cards[3:3 + street], big_blind, 500 - stack, 0,
+                                 (RaiseAction, FoldAction, CallAction)))
+        stack -= rng.choice((0, 10, 20, 40))
+    delta = rng.choice((-1, 1)) * (500 - stack)
+    messages.append(' This round, your bankroll changed by {}! Onto the next round - Say yes to continue.'.format(delta))
+    return messages, keys, delta
+
+
+def post(api_base, messages, timeout=None):
+    '''
+    Sends one chat completion request, with the same body the OpenAI client sends, and returns the reply and body size.
+    The request gives up after timeout seconds, if given.
+    '''
+    body = json.dumps({'model': 'gpt-4-1106-preview', 'messages': messages}).encode()
+    request = urllib.request.Request(api_base + '/chat/completions', data=body,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.load(response)['choices'][0]['message']['content'], len(body)
+
+
+def random_decisions(count, rng):
+    '''
+    Plays random hands, calling or checking through, and returns the RoundState of every decision.
+    '''
+    decisions = []
+    while len(decisions) < count:
+        cards = rng.sample(CARD_CODES, 10)
+        round_state = RoundState(0, 0, [SMALL_BLIND, BIG_BLIND], [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND],
+                                 [cards[:3], cards[3:6]], cards[6:], None)
+        while isinstance(round_state, RoundState):
+            decisions.append(round_state)
+            action = CallAction() if CallAction in round_state.legal_actions() else CheckAction()
+            round_state = round_state.proceed(action)
+    return decisions[:count]
+
+
+def run(rounds, api_base, context, seed):
+    '''
+    Plays the rounds with the full history if context is None, or through a ChatContext,
+    which records the end-of-round acknowledgement without a request. Returns the size in bytes and latency in seconds of every request sent.
+    '''
+    rng = random.Random(seed)
+    history = list(PREAMBLE)
+    sizes = []
+    latencies = []
+
+    def chat(messages):
+        start = time.perf_counter()
+        reply, size = post(api_base, messages)
+        latencies.append(time.perf_counter() - start)
+        sizes.append(size)
+        return reply
+
+    for _ in range(rounds):
+        messages, keys, delta = round_messages(rng)
+        if context is not None:
+            context.new_round()
+        for index, message in enumerate(messages):
+            if index == len(messages) - 1 and context is not None:
+                context.end_round(delta, False)
+            if context is None:
+                history.append({'role': 'user', 'content': message})
+                history.append({'role': 'assistant', 'content': chat(history)})
+            elif index == len(messages) - 1:
+                context.record(message, 'Yes')
+            else:
+                context.ask(chat, message, key=keys[index])
+    return np.array(sizes), np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python bench_chatbot.py')
+    parser.add_argument('--rounds', type=int, default=100, help='Rounds to play')
+    parser.add_argument('--latency', type=float, default=20, help='Mock server delay per response in ms')
+    parser.add_argument('--per-kb', type=float, default=2, help='Mock server delay per KB of request in ms')
+    parser.add_argument('--max-rounds', type=int, default=3, help='Rounds ChatContext keeps in full')
+    parser.add_argument('--deadline', type=float, default=150, help='Fixed per-decision deadline of the model in ms')
+    parser.add_argument('--min-wait', type=float, default=0.5,
+                        help='Clock in s the clock bank saves before asking the model, like LLM_MIN_WAIT')
+    parser.add_argument('--latencies', type=float, nargs='+', default=[20, 100, 400],
+                        help='Mock server latencies to make decisions against, in ms')
+    parser.add_argument('--stall-fraction', type=float, default=0.1, help='Share of requests that stall for 5 s')
+    parser.add_argument('--decisions', type=int, default=100, help='Decisions per latency')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockChatServer(0, args.latency / 1e3, args.per_kb / 1e3).start()
+    print('{:<16}{:>10}{:>12}{:>12}{:>14}{:>14}{:>12}'.format(
+        'context', 'requests', 'first B', 'last B', 'first 10 ms', 'last 10 ms', 'total s'))
+    for name, context in (('full history', None), ('ChatContext', ChatContext(PREAMBLE, max_rounds=args.max_rounds))):
+        start = time.perf_counter()
+        sizes, latencies = run(args.rounds, server.api_base, context, args.seed)
+        print('{:<16}{:>10}{:>12}{:>12}{:>14.1f}{:>14.1f}{:>12.1f}'.format(
+            name, len(sizes), sizes[0], sizes[-1], latencies[:10].mean() * 1e3, latencies[-10:].mean() * 1e3,
+            time.perf_counter() - start))
+        if context is not None:
+            print('  {}'.format(context.cache))
+    server.shutdown()
+
+    decisions = random_decisions(args.decisions, random.Random(args.seed))
+    print('{:<16}{:>12}{:>12}{:>12}{:>12}{:>12}{:>12}{:>12}'.format(
+        'server ms', 'deadline', 'answered', 'skipped', 'mean ms', 'max ms', 'clock s', 'left s'))
+    for latency in args.latencies:
+        server = MockChatServer(0, latency / 1e3, args.per_kb / 1e3, args.stall_fraction, stall=5.).start()
+        for bank in (None, ClockBank(args.min_wait)):
+            llm = AsyncChat(lambda messages, timeout: post(server.api_base, messages, timeout)[0])
+            context = ChatContext(PREAMBLE, max_rounds=args.max_rounds)
+            time_budget = TimeBudget()
+            time_budget.sync(180.)
+            # the clock the last len(decisions) rounds of a 180 s match have left at an even pace
+            game_clock = time_budget.reserve + len(decisions) * (time_budget.overhead_per_round +
+                                                                 time_budget.spendable(1) / NUM_ROUNDS)
+            start_clock = game_clock
+            times = []
+            for index, round_state in enumerate(decisions):
+                active = round_state.button % 2
+                context.new_round()
+                start = time.perf_counter()
+                if bank is None:
+                    budget = deadline = Deadline(args.deadline / 1e3)
+                else:
+                    time_budget.sync(game_clock)
+                    budget = time_budget.deadline(GameState(0, game_clock, NUM_ROUNDS - len(decisions) + index + 1),
+                                                  round_state)
+                    bank.deposit(budget.remaining())
+                    deadline = bank.deadline()
+                context.ask(lambda messages: llm.ask(messages, deadline) if deadline is not None else None,
+                            'Your current cards are: {}. Your legal actions are: {}.'.format(
+                                ', '.join(round_state.hands[active]),
+                                ', '.join(action.__name__[:-len('Action')] for action in round_state.legal_actions())),
+                            lambda: describe(fallback_action(round_state, active, budget)),
+                            lambda reply: parse_reply(reply, round_state) is not None)
+                elapsed = time.perf_counter() - start
+                if bank is not None:
+                    bank.spend(elapsed)
+                game_clock -= elapsed
+                times.append(elapsed)
+            print('{:<16.0f}{:>12}{:>12.1%}{:>12}{:>12.1f}{:>12.1f}{:>12.2f}{:>12.2f}'.format(
+                latency, 'clock bank' if bank else '{:.0f} ms'.format(args.deadline), llm.answered / len(decisions),
+                llm.skipped, np.mean(times) * 1e3, np.max(times) * 1e3, start_clock - game_clock, game_clock))
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
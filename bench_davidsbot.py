@@ -0,0 +1,83 @@
+'''
+Benchmarks davidsbot's Monte Carlo trials before and after the move to the batched evaluator.
+
+The old trial enumerated every 5-card subset of each hand with a recursive
+get_combinations and scored each with eval7.evaluate; it is reproduced here as
+the baseline. The new path is skeleton/equity.py's sample_outcomes, which scores
+a whole batch of 7-card hands with a few NumPy operations.
+
+Usage: python bench_davidsbot.py [--spots N] [--trials T]
+'''
+import argparse
+import os
+import random
+import sys
+import time
+
+import eval7
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'davidsbot'))
+from skeleton.equity import CARD_CODES, sample_outcomes
+
+
+def get_combinations(cards, n):
+    if n == 1:
+        return [[card] for card in cards]
+    combinations = []
+    for i in range(len(cards)):
+        for sub_comb in get_combinations(cards[i+1:], n-1):
+            combinations.append([cards[i]] + sub_comb)
+    return combinations
+
+
+def old_trials(hole_cards, community_cards, num_trials):
+    '''
+    davidsbot's original monte_carlo_simulation loop.
+    '''
+    hole_cards = [eval7.Card(card) for card in hole_cards]
+    community_cards = [eval7.Card(card) for card in community_cards]
+    deck = [eval7.Card(rank + suit) for rank in "23456789TJQKA" for suit in "shdc"]
+    used_cards = set(hole_cards + community_cards)
+    deck = [card for card in deck if card not in used_cards]
+    outcomes = []
+    for _ in range(num_trials):
+        random.shuffle(deck)
+        opponent_hole = deck[:3]
+        remaining_board = deck[3: 5 - len(community_cards)]
+        full_board = community_cards + remaining_board
+        my_best = max(get_combinations(hole_cards + full_board, 5), key=eval7.evaluate)
+        opp_best = max(get_combinations(opponent_hole + full_board, 5), key=eval7.evaluate)
+        outcomes.append(eval7.evaluate(my_best) > eval7.evaluate(opp_best))
+    return sum(outcomes) / len(outcomes)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python bench_davidsbot.py')
+    parser.add_argument('--spots', type=int, default=30, help='Random spots per street')
+    parser.add_argument('--trials', type=int, default=500, help='Trials per spot')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    np_rng = np.random.default_rng(args.seed)
+    print('{:<8}{:>16}{:>16}{:>10}'.format('street', 'old trials/s', 'new trials/s', 'speedup'))
+    for street in (0, 2, 4):
+        spots = []
+        for _ in range(args.spots):
+            cards = rng.sample(CARD_CODES, 3 + street)
+            spots.append((cards[:3], cards[3:]))
+        start = time.perf_counter()
+        for hole, board in spots:
+            old_trials(hole, board, args.trials)
+        old_rate = args.spots * args.trials / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for hole, board in spots:
+            sample_outcomes(hole, board, args.trials, np_rng).mean()
+        new_rate = args.spots * args.trials / (time.perf_counter() - start)
+        print('{:<8}{:>16,.0f}{:>16,.0f}{:>9.0f}x'.format(street, old_rate, new_rate, new_rate / old_rate))
+
+
+if __name__ == '__main__':
+    main()
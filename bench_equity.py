@@ -0,0 +1,123 @@
+'''
+Benchmarks skeleton/equity.py river equity against eval7 Monte Carlo sampling.
+
+For random river spots (3 hole cards, 4 board cards) it compares the exact
+vectorized enumeration with a 500-sample eval7 loop like the bots used to run,
+reporting time per call and the sampling error. A few spots are also checked
+against a full eval7 enumeration to confirm the exact numbers. Range equity from
+skeleton/ranges.py is timed on the same spots.
+
+Usage: python bench_equity.py [--spots N] [--samples S]
+'''
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+import eval7
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'python_skeleton'))
+from skeleton import equity as skeleton_equity
+from skeleton import ranges
+
+
+def eval7_sampled(hole, board, samples, rng):
+    '''
+    The bots' original approach: shuffle a deck and evaluate each sample with eval7.
+    '''
+    hole = [eval7.Card(card) for card in hole]
+    board = [eval7.Card(card) for card in board]
+    deck = [card for card in eval7.Deck().cards if card not in hole and card not in board]
+    my_score = eval7.evaluate(hole + board)
+    wins = 0.
+    for _ in range(samples):
+        rng.shuffle(deck)
+        opp_score = eval7.evaluate(deck[:3] + board)
+        if my_score > opp_score:
+            wins += 1
+        elif my_score == opp_score:
+            wins += 0.5
+    return wins / samples
+
+
+def eval7_exact(hole, board):
+    '''
+    Full enumeration of the opponent's holdings with eval7, used as ground truth.
+    '''
+    hole = [eval7.Card(card) for card in hole]
+    board = [eval7.Card(card) for card in board]
+    deck = [card for card in eval7.Deck().cards if card not in hole and card not in board]
+    my_score = eval7.evaluate(hole + board)
+    wins = count = 0
+    for opponent in itertools.combinations(deck, 3):
+        opp_score = eval7.evaluate(list(opponent) + board)
+        wins += 2 if my_score > opp_score else my_score == opp_score
+        count += 1
+    return wins / 2 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python bench_equity.py')
+    parser.add_argument('--spots', type=int, default=200, help='Random river spots to time')
+    parser.add_argument('--samples', type=int, default=500, help='eval7 samples per spot')
+    parser.add_argument('--verify', type=int, default=5, help='Spots checked against full eval7 enumeration')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    spots = []
+    for _ in range(args.spots):
+        cards = rng.sample(skeleton_equity.CARD_CODES, 7)
+        spots.append((cards[:3], cards[3:]))
+
+    for hole, board in spots[:args.verify]:
+        exact = eval7_exact(hole, board)
+        ours = skeleton_equity.river_equity(hole, board)
+        assert abs(exact - ours) < 1e-12, (hole, board, exact, ours)
+    print('exact equity matches full eval7 enumeration on {} spots'.format(args.verify))
+
+    skeleton_equity.river_scores.cache_clear()
+    start = time.perf_counter()
+    exact = [skeleton_equity.river_equity(hole, board) for hole, board in spots]
+    exact_time = (time.perf_counter() - start) / len(spots)
+
+    # later decisions on the same board reuse its cached holding scores
+    reused_time = 0.
+    for hole, board in spots:
+        skeleton_equity.river_equity(hole, board)
+        start = time.perf_counter()
+        skeleton_equity.river_equity(hole, board)
+        reused_time += (time.perf_counter() - start) / len(spots)
+
+    start = time.perf_counter()
+    sampled = [eval7_sampled(hole, board, args.samples, rng) for hole, board in spots]
+    sampled_time = (time.perf_counter() - start) / len(spots)
+
+    errors = np.abs(np.array(sampled) - np.array(exact))
+    print('{:<34}{:>12}{:>14}{:>14}'.format('method', 'ms/call', 'mean |error|', 'max |error|'))
+    print('{:<34}{:>12.3f}{:>14.4f}{:>14.4f}'.format('exact, new board', exact_time * 1e3, 0., 0.))
+    print('{:<34}{:>12.3f}{:>14.4f}{:>14.4f}'.format('exact, same board again', reused_time * 1e3, 0., 0.))
+    print('{:<34}{:>12.3f}{:>14.4f}{:>14.4f}'.format('eval7, {} samples'.format(args.samples),
+                                                      sampled_time * 1e3, errors.mean(), errors.max()))
+
+    # the same spots against a narrowed range, and whole ranges against each other
+    narrowed = ranges.top_range(0.3)
+    np_rng = np.random.default_rng(args.seed)
+    start = time.perf_counter()
+    for hole, board in spots:
+        ranges.range_equity(hole, board[:2], narrowed, args.samples, np_rng)
+    flop_range_time = (time.perf_counter() - start) / len(spots)
+    start = time.perf_counter()
+    for hole, board in spots[:20]:
+        ranges.river_range_equity(board, narrowed, narrowed)
+    range_range_time = (time.perf_counter() - start) / min(20, len(spots))
+    print('{:<34}{:>12.3f}'.format('flop vs top 30%, {} samples'.format(args.samples), flop_range_time * 1e3))
+    print('{:<34}{:>12.3f}'.format('river, top 30% vs top 30%', range_range_time * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+'''
+Micro-benchmark for the skeleton Runner's per-message overhead.
+
+Records the exact message stream the engine would send one player over a
+number of random rounds, then replays it through skeleton.runner.Runner with a
+bot that does no work, so the reported time is pure parsing and state upkeep.
+
+Usage: python bench_runner.py [--rounds N] [--repeat R] [--bot python_skeleton]
+'''
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.getcwd())
+import engine
+
+
+class RecordingPlayer():
+    '''
+    Stands in for engine.Player, recording messages and playing random legal actions.
+    '''
+
+    def __init__(self, name, rng):
+        self.name = name
+        self.rng = rng
+        self.bankroll = 0
+        self.messages = []
+
+    def query(self, round_state, player_message, game_log):
+        player_message[0] = 'T{:.3f}'.format(180.0 - len(self.messages) * 1e-3)
+        self.messages.append(' '.join(player_message) + '\n')
+        del player_message[1:]
+        if not isinstance(round_state, engine.RoundState):
+            return engine.CheckAction()
+        action = self.rng.choice(sorted(round_state.legal_actions(), key=lambda action: action.__name__))
+        if action is engine.RaiseAction:
+            min_raise, max_raise = round_state.raise_bounds()
+            return engine.RaiseAction(self.rng.randint(min_raise, max_raise))
+        return action()
+
+
+class ReplayFile():
+    '''
+    A socketfile that serves recorded lines and discards writes.
+    '''
+
+    def __init__(self, lines):
+        self.lines = iter(lines)
+
+    def readline(self):
+        return next(self.lines, '')
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+def record(rounds, seed):
+    '''
+    Returns the message stream the engine sends player A over the given rounds.
+    '''
+    rng = random.Random(seed)
+    random.seed(seed)
+    game = engine.Game()
+    players = [RecordingPlayer('A', rng), RecordingPlayer('B', rng)]
+    for _ in range(rounds):
+        game.run_round(players)
+        players = players[::-1]
+    recorded = [player for player in players if player.name == 'A'][0]
+    return recorded.messages + ['Q\n']
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python bench_runner.py')
+    parser.add_argument('--rounds', type=int, default=5000, help='Rounds of messages to record')
+    parser.add_argument('--repeat', type=int, default=5, help='Replays to time; the best is reported')
+    parser.add_argument('--bot', type=str, default='python_skeleton', help='Bot directory whose skeleton is timed')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    messages = record(args.rounds, args.seed)
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), args.bot))
+    from skeleton.actions import CheckAction
+    from skeleton.bot import Bot
+    from skeleton.runner import Runner
+
+    class NullBot(Bot):
+        def handle_new_round(self, game_state, round_state, active):
+            pass
+
+        def handle_round_over(self, game_state, terminal_state, active):
+            pass
+
+        def get_action(self, game_state, round_state, active):
+            return CheckAction()
+
+    best = float('inf')
+    for _ in range(args.repeat):
+        runner = Runner(NullBot(), ReplayFile(messages))
+        start = time.perf_counter()
+        runner.run()
+        best = min(best, time.perf_counter() - start)
+    clauses = sum(message.count(' ') + 1 for message in messages)
+    print('{} messages, {} clauses over {} rounds'.format(len(messages), clauses, args.rounds))
+    print('total {:.1f} ms, {:.2f} us/message, {:.2f} us/clause'.format(
+        best * 1e3, best / len(messages) * 1e6, best / clauses * 1e6))
+
+
+if __name__ == '__main__':
+    main()
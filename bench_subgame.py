@@ -0,0 +1,92 @@
+'''
+Benchmarks skeleton/subgame.py under per-decision deadlines.
+
+Random flop and river spots where the opponent bets into a raised pot are
+solved once with a generous deadline as a reference, then again under each
+deadline. For every deadline it reports the mean and worst wall time of solve(),
+the CFR+ iterations that fit, how many solves were skipped as not fitting, and
+how often the action matches the reference.
+
+Usage: python bench_subgame.py [--spots N] [--deadlines MS ...]
+'''
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'python_skeleton'))
+from skeleton import subgame
+from skeleton.actions import CallAction, CheckAction, RaiseAction
+from skeleton.clock import Deadline
+from skeleton.equity import CARD_CODES
+from skeleton.states import BIG_BLIND, SMALL_BLIND, STARTING_STACK, RoundState
+
+
+class RecordingSubgame(subgame.Subgame):
+    '''
+    Remembers the last subgame solve() built, to read how many iterations it ran.
+    '''
+    last = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        RecordingSubgame.last = self
+
+
+def random_spot(street, rng):
+    '''
+    Returns a RoundState where the player to act faces a bet on the given street (2 or 4).
+    '''
+    cards = rng.sample(CARD_CODES, 10)
+    round_state = RoundState(0, 0, [SMALL_BLIND, BIG_BLIND], [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND],
+                             [cards[:3], cards[3:6]], cards[6:], None)
+    round_state = round_state.proceed(RaiseAction(rng.choice((30, 40, 60)))).proceed(CallAction())
+    if street == 4:
+        round_state = round_state.proceed(CheckAction()).proceed(CheckAction())
+    return round_state.proceed(RaiseAction(rng.choice((20, 40, 80))))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python bench_subgame.py')
+    parser.add_argument('--spots', type=int, default=40, help='Random spots per street')
+    parser.add_argument('--deadlines', type=float, nargs='+', default=[10, 15, 60, 250], help='Deadlines in ms')
+    parser.add_argument('--reference', type=float, default=2000, help='Deadline of the reference solve in ms')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    subgame.warm()
+    subgame.Subgame = RecordingSubgame
+    print('{:<8}{:>12}{:>12}{:>12}{:>12}{:>12}{:>12}'.format('street', 'deadline', 'mean ms', 'max ms', 'iterations',
+                                                             'skipped', 'agreement'))
+    for street in (2, 4):
+        spots = [random_spot(street, rng) for _ in range(args.spots)]
+        # the same runout seeds for every deadline; shorter ones sample a prefix of the runouts
+        reference = [subgame.solve(spot, spot.button % 2, Deadline(args.reference / 1e3), rng=np.random.default_rng(index))
+                     for index, spot in enumerate(spots)]
+        for milliseconds in args.deadlines:
+            times = []
+            iterations = []
+            agree = 0
+            skipped = 0
+            for index, spot in enumerate(spots):
+                RecordingSubgame.last = None
+                deadline = Deadline(milliseconds / 1e3)
+                start = time.perf_counter()
+                action = subgame.solve(spot, spot.button % 2, deadline, rng=np.random.default_rng(index))
+                times.append(time.perf_counter() - start)
+                # a solve that did not fit is skipped before its Subgame is built
+                iterations.append(RecordingSubgame.last.iterations if RecordingSubgame.last is not None else 0)
+                agree += action == reference[index]
+                skipped += action is None
+            print('{:<8}{:>12.0f}{:>12.1f}{:>12.1f}{:>12.0f}{:>12}{:>12.1%}'.format(
+                street, milliseconds, np.mean(times) * 1e3, np.max(times) * 1e3, np.mean(iterations), skipped,
+                agree / len(spots)))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,10 +6,10 @@ from skeleton.states import GameState, TerminalState, RoundState
 from skeleton.states import NUM_ROUNDS, STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from skeleton.bot import Bot
 from skeleton.runner import parse_args, run_bot
+from skeleton.sampling import adaptive_mean
+from skeleton.equity import sample_outcomes
 
-import random
-import eval7
-import time
+import numpy as np
 
 
 class Player(Bot):
@@ -21,45 +21,28 @@ class Player(Bot):
         u = 4
         return 100 * (x / 100) ** u * multiplier
 
-    def get_combinations(self, cards, n):
-        """Generate all combinations of n cards from the list of cards."""
-        if n == 1:
-            return [[card] for card in cards]
-        
-        combinations = []
-        for i in range(len(cards)):
-            for sub_comb in self.get_combinations(cards[i+1:], n-1):
-                combinations.append([cards[i]] + sub_comb)
-        return combinations
-
-    def monte_carlo_simulation(self, hole_cards, community_cards, num_trials=500):
-        deck = [eval7.Card(rank + suit) for rank in "23456789TJQKA" for suit in "shdc"]
-        used_cards = set(hole_cards + community_cards)
-
-        # Remove used cards from the deck
-        deck = [card for card in deck if card not in used_cards]
-
-        wins = 0
-
-        for _ in range(num_trials):
-            random.shuffle(deck)
-            opponent_hole = deck[:3]  # Opponent's 3 hole cards (like player)
-            remaining_board = deck[3: 5 - len(community_cards)]  # Fill in the board
-
-            full_board = community_cards + remaining_board
+    def monte_carlo_simulation(self, hole_cards, community_cards, num_trials=2000, deadline=None, thresholds=()):
+        '''
+        Estimates the win probability, stopping early once the decision is clear.
 
-            # Get all 5-card combinations for both hands
-            my_combinations = self.get_combinations(hole_cards + full_board, 5)
-            opp_combinations = self.get_combinations(opponent_hole + full_board, 5)
+        Each batch of trials deals the opponent's hole cards and the rest of the board
+        and scores all of the 7-card hands at once with the skeleton's vectorized
+        evaluator (ties count half).
 
-            # Evaluate the best hand for both the player and the opponent
-            my_best = max(my_combinations, key=eval7.evaluate)
-            opp_best = max(opp_combinations, key=eval7.evaluate)
+        Returns:
+        A sampling.Estimate; its samples field is the number of trials run.
+        '''
+        def trials(count):
+            return sample_outcomes(hole_cards, community_cards, count, self.rng)
 
-            if eval7.evaluate(my_best) > eval7.evaluate(opp_best):
-                wins += 1
+        # stop once no threshold is inside the confidence interval, or before the deadline
+        return adaptive_mean(trials, thresholds, deadline, batch=250, min_samples=250, max_samples=num_trials)
 
-        return wins / num_trials  # Win probability
+    def break_even(self, chips, multiplier, my_stack):
+        '''
+        The win percentage at which my_stack * regression_line_val(100 * win_percentage, multiplier) reaches chips.
+        '''
+        return (chips / (100 * multiplier * my_stack)) ** 0.25
 
 
     def __init__(self):
@@ -72,7 +55,7 @@ class Player(Bot):
         Returns:
         Nothing.
         '''
-        pass
+        self.rng = np.random.default_rng()
 
     def handle_new_round(self, game_state, round_state, active):
         '''
@@ -137,11 +120,6 @@ class Player(Bot):
         my_contribution = STARTING_STACK - my_stack  # the number of chips you have contributed to the pot
         opp_contribution = STARTING_STACK - opp_stack  # the number of chips your opponent has contributed to the pot
         
-        my_cards_card_form = [eval7.Card(card) for card in my_cards]
-        board_cards_card_form = [eval7.Card(card) for card in board_cards]
-        
-        win_percentage = self.monte_carlo_simulation(my_cards_card_form, board_cards_card_form)
-
         # actions; RaiseAction, CallAction, CheckAction, FoldAction
 
         raise_multipler = 0.26
@@ -160,6 +138,17 @@ class Player(Bot):
         if(street == 5):
             call_multiplier = 2.0
 
+        # the win percentages at which the choice between fold, call, check and raise flips
+        thresholds = []
+        if my_stack > 0:
+            thresholds = [self.break_even(opp_pip, call_multiplier, my_stack),
+                          self.break_even(opp_pip, raise_multipler, my_stack),
+                          self.break_even(my_pip, raise_multipler, my_stack)]
+
+        deadline = self.time_budget.deadline(game_state, round_state)
+        estimate = self.monte_carlo_simulation(my_cards, board_cards, deadline=deadline, thresholds=thresholds)
+        win_percentage = estimate.mean
+
         raise_amount_total = my_stack * self.regression_line_val(100 * win_percentage, raise_multipler)
         call_max_total = my_stack * self.regression_line_val(100 * win_percentage, call_multiplier)
 
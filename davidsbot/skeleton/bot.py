@@ -6,8 +6,34 @@ This file contains the base class that you should implement for your pokerbot.
 class Bot():
     '''
     The base class for a pokerbot.
+
+    While the bot runs, self.time_budget holds the skeleton's TimeBudget (see
+    skeleton/clock.py), which turns the remaining game clock into per-decision deadlines,
+    and self.deferred holds a DeferredQueue (see skeleton/deferred.py): work passed to
+    self.deferred.submit(function, *args) runs while the opponent is thinking.
     '''
 
+    def ponder(self, game_state, round_state, active, task):
+        '''
+        Optional. Override to do work on a background thread while the opponent
+        thinks, which the engine does not charge to your game clock. Called after
+        every response the runner sends, and cancelled as soon as the engine's next
+        message arrives. The result is then available to the next handler as
+        self.ponder_result (None if nothing was published). It never runs at the
+        same time as a job from self.deferred.
+
+        Arguments:
+        game_state: the GameState object.
+        round_state: the RoundState object, or a TerminalState after a round ends.
+        active: your player's index.
+        task: a PonderTask. Poll task.cancelled() often and return promptly once it
+            is True; task.publish(result) hands over partial results early.
+
+        Returns:
+        An optional result, published as if by task.publish.
+        '''
+        return None
+
     def handle_new_round(self, game_state, round_state, active):
         '''
         Called when a new round starts. Called NUM_ROUNDS times.
@@ -0,0 +1,50 @@
+'''
+A bounded least-recently-used cache that counts its hits and misses.
+'''
+import collections
+
+
+class LRUCache():
+    '''
+    Maps keys to values, evicting the least recently used entry once maxsize is reached.
+    '''
+
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, compute):
+        '''
+        Returns the value cached for key, calling compute() to fill it in on a miss.
+        '''
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            value = self.entries[key] = compute()
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+            return value
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def clear(self):
+        '''
+        Drops every entry and resets the statistics.
+        '''
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return 'LRUCache(hits={}, misses={}, size={}/{}, hit_rate={:.1%})'.format(
+            self.hits, self.misses, len(self.entries), self.maxsize, self.hit_rate())
@@ -0,0 +1,313 @@
+'''
+Vectorized hand evaluation and equity for B4G Hold'em (3 hole cards, 4 board cards).
+
+Cards are indexed as rank * 4 + suit and a set of cards is a 52-bit integer mask,
+so whole batches of hands are evaluated with a handful of NumPy operations.
+Scores only need to order hands: a higher score beats a lower one.
+'''
+import functools
+import itertools
+import os
+import numpy as np
+
+from .cache import LRUCache
+from .canonical import canonical
+from .sampling import Estimate, adaptive_mean
+
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+HOLE_SIZE = 3
+BOARD_SIZE = 4
+CARD_INDEX = {rank + suit: RANKS.index(rank) * 4 + SUITS.index(suit) for rank in RANKS for suit in SUITS}
+CARD_CODES = sorted(CARD_INDEX, key=CARD_INDEX.get)
+CARD_BITS = np.left_shift(np.int64(1), np.arange(52, dtype=np.int64))
+
+# every possible 3-card holding in colexicographic order, so COMBOS[combo_index(cards)] == sorted(cards)
+COMBOS = np.array(sorted(itertools.combinations(range(52), HOLE_SIZE), key=lambda combo: combo[::-1]), dtype=np.int64)
+COMBO_MASKS = np.bitwise_or.reduce(CARD_BITS[COMBOS], axis=1)
+
+NIBBLE_LOW = np.int64(0x1111111111111)
+PAIR_BITS = np.int64(0x5555555555555)
+QUAD_BITS = np.int64(0x3333333333333)
+
+# written by gen_preflop_table.py: equity * PREFLOP_SCALE as uint16, indexed by combo_index
+PREFLOP_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.npy')
+PREFLOP_SCALE = 65535
+
+HIGH_CARD, PAIR, TWO_PAIR, TRIPS, STRAIGHT, FLUSH, FULL_HOUSE, QUADS, STRAIGHT_FLUSH = range(9)
+
+
+def _rank_tables():
+    '''
+    Builds lookup tables indexed by a 13-bit rank mask.
+    '''
+    masks = np.arange(1 << 13, dtype=np.int64)
+    popcount = np.zeros_like(masks)
+    top1 = np.zeros_like(masks)
+    for rank in range(13):
+        has = (masks >> rank) & 1
+        popcount += has
+        top1 = np.where(has == 1, 1 << rank, top1)
+    top = {1: top1}
+    rest, kept = masks.copy(), np.zeros_like(masks)
+    for count in range(1, 6):
+        highest = top1[rest]
+        kept |= highest
+        rest &= ~highest
+        top[count] = kept.copy()
+    straight = np.zeros_like(masks)
+    for high in range(12, 3, -1):
+        window = 0x1f << (high - 4)
+        straight = np.where((straight == 0) & ((masks & window) == window), high + 1, straight)
+    wheel = (1 << 12) | 0xf
+    straight = np.where((straight == 0) & ((masks & wheel) == wheel), 4, straight)
+    return popcount, top, straight
+
+
+POPCOUNT, TOP, STRAIGHT_HIGH = _rank_tables()
+
+
+def _compress(bits):
+    '''
+    Packs bits found at positions 0, 4, ..., 48 into a 13-bit rank mask.
+    '''
+    bits = (bits | (bits >> 3)) & np.int64(0x0303030303030303)
+    bits = (bits | (bits >> 6)) & np.int64(0x000F000F000F000F)
+    bits = (bits | (bits >> 12)) & np.int64(0x000000FF000000FF)
+    return (bits | (bits >> 24)) & 0xFFFF
+
+
+def parse_cards(cards):
+    '''
+    Converts card codes like 'As' (or eval7.Card objects) to card indices.
+    '''
+    return [CARD_INDEX[str(card)] for card in cards]
+
+
+def combo_index(indices):
+    '''
+    Returns the position in COMBOS of a 3-card holding given as card indices.
+    '''
+    low, middle, high = sorted(indices)
+    return low + middle * (middle - 1) // 2 + high * (high - 1) * (high - 2) // 6
+
+
+def cards_mask(cards):
+    '''
+    Returns the 52-bit mask of a list of card codes.
+    '''
+    mask = 0
+    for index in parse_cards(cards):
+        mask |= 1 << index
+    return mask
+
+
+def evaluate_masks(masks):
+    '''
+    Scores an array of card masks (up to 7 cards each) with standard poker rules.
+
+    Returns:
+    An int64 array; comparing two scores compares the best 5-card hands.
+    '''
+    masks = np.asarray(masks, dtype=np.int64)
+    counts = (masks & PAIR_BITS) + ((masks >> 1) & PAIR_BITS)
+    counts = (counts & QUAD_BITS) + ((counts >> 2) & QUAD_BITS)  # each nibble holds its rank's count
+    has1 = _compress((counts | (counts >> 1) | (counts >> 2)) & NIBBLE_LOW)
+    has2 = _compress(((counts >> 1) | (counts >> 2)) & NIBBLE_LOW)
+    has3 = _compress(((counts & (counts >> 1)) | (counts >> 2)) & NIBBLE_LOW)
+    has4 = _compress((counts >> 2) & NIBBLE_LOW)
+
+    # with at most 7 cards only one suit can make a flush, so only that suit is compressed
+    flush_shift = np.zeros_like(masks)
+    has_flush = np.zeros(masks.shape, dtype=bool)
+    with np.errstate(over='ignore'):  # the bits carried past bit 63 are not needed
+        for shift in range(4):
+            # multiplying nibble-spaced bits by NIBBLE_LOW sums them into the top nibble
+            suited = (((((masks >> shift) & NIBBLE_LOW) * NIBBLE_LOW) >> 48) & 0xF) >= 5
+            flush_shift += shift * suited
+            has_flush |= suited
+    flush = np.where(has_flush, _compress((masks >> flush_shift) & NIBBLE_LOW), 0)
+
+    top1, top2, top3, top5 = TOP[1], TOP[2], TOP[3], TOP[5]
+    straight_flush = STRAIGHT_HIGH[flush]
+    straight = STRAIGHT_HIGH[has1]
+    trips = top1[has3]
+    pairs = top2[has2]
+    full_kicker = top1[has2 & ~trips]
+
+    # start from high card and let each stronger category that applies override it
+    score = top5[has1] << 13
+    score = np.where(has2 > 0, (PAIR << 26) | (has2 << 13) | top3[has1 & ~has2], score)
+    score = np.where(POPCOUNT[has2] >= 2, (TWO_PAIR << 26) | (pairs << 13) | top1[has1 & ~pairs], score)
+    score = np.where(trips > 0, (TRIPS << 26) | (trips << 13) | top2[has1 & ~trips], score)
+    score = np.where(straight > 0, (STRAIGHT << 26) | (straight << 13), score)
+    score = np.where(flush > 0, (FLUSH << 26) | (top5[flush] << 13), score)
+    score = np.where((trips > 0) & (full_kicker > 0), (FULL_HOUSE << 26) | (trips << 13) | full_kicker, score)
+    score = np.where(has4 > 0, (QUADS << 26) | (has4 << 13) | top1[has1 & ~has4], score)
+    return np.where(straight_flush > 0, (STRAIGHT_FLUSH << 26) | (straight_flush << 13), score)
+
+
+def evaluate(cards):
+    '''
+    Scores a single hand given as card codes.
+    '''
+    return int(evaluate_masks(np.array([cards_mask(cards)]))[0])
+
+
+@functools.lru_cache(maxsize=16)
+def river_scores(board_mask):
+    '''
+    Scores every holding in COMBOS together with a complete board, in one pass.
+
+    The board is shared by every holding, so the result is cached per board and
+    reused by every river decision and range computation on it. Holdings that
+    contain a board card score -1.
+    '''
+    scores = evaluate_masks(COMBO_MASKS | board_mask)
+    scores[(COMBO_MASKS & board_mask) != 0] = -1
+    return scores
+
+
+def river_equity(hole, board, weights=None):
+    '''
+    Exact equity once all 4 board cards are known, against every opponent holding.
+
+    Arguments:
+    hole: your 3 hole cards.
+    board: the 4 board cards.
+    weights: optional relative likelihoods of each opponent holding, indexed like
+        COMBOS. Holdings that collide with your cards or the board are ignored.
+        Defaults to a uniformly random opponent.
+    '''
+    board_mask = cards_mask(board)
+    hole_indices = parse_cards(hole)
+    scores = river_scores(board_mask)
+    hero_score = scores[combo_index(hole_indices)]
+    live = (COMBO_MASKS & (board_mask | cards_mask(hole))) == 0
+    if weights is None:
+        opponent_scores = scores[live]
+        wins = np.count_nonzero(hero_score > opponent_scores)
+        ties = np.count_nonzero(hero_score == opponent_scores)
+        return (wins + 0.5 * ties) / len(opponent_scores)
+    weights = np.where(live, weights, 0.)
+    total = weights.sum()
+    if total <= 0.:
+        return 0.5
+    return (weights[scores < hero_score].sum() + 0.5 * weights[scores == hero_score].sum()) / total
+
+
+def sample_outcomes(hole, board, samples=1000, rng=None):
+    '''
+    Plays out random opponent hands and runouts, drawing every sample at once.
+
+    Each sample completes the board to 4 cards and deals the opponent 3 hole cards
+    from the remaining deck.
+
+    Returns:
+    A float array holding 1 for each win, 0.5 for each tie and 0 for each loss.
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    board_mask = cards_mask(board)
+    hero_mask = cards_mask(hole) | board_mask
+    deck = np.flatnonzero((CARD_BITS & hero_mask) == 0)
+    missing = BOARD_SIZE - len(board)
+    # a random partial permutation of the deck per sample
+    drawn = deck[np.argpartition(rng.random((samples, len(deck))), HOLE_SIZE + missing, axis=1)[:, :HOLE_SIZE + missing]]
+    drawn_bits = CARD_BITS[drawn]
+    runout = np.bitwise_or.reduce(drawn_bits[:, :missing], axis=1) if missing else 0
+    opponent = np.bitwise_or.reduce(drawn_bits[:, missing:], axis=1)
+    hero_scores = evaluate_masks(hero_mask | runout)
+    opponent_scores = evaluate_masks(opponent | board_mask | runout)
+    return 0.5 * (np.sign(hero_scores - opponent_scores) + 1.)
+
+
+def sample_equity(hole, board, samples=1000, rng=None):
+    '''
+    Monte Carlo equity against a uniformly random opponent, drawing every sample at once.
+    '''
+    return sample_outcomes(hole, board, samples, rng).mean()
+
+
+@functools.lru_cache(maxsize=1)
+def preflop_table():
+    '''
+    Loads the precomputed preflop equity table, or returns None if it is missing.
+    '''
+    try:
+        return np.load(PREFLOP_TABLE_PATH)
+    except OSError:
+        return None
+
+
+def preflop_equity(hole):
+    '''
+    Looks up the preflop equity of 3 hole cards against a random hand in O(1).
+
+    Returns:
+    The equity, or None if the table has not been generated.
+    '''
+    table = preflop_table()
+    if table is None:
+        return None
+    return table[combo_index(parse_cards(hole))] / PREFLOP_SCALE
+
+
+# equity by (canonical hole, canonical board, samples); see equity()
+EQUITY_CACHE = LRUCache(maxsize=65536)
+
+
+def _compute_equity(hole, board, samples):
+    hole = [CARD_CODES[index] for index in hole]
+    board = [CARD_CODES[index] for index in board]
+    if len(board) == BOARD_SIZE:
+        return river_equity(hole, board)
+    return sample_equity(hole, board, samples)
+
+
+def equity(hole, board, samples=1000):
+    '''
+    Returns the probability of beating a random opponent hand (ties count half).
+
+    Preflop equity comes from the precomputed table when it is available, the river
+    is solved exactly and the flop is sampled. Results are kept in EQUITY_CACHE under
+    the suit-isomorphic canonical form of the cards, so any situation that matches an
+    earlier one up to a relabeling of suits costs a dictionary lookup.
+
+    Arguments:
+    hole: your 3 hole cards, as card codes or eval7.Card objects.
+    board: the 0, 2 or 4 board cards.
+    samples: the number of Monte Carlo samples before the river.
+    '''
+    if not board:
+        value = preflop_equity(hole)
+        if value is not None:
+            return value
+    hole, board = canonical(parse_cards(hole), parse_cards(board))
+    return EQUITY_CACHE.get((hole, board, samples), lambda: _compute_equity(hole, board, samples))
+
+
+def adaptive_equity(hole, board, thresholds=(), deadline=None, rng=None, batch=256, **options):
+    '''
+    Estimates equity with only as many samples as the decision needs.
+
+    Preflop (with the table) and on the river the equity is known exactly and no
+    samples are drawn. Otherwise batches of samples are drawn until the confidence
+    interval clears every threshold, or the deadline or sample cap is reached; see
+    sampling.adaptive_mean.
+
+    Arguments:
+    hole: your 3 hole cards.
+    board: the 0, 2 or 4 board cards.
+    thresholds: equities your decision changes at, e.g. the pot odds of a call.
+    deadline: an optional clock.Deadline.
+    options: passed on to sampling.adaptive_mean.
+
+    Returns:
+    An Estimate(mean, stderr, samples).
+    '''
+    if len(board) == BOARD_SIZE or (not board and preflop_table() is not None):
+        return Estimate(equity(hole, board), 0., 0)
+    rng = np.random.default_rng() if rng is None else rng
+    options.setdefault('min_samples', batch)
+    return adaptive_mean(lambda samples: sample_outcomes(hole, board, samples, rng),
+                         thresholds, deadline, batch=batch, **options)
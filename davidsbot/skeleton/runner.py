@@ -3,10 +3,25 @@ The infrastructure for interacting with the engine.
 '''
 import argparse
 import socket
+import sys
 from .actions import FoldAction, CallAction, CheckAction, RaiseAction
 from .states import GameState, TerminalState, RoundState
 from .states import STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from .bot import Bot
+from .clock import TimeBudget
+from .ponder import Ponderer
+from .deferred import DeferredQueue
+from .stats import OpponentStats
+
+# field-less actions are immutable, so one instance of each is shared
+FOLD = FoldAction()
+CALL = CallAction()
+CHECK = CheckAction()
+CODES = {FoldAction: 'F\n', CallAction: 'C\n', CheckAction: 'K\n'}
+ACTIONS = {'F': FOLD, 'C': CALL, 'K': CHECK}
+# the interpreter's thread switch interval, which bounds how long a message can wait
+# on the pondering thread or a deferred job before the runner gets to handle it
+SWITCH_INTERVAL = 0.0002
 
 
 class Runner():
@@ -17,93 +32,165 @@ class Runner():
     def __init__(self, pokerbot, socketfile):
         self.pokerbot = pokerbot
         self.socketfile = socketfile
+        # bots may configure their own TimeBudget in __init__, otherwise they get the default one
+        self.time_budget = getattr(pokerbot, 'time_budget', None) or TimeBudget()
+        pokerbot.time_budget = self.time_budget
+        sys.setswitchinterval(SWITCH_INTERVAL)
+        # work submitted here only runs while we wait for the engine; an empty queue is
+        # falsy, so a bot's own queue is kept by checking for None
+        self.deferred = getattr(pokerbot, 'deferred', None)
+        if self.deferred is None:
+            self.deferred = DeferredQueue()
+        pokerbot.deferred = self.deferred
+        # only bots that override Bot.ponder think on the opponent's time, never during a deferred job
+        self.ponderer = None
+        if type(pokerbot).ponder is not Bot.ponder:
+            deferred = self.deferred if isinstance(self.deferred, DeferredQueue) else None
+            self.ponderer = Ponderer(pokerbot.ponder, deferred=deferred)
+        pokerbot.ponder_result = None
+        # opponent statistics are counted for every bot; configure one with a strength function to track showdowns
+        self.opponent_stats = getattr(pokerbot, 'opponent_stats', None) or OpponentStats()
+        pokerbot.opponent_stats = self.opponent_stats
+        # game state is kept as plain fields and only packed into a GameState for the bot
+        self.bankroll = 0
+        self.game_clock = 0.
+        self.round_num = 1
+        self.round_state = None
+        self.active = 0
+        self.round_flag = True
+        self.done = False
+        self.handlers = {
+            'T': self.handle_clock,
+            'P': self.handle_position,
+            'H': self.handle_hand,
+            'R': self.handle_raise,
+            'B': self.handle_board,
+            'O': self.handle_opponent,
+            'D': self.handle_delta,
+            'Q': self.handle_quit,
+        }
 
     def receive(self):
         '''
         Generator for incoming messages from the engine.
         '''
+        readline = self.socketfile.readline
         while True:
-            packet = self.socketfile.readline().strip().split(' ')
-            if not packet:
+            line = readline()
+            if not line:
                 break
-            yield packet
+            yield line.split()
 
     def send(self, action):
         '''
         Encodes an action and sends it to the engine.
         '''
-        if isinstance(action, FoldAction):
-            code = 'F'
-        elif isinstance(action, CallAction):
-            code = 'C'
-        elif isinstance(action, CheckAction):
-            code = 'K'
-        else:  # isinstance(action, RaiseAction)
-            code = 'R' + str(action.amount)
-        self.socketfile.write(code + '\n')
+        code = CODES.get(type(action))
+        if code is None:  # isinstance(action, RaiseAction)
+            code = 'R' + str(action.amount) + '\n'
+        self.socketfile.write(code)
         self.socketfile.flush()
 
+    def game_state(self):
+        '''
+        Packs the current game information into a GameState for the bot.
+        '''
+        return GameState(self.bankroll, self.game_clock, self.round_num)
+
+    def parse_cards(self, clause):
+        '''
+        Returns the card codes in a H, B or O clause, as a new list.
+        '''
+        return clause[1:].split(',')
+
+    def handle_clock(self, clause):
+        self.game_clock = float(clause[1:])
+        self.time_budget.sync(self.game_clock)
+
+    def handle_position(self, clause):
+        self.active = int(clause[1:])
+
+    def handle_hand(self, clause):
+        hands = [[], []]
+        hands[self.active] = self.parse_cards(clause)
+        pips = [SMALL_BLIND, BIG_BLIND]
+        stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+        self.round_state = RoundState(0, 0, pips, stacks, hands, [], None)
+        if self.round_flag:
+            self.opponent_stats.new_round()
+            self.pokerbot.handle_new_round(self.game_state(), self.round_state, self.active)
+            self.round_flag = False
+
+    def handle_raise(self, clause):
+        action = RaiseAction(int(clause[1:]))
+        if self.round_state.button % 2 != self.active:
+            self.opponent_stats.observe(self.round_state, action)
+        self.round_state = self.round_state.proceed(action)
+
+    def handle_board(self, clause):
+        round_state = self.round_state
+        self.round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
+                                      round_state.hands, self.parse_cards(clause), round_state.previous_state)
+
+    def handle_opponent(self, clause):
+        # backtrack
+        round_state = self.round_state.previous_state
+        revised_hands = list(round_state.hands)
+        revised_hands[1-self.active] = self.parse_cards(clause)
+        # rebuild history
+        round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
+                                 revised_hands, round_state.deck, round_state.previous_state)
+        self.round_state = TerminalState([0, 0], round_state)
+        self.opponent_stats.showdown(revised_hands[1-self.active], round_state.deck[:round_state.street])
+
+    def handle_delta(self, clause):
+        assert isinstance(self.round_state, TerminalState)
+        delta = int(clause[1:])
+        deltas = [-delta, -delta]
+        deltas[self.active] = delta
+        self.round_state = TerminalState(deltas, self.round_state.previous_state)
+        self.bankroll += delta
+        self.pokerbot.handle_round_over(self.game_state(), self.round_state, self.active)
+        self.round_num += 1
+        self.round_flag = True
+
+    def handle_quit(self, clause):
+        self.deferred.flush()
+        self.done = True
+
     def run(self):
         '''
         Reconstructs the game tree based on the action history received from the engine.
         '''
-        game_state = GameState(0, 0., 1)
-        round_state = None
-        active = 0
-        round_flag = True
+        handlers = self.handlers
+        ponderer = self.ponderer
+        deferred = self.deferred
+        opponent_stats = self.opponent_stats
         for packet in self.receive():
+            # cancel pondering first, so pause() can wait for the callback to return
+            if ponderer is not None:
+                self.pokerbot.ponder_result = ponderer.stop()
+            deferred.pause()
             for clause in packet:
-                if clause[0] == 'T':
-                    game_state = GameState(game_state.bankroll, float(clause[1:]), game_state.round_num)
-                elif clause[0] == 'P':
-                    active = int(float(clause[1:]))
-                elif clause[0] == 'H':
-                    hands = [[], []]
-                    hands[active] = clause[1:].split(',')
-                    pips = [SMALL_BLIND, BIG_BLIND]
-                    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
-                    round_state = RoundState(0, 0, pips, stacks, hands, [], None)
-                    if round_flag:
-                        self.pokerbot.handle_new_round(game_state, round_state, active)
-                        round_flag = False
-                elif clause[0] == 'F':
-                    round_state = round_state.proceed(FoldAction())
-                elif clause[0] == 'C':
-                    round_state = round_state.proceed(CallAction())
-                elif clause[0] == 'K':
-                    round_state = round_state.proceed(CheckAction())
-                elif clause[0] == 'R':
-                    round_state = round_state.proceed(RaiseAction(int(float(clause[1:]))))
-                elif clause[0] == 'B':
-                    round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
-                                             round_state.hands, clause[1:].split(','), round_state.previous_state)
-                elif clause[0] == 'O':
-                    # backtrack
-                    round_state = round_state.previous_state
-                    revised_hands = list(round_state.hands)
-                    revised_hands[1-active] = clause[1:].split(',')
-                    # rebuild history
-                    round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
-                                             revised_hands, round_state.deck, round_state.previous_state)
-                    round_state = TerminalState([0, 0], round_state)
-                elif clause[0] == 'D':
-                    assert isinstance(round_state, TerminalState)
-                    delta = int(float(clause[1:]))
-                    deltas = [-delta, -delta]
-                    deltas[active] = delta
-                    round_state = TerminalState(deltas, round_state.previous_state)
-                    game_state = GameState(game_state.bankroll + delta, game_state.game_clock, game_state.round_num)
-                    self.pokerbot.handle_round_over(game_state, round_state, active)
-                    game_state = GameState(game_state.bankroll, game_state.game_clock, game_state.round_num + 1)
-                    round_flag = True
-                elif clause[0] == 'Q':
-                    return
-            if round_flag:  # ack the engine
-                self.send(CheckAction())
+                action = ACTIONS.get(clause[0])
+                if action is not None:  # F, C and K are the most frequent clauses
+                    round_state = self.round_state
+                    if round_state.button % 2 != self.active:
+                        opponent_stats.observe(round_state, action)
+                    self.round_state = round_state.proceed(action)
+                else:
+                    handlers[clause[0]](clause)
+            if self.done:
+                return
+            if self.round_flag:  # ack the engine
+                self.send(CHECK)
             else:
-                assert active == round_state.button % 2
-                action = self.pokerbot.get_action(game_state, round_state, active)
+                assert self.active == self.round_state.button % 2
+                action = self.pokerbot.get_action(self.game_state(), self.round_state, self.active)
                 self.send(action)
+            deferred.resume()
+            if ponderer is not None:
+                ponderer.start(self.game_state(), self.round_state, self.active)
 
 
 def parse_args():
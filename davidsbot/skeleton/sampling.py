@@ -0,0 +1,83 @@
+'''
+Adaptive Monte Carlo: sample only until the estimate is precise enough to act on.
+'''
+import collections
+import math
+import time
+
+# 99% two-sided normal quantile
+Z_99 = 2.576
+
+Estimate = collections.namedtuple('Estimate', ['mean', 'stderr', 'samples'])
+
+
+def decided(mean, half_width, thresholds, tolerance):
+    '''
+    Returns True if the interval mean +/- half_width lies on one side of every threshold,
+    or is already narrower than tolerance.
+    '''
+    if half_width <= tolerance:
+        return True
+    return all(abs(mean - threshold) > half_width for threshold in thresholds)
+
+
+def _moments(outcomes):
+    '''
+    Returns the sum and the sum of squares of a list or NumPy array of outcomes.
+    '''
+    if hasattr(outcomes, 'dot'):
+        return float(outcomes.sum()), float(outcomes.dot(outcomes))
+    return sum(outcomes), sum(outcome * outcome for outcome in outcomes)
+
+
+def adaptive_mean(draw, thresholds=(), deadline=None, z=Z_99, tolerance=0.01,
+                  batch=64, min_samples=64, max_samples=20000):
+    '''
+    Estimates the mean of a random outcome in [0, 1], stopping as early as the decision allows.
+
+    Outcomes are drawn in batches. After each batch the confidence interval
+    mean +/- z * stderr is compared with the thresholds the caller's decision depends
+    on (pot odds, fold/call/raise cutoffs, ...): once none of them falls inside it,
+    more samples cannot change the decision and sampling stops. It also stops once
+    the interval is narrower than tolerance, after max_samples, or before a batch
+    would overrun the deadline.
+
+    Arguments:
+    draw: called as draw(n), returns n outcomes as a list or NumPy array.
+    thresholds: the values the caller compares the estimate against.
+    deadline: an optional clock.Deadline.
+    z: the normal quantile of the confidence interval.
+    tolerance: the interval half-width considered precise enough regardless of thresholds.
+    batch: outcomes drawn per call to draw, at least 1.
+    min_samples: outcomes drawn before any stopping rule is checked, at least 2 so
+        the standard error is defined.
+    max_samples: an upper bound on the outcomes drawn.
+
+    Returns:
+    An Estimate(mean, stderr, samples).
+    '''
+    if batch < 1 or min_samples < 2:
+        raise ValueError('adaptive_mean needs batch >= 1 and min_samples >= 2, got {} and {}'.format(batch, min_samples))
+    total = squares = 0.
+    samples = 0
+    start = time.perf_counter()
+    while samples < max_samples:
+        if samples >= min_samples:
+            mean = total / samples
+            stderr = math.sqrt(max(0., squares / samples - mean * mean) / (samples - 1))
+            if decided(mean, z * stderr, thresholds, tolerance):
+                break
+            if deadline is not None:
+                remaining = deadline.remaining()
+                if remaining <= 0. or remaining < (time.perf_counter() - start) / samples * batch:
+                    break
+        outcomes = draw(min(batch, max_samples - samples))
+        batch_total, batch_squares = _moments(outcomes)
+        total += batch_total
+        squares += batch_squares
+        samples += len(outcomes)
+    if not samples:
+        return Estimate(0.5, 0.5, 0)
+    mean = total / samples
+    stderr = math.sqrt(max(0., squares / samples - mean * mean) / max(1, samples - 1))
+    return Estimate(mean, stderr, samples)
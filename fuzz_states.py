@@ -0,0 +1,294 @@
+'''
+Differential fuzzer between the engine RoundState and every skeleton RoundState.
+
+Plays random legal action sequences through engine.RoundState and through each
+bot's copy of skeleton/states.py in lockstep, checking that they agree on legal
+actions, raise bounds, pips, stacks and terminal deltas. Failing sequences are
+shrunk to a minimal reproduction before being reported.
+
+Usage: python fuzz_states.py [--workers N] [--seconds S] [--seed X]
+'''
+import argparse
+import glob
+import importlib
+import multiprocessing
+import os
+import random
+import sys
+import time
+import types
+
+import eval7
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+import engine
+
+NUM_DEALS = 256
+
+
+def load_skeletons():
+    '''
+    Imports every bot's skeleton/states.py under a unique package name.
+
+    Returns:
+    A dict mapping the bot directory name to its (states, actions) modules.
+    '''
+    skeletons = {}
+    for path in sorted(glob.glob(os.path.join(ROOT, '*', 'skeleton', 'states.py'))):
+        skeleton_dir = os.path.dirname(path)
+        bot = os.path.basename(os.path.dirname(skeleton_dir))
+        package_name = '_fuzz_' + bot + '_skeleton'
+        package = types.ModuleType(package_name)
+        package.__path__ = [skeleton_dir]
+        sys.modules[package_name] = package
+        skeletons[bot] = (importlib.import_module(package_name + '.states'),
+                          importlib.import_module(package_name + '.actions'))
+    return skeletons
+
+
+def make_deals(rng):
+    '''
+    Deals a fixed pool of (hands, deck) pairs; decks are only ever peeked afterwards.
+    '''
+    deals = []
+    for _ in range(NUM_DEALS):
+        deck = eval7.Deck()
+        deck.cards = rng.sample(deck.cards, len(deck.cards))
+        hands = [deck.deal(3), deck.deal(3)]
+        deals.append((hands, deck))
+    return deals
+
+
+def encode(action):
+    '''
+    Formats an action the way the socket protocol does.
+    '''
+    name = type(action).__name__
+    if name == 'RaiseAction':
+        return 'R' + str(action.amount)
+    return {'FoldAction': 'F', 'CallAction': 'C', 'CheckAction': 'K'}[name]
+
+
+def decode(code, actions):
+    '''
+    Builds an action from its protocol code using the given actions module.
+    '''
+    if code[0] == 'R':
+        return actions.RaiseAction(int(code[1:]))
+    return {'F': actions.FoldAction, 'C': actions.CallAction, 'K': actions.CheckAction}[code]()
+
+
+PIPS = [engine.SMALL_BLIND, engine.BIG_BLIND]
+STACKS = [engine.STARTING_STACK - engine.SMALL_BLIND, engine.STARTING_STACK - engine.BIG_BLIND]
+
+
+def engine_root(deal):
+    '''
+    Returns the engine's initial RoundState for one deal.
+    '''
+    hands, deck = deal
+    return engine.RoundState(0, 0, list(PIPS), list(STACKS), hands, deck, None)
+
+
+def skeleton_roots(skeletons, deal):
+    '''
+    Returns each skeleton's initial RoundState for one deal.
+    '''
+    hands = [[str(card) for card in hand] for hand in deal[0]]
+    return {bot: states.RoundState(0, 0, list(PIPS), list(STACKS), hands, [], None)
+            for bot, (states, _) in skeletons.items()}
+
+
+def compare(root, views, last_code):
+    '''
+    Returns a description of the first disagreement between the states, or None.
+    '''
+    engine_terminal = isinstance(root, engine.TerminalState)
+    for bot, state in views.items():
+        if engine_terminal != (type(state).__name__ == 'TerminalState'):
+            return '{}: engine terminal={} skeleton terminal={}'.format(bot, engine_terminal, not engine_terminal)
+        engine_state = root
+        if engine_terminal:
+            if sum(root.deltas) != 0:
+                return 'engine deltas do not sum to zero: {}'.format(root.deltas)
+            if last_code == 'F' and list(root.deltas) != list(state.deltas):
+                return '{}: fold deltas engine={} skeleton={}'.format(bot, root.deltas, state.deltas)
+            if last_code != 'F' and list(state.deltas) != [0, 0]:
+                return '{}: showdown deltas should be [0, 0], got {}'.format(bot, state.deltas)
+            engine_state, state = root.previous_state, state.previous_state
+        for field in ('button', 'street', 'pips', 'stacks'):
+            if getattr(engine_state, field) != getattr(state, field):
+                return '{}: {} engine={} skeleton={}'.format(bot, field, getattr(engine_state, field), getattr(state, field))
+        if engine_terminal:
+            continue
+        engine_legal = sorted(action.__name__ for action in root.legal_actions())
+        skeleton_legal = sorted(action.__name__ for action in state.legal_actions())
+        if engine_legal != skeleton_legal:
+            return '{}: legal actions engine={} skeleton={}'.format(bot, engine_legal, skeleton_legal)
+        if 'RaiseAction' in engine_legal and tuple(root.raise_bounds()) != tuple(state.raise_bounds()):
+            return '{}: raise bounds engine={} skeleton={}'.format(bot, root.raise_bounds(), state.raise_bounds())
+    return None
+
+
+def replay(skeletons, deal, codes):
+    '''
+    Replays a sequence of action codes through every implementation.
+
+    Returns:
+    (step, message) for the first failing step, (None, None) if all agree, or
+    (None, 'illegal') if the sequence is not legal for the engine.
+    '''
+    root, views = engine_root(deal), skeleton_roots(skeletons, deal)
+    message = compare(root, views, None)
+    if message is not None:
+        return 0, message
+    for step, code in enumerate(codes):
+        if isinstance(root, engine.TerminalState):
+            return None, 'illegal'
+        legal = {action.__name__ for action in root.legal_actions()}
+        action = decode(code, engine)
+        if type(action).__name__ not in legal:
+            return None, 'illegal'
+        if code[0] == 'R':
+            min_raise, max_raise = root.raise_bounds()
+            if not min_raise <= action.amount <= max_raise:
+                return None, 'illegal'
+        try:
+            root = root.proceed(action)
+            views = {bot: state.proceed(decode(code, skeletons[bot][1]))
+                     for bot, state in views.items()}
+            message = compare(root, views, code)
+        except Exception as error:  # any crash in either implementation is a finding
+            message = 'exception: {!r}'.format(error)
+        if message is not None:
+            return step + 1, message
+    return None, None
+
+
+def random_codes(root, rng):
+    '''
+    Plays random legal actions from root until the round ends.
+    '''
+    codes = []
+    state = root
+    while not isinstance(state, engine.TerminalState):
+        legal = sorted(state.legal_actions(), key=lambda action: action.__name__)
+        action = rng.choice(legal)
+        if action is engine.RaiseAction:
+            min_raise, max_raise = state.raise_bounds()
+            roll = rng.random()
+            if roll < 0.3:
+                amount = min_raise
+            elif roll < 0.5:
+                amount = max_raise
+            else:
+                amount = rng.randint(min_raise, max_raise)
+            action = engine.RaiseAction(amount)
+        else:
+            action = action()
+        codes.append(encode(action))
+        state = state.proceed(action)
+    return codes
+
+
+def fails(skeletons, deal, codes):
+    '''
+    Returns True if the sequence is legal and still exposes a disagreement.
+    '''
+    step, _ = replay(skeletons, deal, codes)
+    return step is not None
+
+
+def shrink(skeletons, deal, codes):
+    '''
+    Greedily minimizes a failing sequence: truncation, deletion, then smaller raises.
+    '''
+    step, _ = replay(skeletons, deal, codes)
+    codes = codes[:step]
+    changed = True
+    while changed:
+        changed = False
+        for i in reversed(range(len(codes))):
+            candidate = codes[:i] + codes[i+1:]
+            if fails(skeletons, deal, candidate):
+                codes = candidate
+                changed = True
+        for i, code in enumerate(codes):
+            if code[0] != 'R':
+                continue
+            amount = int(code[1:])
+            for smaller in (engine.BIG_BLIND, amount // 2, amount - 1):
+                if smaller >= amount:
+                    continue
+                candidate = codes[:i] + ['R' + str(smaller)] + codes[i+1:]
+                if fails(skeletons, deal, candidate):
+                    codes = candidate
+                    changed = True
+                    break
+    return codes
+
+
+def worker(args):
+    '''
+    Fuzzes for a fixed duration and returns (sequences run, shrunk failures).
+    '''
+    seed, seconds, max_failures = args
+    rng = random.Random(seed)
+    skeletons = load_skeletons()
+    deals = make_deals(rng)
+    failures = []
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline and len(failures) < max_failures:
+        for _ in range(1000):
+            deal_index = rng.randrange(NUM_DEALS)
+            deal = deals[deal_index]
+            codes = random_codes(engine_root(deal), rng)
+            count += 1
+            step, message = replay(skeletons, deal, codes)
+            if step is not None:
+                minimal = shrink(skeletons, deal, codes)
+                _, minimal_message = replay(skeletons, deal, minimal)
+                failures.append((' '.join(minimal), minimal_message,
+                                 [[str(card) for card in hand] for hand in deal[0]],
+                                 [str(card) for card in deal[1].peek(4)]))
+                break
+    return count, failures
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python fuzz_states.py')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Worker processes to run')
+    parser.add_argument('--seconds', type=float, default=60.0, help='How long each worker fuzzes')
+    parser.add_argument('--seed', type=int, default=None, help='Base random seed')
+    parser.add_argument('--max-failures', type=int, default=5, help='Stop a worker after this many failures')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    seed = args.seed if args.seed is not None else random.randrange(1 << 30)
+    print('Fuzzing {} skeleton copies with {} workers for {}s (seed {})'.format(
+        len(load_skeletons()), args.workers, args.seconds, seed))
+    jobs = [(seed + i, args.seconds, args.max_failures) for i in range(args.workers)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.workers) as pool:
+        results = pool.map(worker, jobs)
+    elapsed = time.perf_counter() - start
+    total = sum(count for count, _ in results)
+    failures = {}
+    for _, worker_failures in results:
+        for codes, message, hands, board in worker_failures:
+            failures.setdefault((codes, message), (hands, board))
+    print('{} sequences in {:.1f}s ({:.0f}/min)'.format(total, elapsed, total / elapsed * 60))
+    for (codes, message), (hands, board) in sorted(failures.items(), key=lambda item: len(item[0][0])):
+        print('FAIL [{}] {}'.format(codes, message))
+        print('     hands {} board {}'.format(hands, board))
+    if failures:
+        sys.exit(1)
+    print('No disagreements found')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+'''
+Clusters preflop and flop situations into card abstraction buckets for skeleton/abstraction.py.
+
+Situations are compared by the earth mover's distance between their final equity
+histograms from gen_hand_features.py. In one dimension that is the L1 distance
+between cumulative histograms, so k-means runs on the cumulative histograms with
+L1 assignment (seeded with k-means++). Assignment is spread over worker
+processes that read the memory-mapped features directly, and their per-cluster
+sums are merged after every iteration. Buckets are numbered from the weakest
+mean EHS up. River buckets are equal-frequency ranges of exact river equity.
+
+Usage: python gen_buckets.py [--buckets PREFLOP FLOP RIVER] [--features DIR] [--workers W] [--out PATH]
+'''
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'python_skeleton'))
+from skeleton.abstraction import BUCKETS_PATH
+from skeleton.equity import CARD_CODES, COMBOS
+from skeleton.features import NUM_PAIRS, STAT_SCALE, FeatureTable, situation_key
+from skeleton.ranges import river_range_equity, uniform
+
+CHUNK = 8192
+table = None
+
+
+def cumulative(hist):
+    '''
+    Turns rows of histogram counts into normalized cumulative histograms.
+    '''
+    hist = np.asarray(hist, dtype=np.float32)
+    return np.cumsum(hist / np.maximum(1., hist.sum(axis=1, keepdims=True)), axis=1)
+
+
+def emd(points, centroids):
+    '''
+    Returns the (points, centroids) matrix of earth mover's distances between cumulative
+    histograms, in units of equity.
+    '''
+    return np.abs(points[:, None, :] - centroids[None, :, :]).sum(axis=2) / points.shape[1]
+
+
+def open_table(directory, street):
+    global table
+    table = FeatureTable(directory, street)
+
+
+def assign(task):
+    '''
+    Assigns a slice of rows to their nearest centroids.
+
+    Returns:
+    (start, labels, sums, counts, cost): the labels of the slice, the per-cluster
+    sums and counts of its points, and its total distance to the centroids.
+    '''
+    start, stop, centroids = task
+    labels = np.zeros(stop - start, dtype=np.int64)
+    sums = np.zeros_like(centroids, dtype=np.float64)
+    counts = np.zeros(len(centroids), dtype=np.int64)
+    cost = 0.
+    for first in range(start, stop, CHUNK):
+        points = cumulative(table.hist[first:min(stop, first + CHUNK)])
+        distances = emd(points, centroids)
+        nearest = distances.argmin(axis=1)
+        labels[first - start:first - start + len(points)] = nearest
+        np.add.at(sums, nearest, points)
+        counts += np.bincount(nearest, minlength=len(centroids))
+        cost += distances[np.arange(len(points)), nearest].sum()
+    return start, labels, sums, counts, cost
+
+
+def kmeans_plus_plus(points, clusters, rng):
+    '''
+    Picks initial centroids from a sample of points, each with probability proportional
+    to its distance from the centroids picked so far.
+    '''
+    centroids = [points[rng.integers(len(points))]]
+    nearest = emd(points, np.array(centroids))[:, 0]
+    while len(centroids) < clusters:
+        centroids.append(points[rng.choice(len(points), p=nearest / nearest.sum())])
+        nearest = np.minimum(nearest, emd(points, centroids[-1][None, :])[:, 0])
+    return np.array(centroids, dtype=np.float32)
+
+
+def cluster(directory, street, clusters, iterations, workers, rng):
+    '''
+    Runs k-means under the earth mover's distance on one street's histograms.
+
+    Returns:
+    The bucket of every row of the street's feature table.
+    '''
+    open_table(directory, street)
+    rows = len(table)
+    sample = np.sort(rng.choice(rows, min(rows, 20000), replace=False))
+    centroids = kmeans_plus_plus(cumulative(table.hist[sample]), clusters, rng)
+    step = max(CHUNK, -(-rows // (4 * workers)))
+    labels = np.zeros(rows, dtype=np.int64)
+    with multiprocessing.Pool(workers, initializer=open_table, initargs=(directory, street)) as pool:
+        for iteration in range(iterations):
+            start = time.perf_counter()
+            sums = np.zeros_like(centroids, dtype=np.float64)
+            counts = np.zeros(clusters, dtype=np.int64)
+            previous = labels.copy()
+            cost = 0.
+            tasks = [(first, min(rows, first + step), centroids) for first in range(0, rows, step)]
+            for first, chunk_labels, chunk_sums, chunk_counts, chunk_cost in pool.imap_unordered(assign, tasks):
+                labels[first:first + len(chunk_labels)] = chunk_labels
+                sums += chunk_sums
+                counts += chunk_counts
+                cost += chunk_cost
+            changed = np.count_nonzero(labels != previous) / rows
+            # empty clusters keep their centroid
+            filled = counts > 0
+            centroids[filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+            print('  iteration {}: mean EMD {:.4f}, {:.2%} reassigned, {:.1f}s'.format(
+                iteration + 1, cost / rows, changed, time.perf_counter() - start))
+            if iteration and changed < 0.001:
+                break
+
+    # number buckets from the weakest mean EHS up
+    ehs = table.stats[:, 0] / STAT_SCALE
+    means = np.bincount(labels, ehs, clusters) / np.maximum(1, np.bincount(labels, minlength=clusters))
+    ranks = np.empty(clusters, dtype=np.int64)
+    ranks[np.argsort(means, kind='stable')] = np.arange(clusters)
+    return ranks[labels].astype(np.uint8)
+
+
+def river_edges(clusters, boards, rng):
+    '''
+    Returns equity boundaries that split river situations into equally frequent buckets.
+    '''
+    equities = []
+    for _ in range(boards):
+        board = [CARD_CODES[card] for card in rng.choice(52, 4, replace=False)]
+        board_equities, _ = river_range_equity(board, uniform(), uniform())
+        equities.append(board_equities[~np.isnan(board_equities)])
+    return np.quantile(np.concatenate(equities), np.arange(1, clusters) / clusters)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python gen_buckets.py')
+    parser.add_argument('--buckets', type=int, nargs=3, default=[32, 64, 64], metavar=('PREFLOP', 'FLOP', 'RIVER'))
+    parser.add_argument('--features', type=str, default=os.path.join(ROOT, 'features'), help='gen_hand_features.py output')
+    parser.add_argument('--iterations', type=int, default=50, help='Largest number of k-means iterations')
+    parser.add_argument('--river-boards', type=int, default=100, help='Random boards used to place river edges')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Worker processes to run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=str, default=BUCKETS_PATH, help='Where to write the tables')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    preflop_clusters, flop_clusters, river_clusters = args.buckets
+
+    print('preflop: {} buckets'.format(preflop_clusters))
+    labels = cluster(args.features, 0, preflop_clusters, args.iterations, args.workers, rng)
+    keys = FeatureTable(args.features, 0).keys
+    preflop = labels[np.searchsorted(keys, [situation_key(combo) for combo in COMBOS.tolist()])]
+
+    print('flop: {} buckets'.format(flop_clusters))
+    labels = cluster(args.features, 2, flop_clusters, args.iterations, args.workers, rng)
+    keys = np.asarray(FeatureTable(args.features, 2).keys)
+    holes = keys // NUM_PAIRS
+    flop_holes, flop_starts = np.unique(holes, return_index=True)
+
+    print('river: {} buckets'.format(river_clusters))
+    edges = river_edges(river_clusters, args.river_boards, rng)
+
+    np.savez(args.out, preflop=preflop,
+             flop_holes=flop_holes.astype(np.uint16),
+             flop_starts=np.append(flop_starts, len(keys)).astype(np.uint32),
+             flop_pairs=(keys % NUM_PAIRS).astype(np.uint16),
+             flop=labels, river_edges=edges)
+    print('Wrote {} ({} bytes)'.format(args.out, os.path.getsize(args.out)))
+
+
+if __name__ == '__main__':
+    main()
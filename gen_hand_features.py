@@ -0,0 +1,151 @@
+'''
+Precomputes hand strength distributions for card abstraction.
+
+For every suit-isomorphic class of preflop hands (3 hole cards) and flop
+situations (3 hole cards and 2 board cards), random runouts complete the board
+to 4 cards and the equity against a random hand is estimated on each. The
+features stored per class are
+    EHS     the mean final equity,
+    EHS^2   the mean squared final equity, which rewards hands that become strong,
+    ppot    the chance of winning at the end when behind on the current cards,
+    npot    the chance of losing at the end when ahead on the current cards,
+and a histogram of the final equity over runouts. Classes are spread over
+worker processes and written into memory-mapped arrays (see skeleton/features.py).
+
+The spread between runouts dominates the sampling error, so most of the budget
+goes to runouts rather than opponent hands per runout.
+
+Usage: python gen_hand_features.py [--streets 0 2] [--runouts R] [--opponents O] [--workers W] [--out DIR]
+'''
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'python_skeleton'))
+from skeleton.canonical import canonical
+from skeleton.equity import BOARD_SIZE, CARD_BITS, COMBOS, COMBO_MASKS, evaluate_masks
+from skeleton.features import HIST_SCALE, STAT_NAMES, STAT_SCALE, STREET_NAMES, situation_key
+
+BATCH = 256
+
+
+def situations(street):
+    '''
+    Lists one representative (hole, board) of every class on a street, sorted by key.
+    '''
+    holes = sorted({canonical(combo)[0] for combo in COMBOS.tolist()})
+    if street == 0:
+        found = {situation_key(hole): (hole, ()) for hole in holes}
+    else:
+        found = {}
+        for hole in holes:
+            rest = [card for card in range(52) if card not in hole]
+            for board in itertools.combinations(rest, street):
+                hole_form, board_form = canonical(hole, board)
+                found.setdefault(situation_key(hole_form, board_form), (hole_form, board_form))
+    keys = np.array(sorted(found), dtype=np.uint32)
+    return keys, [found[key] for key in keys.tolist()]
+
+
+def features(hole, board, runouts, opponents, bins, rng):
+    '''
+    Estimates the features of one situation.
+
+    Returns:
+    (stats, hist): the 4 stats in [0, 1] and the equity histogram as counts per runout.
+    '''
+    hero = int(np.bitwise_or.reduce(CARD_BITS[list(hole)]))
+    board_mask = int(np.bitwise_or.reduce(CARD_BITS[list(board)])) if board else 0
+    dead = hero | board_mask
+    missing = BOARD_SIZE - len(board)
+
+    # runouts, then opponent holdings drawn uniformly, discarding those that collide
+    keys = rng.random((runouts, 52))
+    keys[:, (CARD_BITS & dead) != 0] = 2.
+    runout = np.bitwise_or.reduce(CARD_BITS[np.argpartition(keys, missing, axis=1)[:, :missing]], axis=1)
+    runout = np.repeat(runout, opponents)
+    opponent = COMBO_MASKS[rng.integers(0, len(COMBO_MASKS), runouts * opponents)]
+    valid = (opponent & (runout | dead)) == 0
+    runout, opponent = runout[valid], opponent[valid]
+    which = np.repeat(np.arange(runouts), opponents)[valid]
+
+    now = np.sign(evaluate_masks(np.int64(hero | board_mask)) - evaluate_masks(opponent | board_mask))
+    final = 0.5 * (np.sign(evaluate_masks(runout | dead) - evaluate_masks(opponent | runout | board_mask)) + 1.)
+    equities = np.bincount(which, final, runouts) / np.maximum(1, np.bincount(which, minlength=runouts))
+
+    behind, ahead = now < 0, now > 0
+    stats = (equities.mean(), (equities ** 2).mean(),
+             final[behind].mean() if behind.any() else 0.,
+             1. - final[ahead].mean() if ahead.any() else 0.)
+    hist = np.bincount(np.minimum((equities * bins).astype(np.int64), bins - 1), minlength=bins)
+    return stats, hist
+
+
+def work(task):
+    '''
+    Computes the features of a slice of a street's situations.
+    '''
+    start, chunk, runouts, opponents, bins, seed = task
+    rng = np.random.default_rng(seed)
+    stats = np.zeros((len(chunk), len(STAT_NAMES)), dtype=np.uint16)
+    hist = np.zeros((len(chunk), bins), dtype=np.uint8)
+    for row, (hole, board) in enumerate(chunk):
+        values, counts = features(hole, board, runouts, opponents, bins, rng)
+        stats[row] = np.round(np.array(values) * STAT_SCALE)
+        hist[row] = np.round(counts * HIST_SCALE / runouts)
+    return start, stats, hist
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python gen_hand_features.py')
+    parser.add_argument('--streets', type=int, nargs='+', default=[0, 2], choices=sorted(STREET_NAMES))
+    parser.add_argument('--runouts', type=int, default=None, help='Runouts per situation (default 2048 preflop, 128 flop)')
+    parser.add_argument('--opponents', type=int, default=48, help='Opponent hands drawn per runout, before discarding collisions')
+    parser.add_argument('--bins', type=int, default=20, help='Equity histogram bins')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Worker processes to run')
+    parser.add_argument('--limit', type=int, default=None, help='Only compute the first N situations, for testing')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=str, default=os.path.join(ROOT, 'features'), help='Directory to write to')
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for street in args.streets:
+        name = os.path.join(args.out, STREET_NAMES[street])
+        runouts = args.runouts or (2048 if street == 0 else 128)
+        start = time.perf_counter()
+        keys, todo = situations(street)
+        if args.limit is not None:
+            keys, todo = keys[:args.limit], todo[:args.limit]
+        print('{}: {} classes, {} runouts x {} opponents each ({:.0f}s to enumerate)'.format(
+            STREET_NAMES[street], len(keys), runouts, args.opponents, time.perf_counter() - start))
+
+        np.save(name + '_keys.npy', keys)
+        stats = np.lib.format.open_memmap(name + '_stats.npy', mode='w+', dtype=np.uint16,
+                                          shape=(len(keys), len(STAT_NAMES)))
+        hist = np.lib.format.open_memmap(name + '_hist.npy', mode='w+', dtype=np.uint8, shape=(len(keys), args.bins))
+        tasks = [(first, todo[first:first + BATCH], runouts, args.opponents, args.bins,
+                  args.seed * len(keys) + first) for first in range(0, len(todo), BATCH)]
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.workers) as pool:
+            for done, (first, chunk_stats, chunk_hist) in enumerate(pool.imap_unordered(work, tasks), 1):
+                stats[first:first + len(chunk_stats)] = chunk_stats
+                hist[first:first + len(chunk_hist)] = chunk_hist
+                if done % 100 == 0 or done == len(tasks):
+                    elapsed = time.perf_counter() - start
+                    print('{}/{} batches, {:.0f}s elapsed, {:.0f}s left'.format(
+                        done, len(tasks), elapsed, elapsed / done * (len(tasks) - done)))
+        stats.flush()
+        hist.flush()
+        del stats, hist
+        print('Wrote {}_*.npy ({} bytes)'.format(name, sum(
+            os.path.getsize(name + suffix) for suffix in ('_keys.npy', '_stats.npy', '_hist.npy'))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+'''
+Generates the preflop equity table used by skeleton/equity.py.
+
+Every 3-card starting hand is reduced to its suit-isomorphic class, the equity of
+one representative per class against a random 3-card hand is estimated with a
+large number of samples across worker processes, and the result is expanded back
+to all C(52, 3) holdings as a 44 KB uint16 table indexed by combo_index.
+
+Usage: python gen_preflop_table.py [--samples N] [--workers W] [--out PATH]
+'''
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'python_skeleton'))
+from skeleton.canonical import canonical_hole
+from skeleton.equity import COMBOS, CARD_CODES, PREFLOP_SCALE, PREFLOP_TABLE_PATH, sample_equity
+
+CHUNK = 20000
+
+
+def hole_classes():
+    '''
+    Groups every holding by its canonical form.
+
+    Returns:
+    A dict mapping each canonical holding to the COMBOS positions in its class.
+    '''
+    classes = {}
+    for index, combo in enumerate(COMBOS.tolist()):
+        classes.setdefault(canonical_hole(combo), []).append(index)
+    return classes
+
+
+def estimate(task):
+    '''
+    Estimates the equity of one canonical holding in chunks of CHUNK samples.
+    '''
+    key, samples, seed = task
+    rng = np.random.default_rng(seed)
+    hole = [CARD_CODES[index] for index in key]
+    total = 0.
+    done = 0
+    while done < samples:
+        batch = min(CHUNK, samples - done)
+        total += sample_equity(hole, [], batch, rng) * batch
+        done += batch
+    return key, total / samples
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python gen_preflop_table.py')
+    parser.add_argument('--samples', type=int, default=1000000, help='Samples per canonical hand')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Worker processes to run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=str, default=PREFLOP_TABLE_PATH, help='Where to write the table')
+    args = parser.parse_args()
+
+    classes = hole_classes()
+    print('{} holdings in {} canonical classes, {} samples each'.format(len(COMBOS), len(classes), args.samples))
+    tasks = [(key, args.samples, args.seed * len(classes) + i) for i, key in enumerate(sorted(classes))]
+    table = np.zeros(len(COMBOS), dtype=np.uint16)
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.workers) as pool:
+        for done, (key, value) in enumerate(pool.imap_unordered(estimate, tasks, chunksize=4), 1):
+            table[classes[key]] = int(round(value * PREFLOP_SCALE))
+            if done % 100 == 0:
+                print('{}/{} classes, {:.0f}s'.format(done, len(classes), time.perf_counter() - start))
+    np.save(args.out, table)
+    print('Wrote {} ({} bytes), standard error <= {:.4f}'.format(
+        args.out, os.path.getsize(args.out), 0.5 / np.sqrt(args.samples)))
+
+
+if __name__ == '__main__':
+    main()
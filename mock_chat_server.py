@@ -0,0 +1,133 @@
+'''
+A local stand-in for the OpenAI chat completions API, for running and benchmarking
+player_chatbot offline.
+
+It answers POST /v1/chat/completions in the API's JSON format. Every reply is a
+legal move for the decision in the last user message, taken from its "Your
+legal actions are" line, and any other message gets "Yes". Each response is
+delayed by a fixed latency plus a cost per KB of request, the way a real model's
+time to first token grows with the prompt, and a share of requests can stall to
+test bots' timeouts. Point the bot at it with
+OPENAI_API_BASE=http://localhost:PORT/v1.
+
+Usage: python mock_chat_server.py [--port P] [--latency MS] [--per-kb MS] [--stall-fraction F] [--stall S]
+'''
+import argparse
+import http.server
+import json
+import random
+import re
+import threading
+import time
+
+LEGAL = re.compile(r'Your legal actions are: ([A-Za-z, ]+)\.')
+# preferred reply among the legal actions
+PREFERENCE = ('Check', 'Call', 'Fold')
+
+
+def reply_for(messages):
+    '''
+    Returns the stand-in model's reply to a conversation.
+    '''
+    match = LEGAL.search(messages[-1]['content']) if messages else None
+    if match is None:
+        return 'Yes'
+    legal = [action.strip() for action in match.group(1).split(',')]
+    for action in PREFERENCE:
+        if action in legal:
+            return action
+    return 'Raise 10'
+
+
+class MockChatServer(http.server.ThreadingHTTPServer):
+    '''
+    The stand-in server, which also counts the requests and bytes it received.
+    '''
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.2, per_kb=0.01, stall_fraction=0., stall=30.):
+        '''
+        Arguments:
+        port: the port to listen on, or 0 for any free port.
+        latency: the seconds every response is delayed by.
+        per_kb: the extra seconds of delay per KB of request body.
+        stall_fraction: the share of requests that stall, like a model that is overloaded.
+        stall: the extra seconds a stalled request is delayed by.
+        '''
+        super().__init__(('localhost', port), ChatHandler)
+        self.latency = latency
+        self.per_kb = per_kb
+        self.stall_fraction = stall_fraction
+        self.stall = stall
+        self.requests = 0
+        self.request_bytes = 0
+        self.lock = threading.Lock()
+
+    @property
+    def api_base(self):
+        return 'http://localhost:{}/v1'.format(self.server_address[1])
+
+    def start(self):
+        '''
+        Serves on a background thread and returns the server.
+        '''
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class ChatHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        if self.path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.request_bytes += len(body)
+        request = json.loads(body)
+        content = reply_for(request.get('messages', []))
+        stalled = random.random() < server.stall_fraction
+        time.sleep(server.latency + server.per_kb * len(body) / 1024 + (server.stall if stalled else 0.))
+        prompt_tokens = len(body) // 4  # about 4 characters per token
+        response = json.dumps({
+            'id': 'chatcmpl-mock',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'mock'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': 2, 'total_tokens': prompt_tokens + 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        try:
+            self.wfile.write(response)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out and gave up on the reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python mock_chat_server.py')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--latency', type=float, default=200, help='Delay of every response in ms')
+    parser.add_argument('--per-kb', type=float, default=10, help='Extra delay per KB of request in ms')
+    parser.add_argument('--stall-fraction', type=float, default=0., help='Share of requests that stall')
+    parser.add_argument('--stall', type=float, default=30., help='Extra delay of a stalled request in seconds')
+    args = parser.parse_args()
+
+    server = MockChatServer(args.port, args.latency / 1e3, args.per_kb / 1e3, args.stall_fraction, args.stall)
+    print('Serving chat completions at {}'.format(server.api_base))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
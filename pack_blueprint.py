@@ -0,0 +1,69 @@
+'''
+Packs a blueprint written by train_cfr.py into the compact format read by skeleton/blueprint.py.
+
+The float32 probabilities are quantized to one byte per action slot, rounded so
+that every row still sums to QUANTIZATION, and stored with the sorted uint64
+infoset keys as two plain .npy files that bots memory-map at startup. If the
+table would exceed --max-bytes, the least visited information sets are dropped
+first; bots fall back to their own logic for them.
+
+Usage: python pack_blueprint.py [--blueprint PATH] [--max-bytes B] [--min-visits V] [--out PREFIX]
+'''
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'python_skeleton'))
+from skeleton.betting import NUM_ACTIONS
+from skeleton.blueprint import BLUEPRINT_PREFIX, QUANTIZATION, blueprint_paths
+
+HEADER_BYTES = 128  # the .npy header of each file
+
+
+def quantize(probabilities):
+    '''
+    Rounds rows of probabilities to integers summing to QUANTIZATION, by largest remainder.
+    '''
+    scaled = probabilities * QUANTIZATION
+    counts = np.floor(scaled).astype(np.int64)
+    short = QUANTIZATION - counts.sum(axis=1)
+    order = np.argsort(counts - scaled, axis=1, kind='stable')  # largest remainder first
+    bump = np.arange(NUM_ACTIONS)[None, :] < short[:, None]
+    np.put_along_axis(counts, order, np.take_along_axis(counts, order, axis=1) + bump, axis=1)
+    return counts.astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python pack_blueprint.py')
+    parser.add_argument('--blueprint', type=str, default=os.path.join(ROOT, 'blueprint', 'blueprint.npz'),
+                        help='Blueprint written by train_cfr.py')
+    parser.add_argument('--max-bytes', type=int, default=4 * 1024 * 1024, help='Size limit of the packed files')
+    parser.add_argument('--min-visits', type=float, default=0., help='Drop information sets visited less than this')
+    parser.add_argument('--out', type=str, default=BLUEPRINT_PREFIX, help='Prefix of the packed files')
+    args = parser.parse_args()
+
+    with np.load(args.blueprint) as data:
+        keys, probabilities, visits = data['keys'], data['probabilities'], data['visits']
+    keep = visits >= args.min_visits
+    row_bytes = keys.itemsize + NUM_ACTIONS
+    capacity = max(0, (args.max_bytes - 2 * HEADER_BYTES) // row_bytes)
+    if keep.sum() > capacity:
+        # visits are reach-weighted, so the most visited sets are the ones play reaches most often
+        keep[:] = False
+        keep[np.argsort(-visits, kind='stable')[:capacity]] = True
+    packed = quantize(probabilities[keep].astype(np.float64))
+    error = np.abs(packed / QUANTIZATION - probabilities[keep]).max() if len(packed) else 0.
+
+    keys_path, strategy_path = blueprint_paths(args.out)
+    np.save(keys_path, keys[keep])  # still sorted, since a mask keeps the order
+    np.save(strategy_path, packed)
+    size = os.path.getsize(keys_path) + os.path.getsize(strategy_path)
+    print('Packed {} of {} information sets ({:.1%} of visits) into {} bytes, max probability error {:.4f}'.format(
+        len(packed), len(keys), visits[keep].sum() / max(visits.sum(), 1e-12), size, error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Keeps the conversation sent to the chat model bounded over a whole match.
+"""
+
+from skeleton.cache import LRUCache
+from skeleton.canonical import canonical
+from skeleton.equity import parse_cards
+
+
+def decision_key(hole, board, big_blind, contribution, continue_cost, legal_actions):
+    """
+    Returns what decides the model's answer to a decision, as a cache key: the cards up
+    to a relabeling of suits, the position, the chips in and to call, and the legal actions.
+    """
+    hole, board = canonical(parse_cards(hole), parse_cards(board))
+    names = tuple(sorted(action.__name__ for action in legal_actions))
+    return hole, board, bool(big_blind), contribution, continue_cost, names
+
+
+class ChatContext:
+    """
+    The messages for each chat request: the fixed preamble (system role, rules and
+    the model's agreement), a one-message summary of the rounds that no longer fit,
+    and the most recent rounds in full.
+
+    At most max_rounds rounds are kept in full, and older ones are dropped while the
+    kept rounds are longer than max_chars, down to the current round. Replies are
+    cached by the decision they answered, so the model is asked about an identical
+    decision only once, even though the rounds before it differ.
+    """
+
+    def __init__(self, preamble, max_rounds=3, max_chars=6000, cache_size=4096):
+        """
+        Arguments:
+        preamble: the messages every request starts with, as {"role", "content"} dicts.
+        max_rounds: the number of most recent rounds, including the current one, kept in full.
+        max_chars: the most characters of round messages kept, unless the current round is longer.
+        cache_size: the number of replies to remember.
+        """
+        self.preamble = list(preamble)
+        self.max_rounds = max_rounds
+        self.max_chars = max_chars
+        self.cache = LRUCache(maxsize=cache_size)
+        self.rounds = [[]]
+        self.summarized = 0
+        self.played = 0
+        self.net = 0
+        self.won = 0
+        self.showdowns = 0
+        self.requests = 0
+
+    def new_round(self):
+        """
+        Starts a new round, dropping the oldest rounds that no longer fit.
+        """
+        if self.rounds[-1]:
+            self.rounds.append([])
+            self.trim()
+
+    def end_round(self, delta, showdown):
+        """
+        Records a round's result for the summary of earlier rounds.
+        """
+        self.played += 1
+        self.net += delta
+        self.won += delta > 0
+        self.showdowns += bool(showdown)
+
+    def trim(self):
+        while len(self.rounds) > max(self.max_rounds, 1) or (
+            len(self.rounds) > 1 and self.round_chars() > self.max_chars
+        ):
+            self.rounds.pop(0)
+            self.summarized += 1
+
+    def round_chars(self):
+        return sum(len(message["content"]) for messages in self.rounds for message in messages)
+
+    def summary(self):
+        """
+        Returns the message summing up the rounds that are no longer kept, or None.
+        """
+        if not self.summarized:
+            return None
+        return {
+            "role": "system",
+            "content": "Only the last {} rounds are shown. Over the {} rounds played so far you won {}, "
+            "your opponent showed down {} times, and your bankroll changed by {}.".format(
+                len(self.rounds), self.played, self.won, self.showdowns, self.net
+            ),
+        }
+
+    def messages(self):
+        """
+        Returns the messages for the next request.
+        """
+        summary = self.summary()
+        messages = list(self.preamble)
+        if summary is not None:
+            messages.append(summary)
+        for round_messages in self.rounds:
+            messages.extend(round_messages)
+        return messages
+
+    def record(self, content, reply):
+        """
+        Adds a user message and a reply that was not asked of the model.
+        """
+        self.rounds[-1].append({"role": "user", "content": content})
+        self.rounds[-1].append({"role": "assistant", "content": reply})
+        self.trim()
+
+    def ask(self, chat, content, fallback=None, valid=None, key=None):
+        """
+        Adds a user message, gets the reply from chat(messages) or the cache, and adds the reply.
+        If chat returns None, because the model did not answer in time, or a reply that
+        valid(reply) rejects, the reply is fallback() instead and nothing is cached.
+
+        Replies are cached by key, such as a decision_key, or by content if key is None.
+        """
+        self.rounds[-1].append({"role": "user", "content": content})
+        self.trim()
+        messages = self.messages()
+
+        def request():
+            self.requests += 1
+            return chat(messages)
+
+        key = content if key is None else key
+        reply = self.cache.get(key, request)
+        if reply is None or (valid is not None and not valid(reply)):
+            self.cache.entries.pop(key, None)
+            reply = fallback() if fallback is not None else ""
+        self.rounds[-1].append({"role": "assistant", "content": reply})
+        return reply
@@ -0,0 +1,178 @@
+"""
+Asks the chat model without ever waiting past a deadline saved up from the game
+clock, and plays a fast local policy when it has not answered in time.
+"""
+
+import concurrent.futures
+import threading
+import time
+import traceback
+
+from skeleton.actions import CallAction, CheckAction, FoldAction, RaiseAction
+from skeleton.clock import Deadline
+from skeleton.equity import adaptive_equity
+from skeleton.states import STARTING_STACK
+
+
+class ClockBank:
+    """
+    Saves up the game clock the model may use, so it can be given deadlines a real
+    model can meet.
+
+    With 5000 rounds on the clock a decision's budget is about 10 ms, far less than
+    a model needs to answer. Each decision deposits its budget and pays for the time
+    it takes, and the model is only asked once at least min_wait seconds are saved,
+    with the savings (up to max_wait) as its deadline. Decisions in between are played
+    by the local policy, and the model never spends more than the decisions saved.
+    """
+
+    def __init__(self, min_wait=0.5, max_wait=10.0):
+        """
+        Arguments:
+        min_wait: the shortest deadline worth giving the model, about its usual latency.
+        max_wait: the longest deadline the model is ever given.
+        """
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.saved = 0.0
+
+    def deposit(self, seconds):
+        self.saved += seconds
+
+    def spend(self, seconds):
+        self.saved -= seconds
+
+    def deadline(self):
+        """
+        Returns the Deadline for asking the model now, or None if too little is saved.
+        """
+        if self.saved < self.min_wait:
+            return None
+        return Deadline(min(self.saved, self.max_wait))
+
+
+class AsyncChat:
+    """
+    Sends each chat request on a background thread and waits for the reply only
+    until a deadline. A request that misses its deadline keeps running and its late
+    reply is dropped, so a slow model never stalls the engine.
+
+    Each request is given a timeout of its deadline plus grace seconds, so its thread
+    ends soon after, and no new request is sent while max_pending are still within
+    their timeout. A request whose timeout has passed no longer counts, so a model
+    client that ignores its timeout can't keep the model out for the rest of the match.
+    """
+
+    def __init__(self, chat, max_pending=4, grace=1.0):
+        """
+        Arguments:
+        chat: a function from a list of messages and a timeout in seconds to the
+            model's reply, which may block until the timeout.
+        max_pending: the most requests running at once.
+        grace: the seconds a request may run past its deadline.
+        """
+        self.chat = chat
+        self.max_pending = max_pending
+        self.grace = grace
+        self.pending = []
+        self.answered = 0
+        self.timed_out = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def request(self, messages, timeout):
+        """
+        Starts a request and returns a Future for its reply.
+        """
+        future = concurrent.futures.Future()
+
+        def work():
+            try:
+                future.set_result(self.chat(messages, timeout))
+            except Exception as error:
+                future.set_exception(error)
+
+        threading.Thread(target=work, daemon=True).start()
+        return future
+
+    def ask(self, messages, deadline, reserve=0.01):
+        """
+        Returns the model's reply, or None if it did not arrive before the
+        deadline (a clock.Deadline), the request failed or max_pending earlier
+        requests are still running.
+
+        The wait stops reserve seconds before the deadline, leaving that time for the
+        local policy to play instead.
+        """
+        now = time.perf_counter()
+        self.pending = [(future, expires) for future, expires in self.pending if not future.done() and expires > now]
+        if len(self.pending) >= self.max_pending:
+            self.skipped += 1
+            return None
+        timeout = deadline.remaining() + self.grace
+        future = self.request(messages, timeout)
+        self.pending.append((future, now + timeout))
+        try:
+            reply = future.result(timeout=max(0.0, deadline.remaining() - reserve))
+        except concurrent.futures.TimeoutError:
+            self.timed_out += 1
+            return None
+        except Exception:
+            traceback.print_exc()
+            self.failed += 1
+            return None
+        self.answered += 1
+        return reply
+
+
+def fallback_action(round_state, active, deadline=None):
+    """
+    Picks an action from the hand's equity against a random hand and the pot odds.
+    It is exact preflop and on the river and sampled within the deadline on the flop.
+    """
+    legal_actions = round_state.legal_actions()
+    street = round_state.street
+    continue_cost = round_state.pips[1 - active] - round_state.pips[active]
+    pot = 2 * STARTING_STACK - sum(round_state.stacks)
+    pot_odds = continue_cost / (pot + continue_cost) if continue_cost > 0 else 0.
+    strength = adaptive_equity(
+        round_state.hands[active],
+        round_state.deck[:street],
+        thresholds=(0.5, 0.8, pot_odds),
+        deadline=deadline,
+        max_samples=2048,
+    ).mean
+    if strength > 0.8 and RaiseAction in legal_actions:
+        min_raise, max_raise = round_state.raise_bounds()
+        return RaiseAction(min_raise + int((strength - 0.8) * (max_raise - min_raise)))
+    if CheckAction in legal_actions:
+        return CheckAction()
+    if strength > pot_odds:
+        return CallAction()
+    return FoldAction()
+
+
+def parse_reply(reply, round_state):
+    """
+    Returns the action a reply asks for if it is "Fold", "Call", "Check" or
+    "Raise x" and legal in the round, or None.
+    """
+    words = reply.split()
+    legal_actions = round_state.legal_actions()
+    if len(words) == 1 and words[0] in ("Fold", "Call", "Check"):
+        action = {"Fold": FoldAction, "Call": CallAction, "Check": CheckAction}[words[0]]
+        return action() if action in legal_actions else None
+    if len(words) == 2 and words[0] == "Raise" and words[1].isdigit() and RaiseAction in legal_actions:
+        min_raise, max_raise = round_state.raise_bounds()
+        if min_raise <= int(words[1]) <= max_raise:
+            return RaiseAction(int(words[1]))
+    return None
+
+
+def describe(action):
+    """
+    Returns an action written the way the model is asked to reply.
+    """
+    if isinstance(action, RaiseAction):
+        return "Raise " + str(action.amount)
+    return type(action).__name__[: -len("Action")]
@@ -14,8 +14,11 @@ from skeleton.states import (
     RoundState,
     TerminalState,
 )
+from context import ChatContext, decision_key
+from fallback import AsyncChat, ClockBank, describe, fallback_action, parse_reply
 from dotenv import load_dotenv
 import os
+import time
 from pathlib import Path
 
 # Set to True if you want to use GPT-4 to generate responses,
@@ -28,15 +31,22 @@ if USE_GPT:
     env_path = Path(__file__).resolve().parent.parent / ".env"  # Path to .env file
     load_dotenv(dotenv_path=env_path)
     openai.api_key = os.getenv("API_KEY") # Enter your API key here
+    # point this at mock_chat_server.py to play or benchmark offline
+    openai.api_base = os.getenv("OPENAI_API_BASE", openai.api_base)
 
 
-def chat(messages):
+def chat(messages, timeout):
     response = openai.ChatCompletion.create(
-        model="gpt-4-1106-preview", messages=messages
+        model="gpt-4-1106-preview", messages=messages, request_timeout=timeout
     )
     return response.choices[0].message.content.strip()
 
 
+# the model is asked once decisions have saved up LLM_MIN_WAIT seconds of their clock
+# budgets, and waited for up to LLM_TIMEOUT seconds; the local policy plays otherwise
+LLM_MIN_WAIT = 0.5
+LLM_TIMEOUT = 10.0
+
 ROLE = "You are an expert Poker player who is also good at playing different variants."
 
 GAME_RULES = """
@@ -82,13 +92,19 @@ class Player(Bot):
         Returns:
         Nothing.
         """
-        self.messages = [
-            {"role": "system", "content": ROLE},
-            {"role": "user", "content": GAME_RULES},
-            {"role": "assistant", "content": ASSISTANT_AGREES},
-        ]
+        # the rules preamble plus a bounded window of recent rounds, instead of the whole match
+        self.context = ChatContext(
+            [
+                {"role": "system", "content": ROLE},
+                {"role": "user", "content": GAME_RULES},
+                {"role": "assistant", "content": ASSISTANT_AGREES},
+            ]
+        )
         self.new_message = ""
-        self.is_gpt = False
+        self.is_gpt = USE_GPT
+        self.llm = AsyncChat(chat)
+        # lets the model play under ENFORCE_GAME_CLOCK, on the clock decisions save up
+        self.clock_bank = ClockBank(LLM_MIN_WAIT, LLM_TIMEOUT)
 
     def handle_new_round(self, game_state, round_state, active):
         """
@@ -110,6 +126,7 @@ class Player(Bot):
         # round_num = game_state.round_num  # the round number from 1 to NUM_ROUNDS
         # my_cards = round_state.hands[active]  # your cards
         big_blind = bool(active)  # True if you are the big blind
+        self.context.new_round()
         print(
             "================================NEW ROUND==================================="
         )
@@ -147,15 +164,15 @@ class Player(Bot):
             + "! Onto the next round - Say yes to continue."
         )
         print()
+        self.context.end_round(my_delta, opp_cards)
 
         if self.is_gpt:
-            self.messages.append({"role": "user", "content": self.new_message})
-            response = chat(self.messages)
-            self.messages.append({"role": "assistant", "content": response})
-
-        ask = input("Press enter to continue, or q to quit!\n")
-        if ask in ["q", "quit", "Quit"]:
-            exit()
+            # the model has nothing to decide here, so its reply is recorded without asking
+            self.context.record(self.new_message, "Yes")
+        else:
+            ask = input("Press enter to continue, or q to quit!\n")
+            if ask in ["q", "quit", "Quit"]:
+                exit()
 
     def get_action(self, game_state, round_state, active):
         """
@@ -243,20 +260,31 @@ class Player(Bot):
             max_cost = max_raise - my_pip  # the cost of a maximum bet/raise
 
         if self.is_gpt:
-            self.messages.append({"role": "user", "content": self.new_message})
-            response = chat(self.messages)
-            self.messages.append({"role": "assistant", "content": response})
+            # without a usable reply before the deadline, or enough clock saved to ask,
+            # the equity-based local policy plays instead, and its move is what the
+            # context caches and shows the model
+            start = time.perf_counter()
+            budget = self.time_budget.deadline(game_state, round_state)
+            self.clock_bank.deposit(budget.remaining())
+            deadline = self.clock_bank.deadline()
+            response = self.context.ask(
+                lambda messages: self.llm.ask(messages, deadline) if deadline is not None else None,
+                self.new_message,
+                lambda: describe(fallback_action(round_state, active, budget)),
+                lambda reply: parse_reply(reply, round_state) is not None,
+                decision_key(
+                    my_cards,
+                    board_cards,
+                    active,
+                    my_contribution,
+                    continue_cost,
+                    legal_actions,
+                ),
+            )
+            self.clock_bank.spend(time.perf_counter() - start)
             print("GPT-4:", response)
-            response = response.split()
-            if len(response) == 1:
-                act = response[0]
-            elif len(response) == 2:
-                act, num = response
-                num = int(num)
-            else:
-                print("Error: GPT gave too many words.")
-                exit()
             self.new_message = ""
+            return parse_reply(response, round_state)
         else:
             active = input("Enter your move:\n")
             act = None
@@ -0,0 +1,189 @@
+'''
+Tracks a posterior over the opponent's holdings during a hand.
+
+The range is a dense weight vector over all C(52, 3) holdings, like the ranges in
+skeleton/ranges.py. Cards we see remove holdings with one mask, and every
+opponent action multiplies the whole vector by a likelihood, one NumPy operation
+each. The likelihood follows how strong each holding is on the current board: a
+bet or raise is likely from the top of the opponent's current range, a call from
+above its folding threshold and a check from below its betting threshold. How
+much of the range bets or folds comes from the opponent's observed frequencies
+in an OpponentStats when there are enough of them.
+'''
+import numpy as np
+
+from .actions import CallAction, CheckAction, RaiseAction
+from .betting import replay
+from .clock import anytime
+from .equity import BOARD_SIZE, CARD_BITS, COMBO_MASKS, PREFLOP_SCALE, cards_mask, preflop_table, river_scores
+from .ranges import NUM_COMBOS, percentiles, remove_blockers, uniform
+
+STRENGTH_RUNOUTS = 4
+# frequencies assumed until the opponent has acted often enough on a street
+DEFAULT_RAISE_FREQUENCY = 0.3
+DEFAULT_FOLD_TO_RAISE = 0.4
+DEFAULT_VPIP = 0.7
+MIN_OBSERVATIONS = 30
+
+
+def holding_strength(board, deadline=None):
+    '''
+    Returns the strength in [0, 1] of every holding on a board (a tuple of 0, 2 or 4 card codes).
+
+    Preflop it is the equity from the preflop table, on the flop the mean percentile
+    over STRENGTH_RUNOUTS river cards drawn with a seed fixed by the board, and on
+    the river the percentile among all holdings. Holdings blocked by the board get 0.
+    Each flop runout costs a few ms, so with a deadline only the runouts that fit are
+    used, but always at least one.
+    '''
+    if not board:
+        table = preflop_table()
+        if table is None:
+            return np.full(NUM_COMBOS, 0.5)
+        return table / PREFLOP_SCALE
+    board_mask = cards_mask(board)
+    if len(board) == BOARD_SIZE:
+        return percentiles(river_scores(board_mask)[None, :])[0]
+    rng = np.random.default_rng(board_mask)
+    live = np.flatnonzero((CARD_BITS & board_mask) == 0)
+    scores = []
+
+    def sample():
+        runout = board_mask | int(CARD_BITS[rng.choice(live, BOARD_SIZE - len(board), replace=False)].sum())
+        scores.append(river_scores(runout))
+
+    if deadline is None:
+        for _ in range(STRENGTH_RUNOUTS):
+            sample()
+    else:
+        anytime(sample, deadline, max_steps=STRENGTH_RUNOUTS)
+    scores = np.array(scores)
+    valid = (scores >= 0).sum(axis=0)
+    return percentiles(scores).sum(axis=0) / np.maximum(valid, 1)
+
+
+def observed(rate, count, default):
+    '''
+    Returns an observed frequency once it rests on enough observations, and the default before.
+    '''
+    return rate if rate is not None and count >= MIN_OBSERVATIONS else default
+
+
+class OpponentRange():
+    '''
+    The opponent's range in the current hand, updated from the actions it takes.
+    '''
+
+    def __init__(self, stats=None, sharpness=12., floor=0.05):
+        '''
+        Arguments:
+        stats: an optional OpponentStats whose frequencies set the action thresholds.
+        sharpness: how steeply the likelihood of an action changes around its threshold.
+        floor: the least likelihood of any action, so bluffs and slowplays keep some weight.
+        '''
+        self.stats = stats
+        self.sharpness = sharpness
+        self.floor = floor
+        self.weights = uniform()
+        self.hole = ()
+        self.board = ()
+        self.decisions = 0
+        self.strengths = {}
+
+    def new_round(self, hole):
+        '''
+        Resets the range to every holding our hole cards do not block.
+        '''
+        self.weights = remove_blockers(uniform(), hole)
+        self.hole = tuple(hole)
+        self.board = ()
+        self.decisions = 0
+        self.strengths = {}
+
+    def see_board(self, board):
+        '''
+        Removes the holdings blocked by newly dealt board cards.
+        '''
+        board = tuple(board)
+        if board != self.board:
+            self.weights = self.weights * ((COMBO_MASKS & cards_mask(board[len(self.board):])) == 0)
+            self.board = board
+
+    def strength(self, board, deadline=None):
+        '''
+        Returns the strength of every holding on a board and the holdings sorted from
+        weakest to strongest, computed once per board in a hand.
+        '''
+        if board not in self.strengths:
+            strength = holding_strength(board, deadline)
+            self.strengths[board] = strength, np.argsort(strength, kind='stable')
+        return self.strengths[board]
+
+    def threshold(self, board, fraction):
+        '''
+        Returns the strength above which the given fraction of the current range lies.
+        '''
+        strength, order = self.strength(board)
+        cumulative = np.cumsum(self.weights[order])
+        if cumulative[-1] <= 0.:
+            return 0.5
+        position = np.searchsorted(cumulative, (1. - fraction) * cumulative[-1])
+        return strength[order[min(position, len(order) - 1)]]
+
+    def likelihood(self, round_state, action, deadline=None):
+        '''
+        Returns the likelihood of an opponent action for every holding, or None if it says nothing.
+        '''
+        street = round_state.street
+        board = tuple(round_state.deck[:street])
+        strength = self.strength(board, deadline)[0]
+        stats = self.stats
+        facing = round_state.pips[1 - round_state.button % 2] > round_state.pips[round_state.button % 2]
+        if isinstance(action, RaiseAction) or isinstance(action, CheckAction):
+            raises = observed(stats and stats.raise_frequency(street), stats and sum(stats.actions[street // 2]),
+                              DEFAULT_RAISE_FREQUENCY)
+            above = 1. / (1. + np.exp(-self.sharpness * (strength - self.threshold(board, raises))))
+            return self.floor + (1. - self.floor) * (above if isinstance(action, RaiseAction) else 1. - above)
+        if isinstance(action, CallAction):
+            if street == 0 and round_state.button == 0:  # completing the small blind
+                continuing = observed(stats and stats.vpip(), stats and stats.rounds, DEFAULT_VPIP)
+            else:
+                folds = observed(stats and stats.fold_to_raise(street), stats and stats.facing_raise[street // 2],
+                                 DEFAULT_FOLD_TO_RAISE)
+                continuing = 1. - folds if facing else 1.
+            above = 1. / (1. + np.exp(-self.sharpness * (strength - self.threshold(board, continuing))))
+            return self.floor + (1. - self.floor) * above
+        return None  # a fold ends the hand
+
+    def observe(self, round_state, action, deadline=None):
+        '''
+        Updates the range with an opponent action and the RoundState it was taken in.
+        '''
+        self.see_board(round_state.deck[:round_state.street])
+        likelihood = self.likelihood(round_state, action, deadline)
+        if likelihood is not None:
+            self.weights = self.weights * likelihood
+
+    def update(self, round_state, active, deadline=None):
+        '''
+        Observes every opponent action since the last update, recovered from the
+        RoundState's history, and any new board cards. Call it at each decision.
+
+        With a deadline, a new flop's strengths use only the runouts that fit, and
+        actions left once it has expired are skipped, so the range stays wider.
+        '''
+        decisions = replay(round_state)
+        for state, action in decisions[self.decisions:]:
+            if state.button % 2 != active and not (deadline is not None and deadline.expired()):
+                self.observe(state, action, deadline)
+        self.decisions = len(decisions)
+        self.see_board(round_state.deck[:round_state.street])
+
+    def posterior(self):
+        '''
+        Returns the range normalized to sum to 1, ready for ranges.range_equity or subgame.solve.
+        '''
+        weights = self.weights
+        if weights.sum() <= 0.:  # every holding was ruled out, so start over from the cards alone
+            weights = remove_blockers(uniform(), self.hole + self.board)
+        return weights / weights.sum()
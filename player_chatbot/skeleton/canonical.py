@@ -0,0 +1,51 @@
+'''
+Suit-isomorphic canonical forms of hands.
+
+Suits have no rank in poker, so hands that differ only by a relabeling of suits
+have the same equity. A canonical form picks one representative per class.
+'''
+import itertools
+
+SUIT_PERMUTATIONS = list(itertools.permutations(range(4)))
+
+
+def relabel(indices, permutation):
+    '''
+    Applies a suit permutation to card indices (rank * 4 + suit), returning them sorted.
+    '''
+    return tuple(sorted(index - index % 4 + permutation[index % 4] for index in indices))
+
+
+def canonical_hole(indices):
+    '''
+    Returns the smallest suit relabeling of a set of hole card indices.
+    '''
+    return min(relabel(indices, permutation) for permutation in SUIT_PERMUTATIONS)
+
+
+def canonical(hole, board=()):
+    '''
+    Maps hole cards and board cards to one representative of their suit-isomorphism class.
+
+    Each suit is described by the ranks it holds in the hole and on the board. Sorting
+    the suits by that description and renaming them in order gives the same result
+    for any relabeling of the suits, and suits with equal descriptions are
+    interchangeable, so ties do not matter.
+
+    Arguments:
+    hole: the hole card indices (rank * 4 + suit).
+    board: the 0, 2 or 4 board card indices.
+
+    Returns:
+    A (hole, board) pair of sorted index tuples, usable as a dictionary key.
+    '''
+    signatures = [[0, 0, suit] for suit in range(4)]
+    for index in hole:
+        signatures[index & 3][0] |= 1 << (index >> 2)
+    for index in board:
+        signatures[index & 3][1] |= 1 << (index >> 2)
+    signatures.sort(reverse=True)
+    permutation = [0] * 4
+    for new_suit, (_, _, suit) in enumerate(signatures):
+        permutation[suit] = new_suit
+    return relabel(hole, permutation), relabel(board, permutation)
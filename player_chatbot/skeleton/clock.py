@@ -0,0 +1,134 @@
+'''
+Turns the remaining game clock into per-decision time budgets.
+'''
+import time
+from .states import NUM_ROUNDS
+
+# relative share of a round's time given to a decision on each street (0, 2 or 4)
+STREET_WEIGHTS = {0: 1.0, 2: 1.5, 4: 2.0}
+
+
+class Deadline():
+    '''
+    A point in time, measured with time.perf_counter, that a computation must finish by.
+    '''
+
+    def __init__(self, seconds):
+        self.start = time.perf_counter()
+        self.end = self.start + max(0., seconds)
+
+    def elapsed(self):
+        '''
+        Returns the number of seconds since the deadline was created.
+        '''
+        return time.perf_counter() - self.start
+
+    def remaining(self):
+        '''
+        Returns the number of seconds left before the deadline, never negative.
+        '''
+        return max(0., self.end - time.perf_counter())
+
+    def expired(self):
+        '''
+        Returns True once the deadline has passed.
+        '''
+        return time.perf_counter() >= self.end
+
+
+class TimeBudget():
+    '''
+    Tracks the game clock sent by the engine and hands out per-decision deadlines.
+
+    The runner calls sync() whenever a message arrives, so remaining() also counts
+    the time already spent on the current message.
+    '''
+
+    def __init__(self, reserve=5.0, overhead_per_round=0.001, max_fraction=0.05, street_weights=STREET_WEIGHTS):
+        '''
+        Arguments:
+        reserve: seconds of clock that are never handed out.
+        overhead_per_round: seconds set aside for every remaining round to cover
+            messaging and bookkeeping outside of get_action.
+        max_fraction: the largest share of the spendable clock a single decision may use.
+        street_weights: relative budget of a decision on each street.
+        '''
+        self.reserve = reserve
+        self.overhead_per_round = overhead_per_round
+        self.max_fraction = max_fraction
+        self.street_weights = dict(street_weights)
+        self.total_weight = sum(self.street_weights.values())
+        self.game_clock = 0.
+        self.synced_at = time.perf_counter()
+
+    def sync(self, game_clock):
+        '''
+        Records the game clock reported by the engine for the message just received.
+        '''
+        self.game_clock = game_clock
+        self.synced_at = time.perf_counter()
+
+    def remaining(self):
+        '''
+        Returns the number of seconds left on the game clock right now.
+        '''
+        return self.game_clock - (time.perf_counter() - self.synced_at)
+
+    def spendable(self, round_num):
+        '''
+        Returns the clock left once the reserve and future per-round overhead are set aside.
+        '''
+        rounds_left = max(1, NUM_ROUNDS - round_num + 1)
+        return self.remaining() - self.reserve - self.overhead_per_round * rounds_left
+
+    def decision_budget(self, game_state, round_state):
+        '''
+        Returns the number of seconds the current decision may take.
+
+        The spendable clock is spread evenly over the remaining rounds (including this
+        one), and a round's share is split across streets by street_weights. Time not
+        used by a round is automatically redistributed, since the budget is recomputed
+        from the clock on every decision.
+        '''
+        spendable = self.spendable(game_state.round_num)
+        if spendable <= 0.:
+            return 0.
+        rounds_left = max(1, NUM_ROUNDS - game_state.round_num + 1)
+        weight = self.street_weights.get(round_state.street, 1.0)
+        budget = spendable / rounds_left * weight / self.total_weight
+        return min(budget, spendable * self.max_fraction)
+
+    def deadline(self, game_state, round_state):
+        '''
+        Returns a Deadline for the current decision.
+        '''
+        return Deadline(self.decision_budget(game_state, round_state))
+
+
+def anytime(step, deadline, min_steps=1, max_steps=None):
+    '''
+    Calls step() repeatedly until the deadline would be overrun.
+
+    Another step is only started if the average step time measured so far still
+    fits in the time that is left, so the loop stops before the deadline rather
+    than after it.
+
+    Arguments:
+    step: a function taking no arguments, called once per iteration.
+    deadline: the Deadline to respect.
+    min_steps: the number of steps run regardless of the deadline.
+    max_steps: an optional cap on the number of steps.
+
+    Returns:
+    The number of steps run.
+    '''
+    steps = 0
+    start = time.perf_counter()
+    while max_steps is None or steps < max_steps:
+        if steps >= min_steps:
+            remaining = deadline.remaining()
+            if remaining <= 0. or (steps and remaining < (time.perf_counter() - start) / steps):
+                break
+        step()
+        steps += 1
+    return steps
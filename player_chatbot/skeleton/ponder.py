@@ -0,0 +1,91 @@
+'''
+Runs a bot's pondering callback on a worker thread while the runner waits for the engine.
+'''
+import threading
+
+
+class PonderTask():
+    '''
+    Handed to Bot.ponder: lets the callback check for cancellation and publish results.
+    '''
+
+    def __init__(self):
+        self.cancel_event = threading.Event()
+        self.result = None
+
+    def cancelled(self):
+        '''
+        Returns True once the engine has sent the next message. Check this often.
+        '''
+        return self.cancel_event.is_set()
+
+    def publish(self, result):
+        '''
+        Stores a (possibly partial) result. The latest one published is handed to the bot.
+        '''
+        self.result = result
+
+
+class Ponderer():
+    '''
+    Starts pondering after each response and cancels it as soon as a message arrives.
+
+    Pondering runs on a thread, so cancellation is cooperative: the callback has to
+    poll task.cancelled() and return promptly. Given the runner's DeferredQueue, the
+    pending deferred jobs are run first, and the callback then holds the queue's
+    run_lock, so it never overlaps a deferred job and the queue's pause() waits for a
+    cancelled callback to return.
+    '''
+
+    def __init__(self, callback, join_timeout=0.01, deferred=None):
+        '''
+        Arguments:
+        callback: called as callback(game_state, round_state, active, task).
+        join_timeout: how long start() waits for a cancelled callback to return.
+        deferred: an optional DeferredQueue whose jobs take priority over pondering.
+        '''
+        self.callback = callback
+        self.join_timeout = join_timeout
+        self.deferred = deferred
+        self.lock = deferred.run_lock if deferred is not None else threading.Lock()
+        self.task = None
+        self.thread = None
+
+    def run(self, task, game_state, round_state, active):
+        if self.deferred is not None:
+            while not task.cancelled() and self.deferred.run_next(idle_only=True):
+                pass
+        with self.lock:
+            # the engine may have replied while a deferred job held the lock
+            if task.cancelled():
+                return
+            result = self.callback(game_state, round_state, active, task)
+        if result is not None:
+            task.publish(result)
+
+    def start(self, game_state, round_state, active):
+        '''
+        Starts pondering, unless the previous callback still has not returned after
+        join_timeout. The runner calls this after responding, when the clock is stopped.
+        '''
+        if self.thread is not None:
+            self.thread.join(self.join_timeout)
+            if self.thread.is_alive():
+                return
+        self.task = PonderTask()
+        self.thread = threading.Thread(target=self.run, args=(self.task, game_state, round_state, active), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        '''
+        Cancels the current callback without waiting for it.
+
+        Returns:
+        The last result it published, or None.
+        '''
+        task = self.task
+        if task is None:
+            return None
+        task.cancel_event.set()
+        self.task = None
+        return task.result
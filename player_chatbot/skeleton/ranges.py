@@ -0,0 +1,193 @@
+'''
+Equity against weighted ranges instead of a uniformly random opponent.
+
+A range is a float array indexed like equity.COMBOS holding the relative likelihood
+of each of the C(52, 3) = 22100 holdings. Holdings that share a card with known
+cards (blockers) are given zero weight before any computation.
+'''
+import itertools
+import numpy as np
+
+from .equity import (BOARD_SIZE, CARD_BITS, COMBOS, COMBO_MASKS, cards_mask, evaluate_masks,
+                     preflop_table, river_equity, river_scores)
+
+NUM_COMBOS = len(COMBOS)
+ALL_MEMBERS = np.arange(NUM_COMBOS)[None, :]
+# CARD_MEMBERS[card] lists the 1275 holdings containing that card
+CARD_MEMBERS = np.argsort(COMBOS.ravel(), kind='stable').reshape(52, 1275) // 3
+# the 3 two-card subsets of each holding, and the 50 holdings containing each two-card subset
+_PAIR_INDEX = np.zeros((52, 52), dtype=np.int64)
+_PAIR_INDEX[tuple(np.array(list(itertools.combinations(range(52), 2))).T)] = np.arange(52 * 51 // 2)
+COMBO_PAIRS = _PAIR_INDEX[COMBOS[:, [0, 0, 1]], COMBOS[:, [1, 2, 2]]]
+PAIR_MEMBERS = np.argsort(COMBO_PAIRS.ravel(), kind='stable').reshape(52 * 51 // 2, 50) // 3
+GROUP_OFFSET = np.int64(1) << 32  # larger than any score
+
+
+def _grouped_points(members, groups, hero_scores, scores, weights):
+    '''
+    Sums, over each hero holding's groups, the villain weight it beats (ties count half).
+
+    Arguments:
+    members: a (groups, size) array listing the holdings in each group.
+    groups: a (heroes, k) array of the groups to add up for each hero holding.
+    hero_scores: the score of each hero holding.
+    scores, weights: the river score and villain weight of every holding.
+
+    Returns:
+    (points, total): per hero holding, the weight beaten plus half the weight tied,
+    and the total weight in its groups.
+    '''
+    count, size = members.shape
+    member_scores = scores[members]
+    order = np.argsort(member_scores, axis=1, kind='stable')
+    prefix = np.zeros((count, size + 1))
+    np.cumsum(np.take_along_axis(weights[members], order, axis=1), axis=1, out=prefix[:, 1:])
+    # one sorted key array for all groups, so a single searchsorted serves every query
+    keys = (np.take_along_axis(member_scores, order, axis=1) + np.arange(count)[:, None] * GROUP_OFFSET).ravel()
+    queries = hero_scores[:, None] + groups * GROUP_OFFSET
+    # a key position p in group g is prefix entry p - g * size of that group, or p + g overall
+    prefix = prefix.ravel()
+    lower = prefix[groups + np.searchsorted(keys, queries, side='left')]
+    upper = prefix[groups + np.searchsorted(keys, queries, side='right')]
+    total = prefix[groups * (size + 1) + size]
+    return (0.5 * (lower + upper)).sum(axis=1), total.sum(axis=1)
+
+
+def uniform():
+    '''
+    Returns the range of a uniformly random opponent.
+    '''
+    return np.ones(NUM_COMBOS)
+
+
+def top_range(fraction):
+    '''
+    Returns the given fraction of holdings with the highest preflop equity, weighted 1.
+
+    Needs the preflop table (see gen_preflop_table.py).
+    '''
+    table = preflop_table()
+    if table is None:
+        raise RuntimeError('top_range needs skeleton/preflop_equity.npy')
+    cutoff = np.quantile(table, 1. - fraction)
+    return (table >= cutoff).astype(np.float64)
+
+
+def remove_blockers(weights, cards):
+    '''
+    Returns a copy of a range with every holding that contains one of the cards set to zero.
+    '''
+    return np.where((COMBO_MASKS & cards_mask(cards)) == 0, weights, 0.)
+
+
+def percentiles(scores):
+    '''
+    Ranks holdings among each other on one or more river boards.
+
+    Arguments:
+    scores: a (boards, holdings) array of river scores, negative where a holding is blocked.
+
+    Returns:
+    An array of the same shape holding the share of unblocked holdings each holding
+    beats on that board (ties counting half), and 0 where it is blocked.
+    '''
+    valid = scores >= 0
+    ordered = np.sort(scores, axis=1)
+    # blocked holdings sort first, so they are subtracted from every count below
+    blocked = (~valid).sum(axis=1, keepdims=True)
+    below = np.array([np.searchsorted(row, values, side='left') for row, values in zip(ordered, scores)])
+    above = np.array([np.searchsorted(row, values, side='right') for row, values in zip(ordered, scores)])
+    ranks = (0.5 * (below + above) - blocked) / np.maximum(valid.sum(axis=1, keepdims=True), 1)
+    return np.where(valid, ranks, 0.)
+
+
+def river_range_equity(board, hero_weights, villain_weights):
+    '''
+    Exact river equity of every hero holding against a villain range, and of range against range.
+
+    Pairs of holdings that share a card are impossible and are left out. Instead of
+    comparing all 22100 x 22100 pairs, villain weight is summed by score within
+    groups of holdings and inclusion-exclusion over the cards each hero holding
+    blocks gives the compatible part:
+        compatible = all - those with one of its cards
+                     + those with two of its cards - itself.
+
+    Arguments:
+    board: the 4 board cards.
+    hero_weights: the hero's range. Only holdings with positive weight are evaluated.
+    villain_weights: the villain's range.
+
+    Returns:
+    (equities, overall): the equity of each holding in the hero range (NaN outside it,
+    0.5 where no villain holding is possible), and the equity of the hero range
+    weighted by how often each matchup occurs.
+    '''
+    board_mask = cards_mask(board)
+    scores = river_scores(board_mask)
+    villain = remove_blockers(villain_weights, board)
+    hero_weights = remove_blockers(hero_weights, board)
+    heroes = np.flatnonzero(hero_weights > 0.)
+    hero_scores = scores[heroes]
+
+    points, total = _grouped_points(ALL_MEMBERS, np.zeros((len(heroes), 1), dtype=np.int64),
+                                    hero_scores, scores, villain)
+    card_points, card_total = _grouped_points(CARD_MEMBERS, COMBOS[heroes], hero_scores, scores, villain)
+    pair_points, pair_total = _grouped_points(PAIR_MEMBERS, COMBO_PAIRS[heroes], hero_scores, scores, villain)
+    # a holding ties with itself, and is counted once in the whole range, three
+    # times among single-card groups and three times among two-card groups
+    points += pair_points - card_points - 0.5 * villain[heroes]
+    total += pair_total - card_total - villain[heroes]
+
+    total = np.maximum(total, 0.)
+    possible = total > 1e-9
+    equities = np.full(NUM_COMBOS, np.nan)
+    equities[heroes] = np.where(possible, points / np.where(possible, total, 1.), 0.5)
+    matchups = hero_weights[heroes] * total
+    overall = (matchups * equities[heroes]).sum() / matchups.sum() if matchups.sum() > 0. else 0.5
+    return equities, overall
+
+
+def sample_range_outcomes(hole, board, villain_weights, samples=1000, rng=None):
+    '''
+    Plays out opponent holdings drawn from a range, with the rest of the board, all at once.
+
+    Returns:
+    A float array holding 1 for each win, 0.5 for each tie and 0 for each loss.
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    board_mask = cards_mask(board)
+    hero_mask = cards_mask(hole) | board_mask
+    live = remove_blockers(villain_weights, list(hole) + list(board))
+    villain = COMBO_MASKS[rng.choice(NUM_COMBOS, samples, p=live / live.sum())]
+    missing = BOARD_SIZE - len(board)
+    runout = np.zeros(samples, dtype=np.int64)
+    if missing:
+        # random keys per card, with cards already dealt sorted last
+        keys = rng.random((samples, 52))
+        keys[(CARD_BITS & (villain | hero_mask)[:, None]) != 0] = 2.
+        drawn = np.argpartition(keys, missing, axis=1)[:, :missing]
+        runout = np.bitwise_or.reduce(CARD_BITS[drawn], axis=1)
+    hero_scores = evaluate_masks(hero_mask | runout)
+    villain_scores = evaluate_masks(villain | board_mask | runout)
+    return 0.5 * (np.sign(hero_scores - villain_scores) + 1.)
+
+
+def range_equity(hole, board, villain_weights, samples=1000, rng=None):
+    '''
+    Returns the equity of a hand against a weighted range (ties count half).
+
+    The river is exact; earlier streets are sampled like equity.sample_equity, but
+    with opponent holdings drawn from the range.
+
+    Arguments:
+    hole: your 3 hole cards.
+    board: the 0, 2 or 4 board cards.
+    villain_weights: the opponent's range.
+    samples: the number of Monte Carlo samples before the river.
+    '''
+    if len(board) == BOARD_SIZE:
+        return river_equity(hole, board, villain_weights)
+    live = remove_blockers(villain_weights, list(hole) + list(board))
+    if live.sum() <= 0.:
+        return 0.5
+    return sample_range_outcomes(hole, board, live, samples, rng).mean()
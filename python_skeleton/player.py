@@ -6,9 +6,14 @@ from skeleton.states import GameState, TerminalState, RoundState
 from skeleton.states import NUM_ROUNDS, STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from skeleton.bot import Bot
 from skeleton.runner import parse_args, run_bot
+from skeleton.equity import equity, adaptive_equity
+from skeleton.blueprint import load_blueprint
+from skeleton.clock import Deadline
+from skeleton.subgame import solve, warm
+from skeleton.stats import OpponentStats
+from skeleton.belief import OpponentRange
 
 import random
-import eval7
 
 
 class Player(Bot):
@@ -26,7 +31,13 @@ class Player(Bot):
         Returns:
         Nothing.
         '''
-        pass
+        # memory-mapped, so this costs well under a millisecond; None unless pack_blueprint.py has been run
+        self.blueprint = load_blueprint()
+        # the runner keeps these statistics up to date, and the range reads its frequencies
+        self.opponent_stats = OpponentStats()
+        self.opponent_range = OpponentRange(self.opponent_stats)
+        # the first solve would otherwise pay for NumPy's first calls on the clock
+        warm()
 
     def handle_new_round(self, game_state, round_state, active):
         '''
@@ -45,7 +56,7 @@ class Player(Bot):
         #round_num = game_state.round_num  # the round number from 1 to NUM_ROUNDS
         #my_cards = round_state.hands[active]  # your cards
         #big_blind = bool(active)  # True if you are the big blind
-        pass
+        self.opponent_range.new_round(round_state.hands[active])
 
     def handle_round_over(self, game_state, terminal_state, active):
         '''
@@ -68,48 +79,17 @@ class Player(Bot):
     
     def evaluate_hand_strength(self, hole_cards, board_cards, num_simulations=1000):
         '''
-        Evaluate the strength of a hand using Monte Carlo simulations.
+        Evaluate the strength of a hand with the skeleton's shared equity engine.
 
         Arguments:
-        hole_cards: a list of two eval7.Card objects representing your hole cards.
-        board_cards: a list of eval7.Card objects representing the board cards.
-        num_simulations: the number of Monte Carlo simulations to run.
+        hole_cards: a list of your three hole cards.
+        board_cards: a list of the board cards.
+        num_simulations: the number of Monte Carlo samples before the river, which is solved exactly.
 
         Returns:
         A float representing the win probability (0.0 to 1.0).
         '''
-        deck = eval7.Deck()
-        for card in hole_cards + board_cards:
-            deck.cards.remove(card)  # Remove known cards from the deck
-
-        wins = 0
-
-        for i in range(num_simulations):
-            deck.shuffle()
-
-            # Deal remaining board cards
-            remaining_board = board_cards + [deck.pop() for _ in range(5 - len(board_cards))]
-
-            # Deal opponent's hole cards
-            opp_hole = [deck.pop(), deck.pop()]
-
-            # Evaluate hands
-            my_hand = hole_cards + remaining_board
-            opp_hand = opp_hole + remaining_board
-
-            my_score = eval7.evaluate(my_hand)
-            opp_score = eval7.evaluate(opp_hand)
-
-            if my_score > opp_score:
-                wins += 1
-            elif my_score == opp_score:
-                wins += 0.5  # Split pot
-            
-            # Early stopping condition
-            if (i > 150) and (wins / (i + 1) > 0.9):  # High confidence in win
-                break
-
-        return wins / num_simulations
+        return equity(hole_cards, board_cards, samples=num_simulations)
 
     def get_action(self, game_state, round_state, active):
         '''
@@ -138,9 +118,6 @@ class Player(Bot):
         min_raise, max_raise = round_state.raise_bounds()
         pot = sum(round_state.pips)
 
-        my_cards = [eval7.Card(card) for card in round_state.hands[active]]
-        board_cards = [eval7.Card(card) for card in round_state.deck[:round_state.street]]
-
         # theres_no_time = False
         # hand_strength = 0
         # if theres_no_time:
@@ -162,12 +139,27 @@ class Player(Bot):
         #         return FoldAction()
         #     return CheckAction()
         
-        # Evaluate hand strength
-        hand_strength = self.evaluate_hand_strength(my_cards, board_cards, num_simulations=500)
+        # Big flop and river pots are solved within the decision's deadline, against the opponent's likely holdings
+        deadline = self.time_budget.deadline(game_state, round_state)
+        # a new flop's strengths cost a few ms per runout, so the range gets a quarter of the deadline
+        self.opponent_range.update(round_state, active, Deadline(deadline.remaining() * 0.25))
+        action = solve(round_state, active, deadline, villain_weights=self.opponent_range.posterior())
+        if action is not None:
+            return action
+
+        # Play from the packed blueprint when it covers this decision
+        if self.blueprint is not None:
+            action = self.blueprint.act(round_state, active)
+            if action is not None:
+                return action
 
         # Pot odds calculation
         pot_odds = continue_cost / (pot + continue_cost) if continue_cost > 0 else 0
 
+        # Evaluate hand strength, sampling only until it is clear which side of each cutoff it is on
+        estimate = adaptive_equity(my_cards, board_cards, thresholds=(0.3, 0.5, 0.8, pot_odds), deadline=deadline)
+        hand_strength = estimate.mean
+
         # Decision logic
         if hand_strength > 0.8:  # Very strong hand
             if RaiseAction in legal_actions:
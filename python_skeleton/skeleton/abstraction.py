@@ -0,0 +1,89 @@
+'''
+Maps cards to card abstraction buckets, using the tables written by gen_buckets.py.
+
+Preflop and flop situations are clustered offline by the distribution of their
+final equity, so hands that play alike share a bucket. River buckets are equity
+ranges, since the equity is exact there. Everything lives in skeleton/buckets.npz,
+about 4 MB that loads once in about 40 ms.
+'''
+import functools
+import os
+import numpy as np
+
+from .canonical import canonical
+from .equity import BOARD_SIZE, combo_index, parse_cards, river_equity
+from .features import pair_index
+
+BUCKETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'buckets.npz')
+
+
+@functools.lru_cache(maxsize=1)
+def bucket_tables():
+    '''
+    Loads the bucket tables, or returns None if they have not been generated.
+
+    The tables are:
+    preflop: the bucket of every holding, indexed by combo_index.
+    flop_holes, flop_starts: the canonical holdings that start each run of flop rows,
+        in increasing combo_index order, and where their runs start (plus the end).
+    flop_pairs: the canonical 2-card flop of each row, as a pair_index.
+    flop: the bucket of each flop row.
+    river_edges: the equity boundaries between river buckets.
+    '''
+    try:
+        with np.load(BUCKETS_PATH) as data:
+            return {name: data[name] for name in data.files}
+    except OSError:
+        return None
+
+
+def num_buckets(street):
+    '''
+    Returns the number of buckets on a street (0, 2 or 4), or None if the tables are missing.
+    '''
+    tables = bucket_tables()
+    if tables is None:
+        return None
+    if street == BOARD_SIZE:
+        return len(tables['river_edges']) + 1
+    return int(tables['preflop' if street == 0 else 'flop'].max()) + 1
+
+
+def flop_bucket(tables, hole, board):
+    '''
+    Looks up the bucket of hole and flop card indices in the canonical flop rows.
+    '''
+    hole, board = canonical(hole, board)
+    position = int(np.searchsorted(tables['flop_holes'], combo_index(hole)))
+    first, last = int(tables['flop_starts'][position]), int(tables['flop_starts'][position + 1])
+    row = first + int(np.searchsorted(tables['flop_pairs'][first:last], pair_index(board)))
+    return int(tables['flop'][row])
+
+
+def bucket(hole, board):
+    '''
+    Returns the bucket of hole cards on a board of 0, 2 or 4 cards, given card codes,
+    or None if the tables are missing.
+    '''
+    tables = bucket_tables()
+    if tables is None:
+        return None
+    if not board:
+        return int(tables['preflop'][combo_index(parse_cards(hole))])
+    if len(board) == BOARD_SIZE:
+        return int(np.searchsorted(tables['river_edges'], river_equity(hole, board), side='right'))
+    return flop_bucket(tables, parse_cards(hole), parse_cards(board))
+
+
+def street_buckets(hole, board):
+    '''
+    Returns the buckets of hole cards on the preflop, flop and river of a complete 4-card board,
+    or None if the tables are missing.
+    '''
+    tables = bucket_tables()
+    if tables is None:
+        return None
+    hole_indices, board_indices = parse_cards(hole), parse_cards(board)
+    return (int(tables['preflop'][combo_index(hole_indices)]),
+            flop_bucket(tables, hole_indices, board_indices[:2]),
+            int(np.searchsorted(tables['river_edges'], river_equity(hole, board), side='right')))
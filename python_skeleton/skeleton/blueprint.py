@@ -0,0 +1,79 @@
+'''
+Plays from a blueprint strategy trained by train_cfr.py and packed by pack_blueprint.py.
+
+The packed blueprint is two .npy files next to this module: the sorted 64-bit
+infoset keys, and one row of 8-bit quantized action probabilities per key. Both
+are memory-mapped, so loading only reads their headers and a lookup faults in the
+few pages its binary search and row touch.
+'''
+import os
+import random
+import numpy as np
+
+from .abstraction import bucket
+from .betting import abstract_actions, history, infoset_key
+
+BLUEPRINT_PREFIX = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'blueprint')
+QUANTIZATION = 255
+
+
+def blueprint_paths(prefix=BLUEPRINT_PREFIX):
+    '''
+    Returns the paths of the keys and probabilities files of a packed blueprint.
+    '''
+    return prefix + '_keys.npy', prefix + '_strategy.npy'
+
+
+def load_blueprint(prefix=BLUEPRINT_PREFIX):
+    '''
+    Returns the packed Blueprint at prefix, or None if it has not been generated.
+    '''
+    if not all(os.path.exists(path) for path in blueprint_paths(prefix)):
+        return None
+    return Blueprint(prefix)
+
+
+class Blueprint():
+    '''
+    The average strategy of every packed information set, looked up by infoset_key.
+    '''
+
+    def __init__(self, prefix=BLUEPRINT_PREFIX):
+        keys_path, strategy_path = blueprint_paths(prefix)
+        self.keys = np.load(keys_path, mmap_mode='r')
+        self.probabilities = np.load(strategy_path, mmap_mode='r')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def strategy(self, key):
+        '''
+        Returns the action probabilities per slot of an information set, or None if it was not packed.
+        '''
+        row = int(np.searchsorted(self.keys, np.uint64(key)))
+        if row == len(self.keys) or int(self.keys[row]) != key:
+            return None
+        return self.probabilities[row] / float(QUANTIZATION)
+
+    def act(self, round_state, active, rng=random):
+        '''
+        Samples an action for the current decision.
+
+        Returns:
+        The action, or None if the information set is not in the blueprint, or the
+        bucket tables are missing, and the bot should fall back to its own logic.
+        '''
+        street = round_state.street
+        card_bucket = bucket(round_state.hands[active], round_state.deck[:street])
+        if card_bucket is None:
+            return None
+        betting, raises = history(round_state)
+        key = infoset_key(street, card_bucket, betting)
+        probabilities = self.strategy(key)
+        if probabilities is None:
+            return None
+        actions = abstract_actions(round_state, raises)
+        weights = [float(probabilities[slot]) for slot, _ in actions]
+        if sum(weights) <= 0.:
+            return None
+        return rng.choices(actions, weights)[0][1]
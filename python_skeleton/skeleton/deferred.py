@@ -0,0 +1,103 @@
+'''
+A bounded queue of deferred work, drained while the runner waits on the engine.
+'''
+import collections
+import threading
+import traceback
+
+
+class DeferredQueue():
+    '''
+    Runs submitted jobs in order on a worker thread, only while the runner is idle.
+
+    Learning updates and other bookkeeping submitted from handle_round_over or
+    get_action are then done on the opponent's time instead of our game clock.
+    Jobs never run concurrently with each other or with the bot's own callbacks,
+    since pause() waits for a running job to finish, and the queue is flushed when
+    the engine sends Q. The runner's Ponderer runs pending jobs before pondering and
+    holds run_lock while it ponders, so jobs never overlap a ponder callback either. Keep jobs short, as a message waits on the
+    one running.
+    '''
+
+    def __init__(self, maxsize=256):
+        '''
+        Arguments:
+        maxsize: the largest number of pending jobs. Submitting to a full queue runs
+            the oldest pending job right away on the caller's thread.
+        '''
+        self.maxsize = maxsize
+        self.jobs = collections.deque()
+        self.condition = threading.Condition()
+        self.run_lock = threading.Lock()
+        self.idle = False
+        self.thread = None
+        self.completed = 0
+        self.overflowed = 0
+
+    def submit(self, function, *args):
+        '''
+        Queues function(*args) to run later.
+        '''
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.work, daemon=True)
+            self.thread.start()
+        if len(self.jobs) >= self.maxsize:
+            self.overflowed += 1
+            self.run_next()
+        with self.condition:
+            self.jobs.append((function, args))
+            self.condition.notify()
+
+    def run_next(self, idle_only=False):
+        '''
+        Runs the oldest pending job, if any. Returns False if nothing was run.
+        '''
+        with self.run_lock:
+            with self.condition:
+                if not self.jobs or (idle_only and not self.idle):
+                    return False
+                function, args = self.jobs.popleft()
+            function(*args)
+            self.completed += 1
+        return True
+
+    def work(self):
+        while True:
+            with self.condition:
+                while not (self.idle and self.jobs):
+                    self.condition.wait()
+            try:
+                self.run_next(idle_only=True)
+            except Exception:  # keep draining; the traceback lands in the bot's log
+                traceback.print_exc()
+
+    def resume(self):
+        '''
+        Lets the worker drain the queue. Called by the runner before it waits for a message.
+        '''
+        if self.thread is not None:
+            with self.condition:
+                self.idle = True
+                self.condition.notify()
+
+    def pause(self):
+        '''
+        Stops the worker from starting new jobs and waits for a running job, or a
+        cancelled ponder callback, to finish, so neither touches the bot's state while
+        it handles a message. Called by the runner when a message arrives.
+        '''
+        self.idle = False
+        # run_next and Ponderer.run hold run_lock for their whole job, and run_next
+        # checks idle before starting one
+        with self.run_lock:
+            pass
+
+    def flush(self):
+        '''
+        Runs every pending job before returning.
+        '''
+        while self.run_next():
+            pass
+
+    def __len__(self):
+        return len(self.jobs)
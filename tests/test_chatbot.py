@@ -0,0 +1,61 @@
+'''
+Checks that player_chatbot/fallback.py never waits on the chat model past a deadline.
+'''
+import json
+import os
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'python_skeleton'))
+sys.path.append(os.path.join(ROOT, 'player_chatbot'))  # after python_skeleton, whose skeleton it shares
+from fallback import AsyncChat, ClockBank
+from mock_chat_server import MockChatServer
+from skeleton.clock import Deadline
+
+MESSAGES = [{'role': 'user', 'content': 'Onto the next round - Say yes to continue.'}]
+
+
+def client(api_base):
+    '''
+    Returns a chat function for AsyncChat that gives up after its timeout, like the OpenAI client's request_timeout.
+    '''
+    def chat(messages, timeout):
+        body = json.dumps({'model': 'gpt-4-1106-preview', 'messages': messages}).encode()
+        request = urllib.request.Request(api_base + '/chat/completions', data=body,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)['choices'][0]['message']['content']
+
+    return chat
+
+
+def test_hanging_model_does_not_lock_out():
+    server = MockChatServer(0, latency=0.01, per_kb=0., stall_fraction=1., stall=30.).start()
+    try:
+        llm = AsyncChat(client(server.api_base), max_pending=2, grace=0.1)
+        for _ in range(6):
+            deadline = Deadline(0.05)
+            assert llm.ask(MESSAGES, deadline) is None
+            assert deadline.elapsed() < 0.1
+        assert llm.timed_out + llm.skipped == 6
+        server.stall_fraction = 0.
+        time.sleep(0.3)  # every hung request is past its timeout
+        assert llm.ask(MESSAGES, Deadline(1.)) == 'Yes'
+    finally:
+        server.shutdown()
+
+
+def test_clock_bank_waits_for_enough_clock():
+    bank = ClockBank(min_wait=0.5, max_wait=2.)
+    for _ in range(40):
+        bank.deposit(0.01)
+        assert bank.deadline() is None
+    bank.deposit(0.1)
+    assert 0.4 < bank.deadline().remaining() <= 0.5
+    bank.spend(0.45)
+    assert bank.deadline() is None
+    bank.deposit(10.)
+    assert bank.deadline().remaining() <= 2.
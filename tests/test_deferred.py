@@ -0,0 +1,41 @@
+'''
+Checks that skeleton/deferred.py keeps jobs off the bot's callbacks.
+'''
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python_skeleton'))
+from skeleton.bot import Bot
+from skeleton.deferred import DeferredQueue
+from skeleton.runner import Runner
+
+
+def test_pause_waits_for_running_job():
+    queue = DeferredQueue()
+    started = threading.Event()
+    finished = []
+
+    def slow_job():
+        started.set()
+        time.sleep(0.1)
+        finished.append(time.perf_counter())
+
+    queue.submit(slow_job)
+    queue.resume()
+    assert started.wait(1.)
+    queue.pause()
+    assert finished and finished[0] <= time.perf_counter()
+
+
+def test_runner_keeps_bots_empty_queue():
+    class QueueBot(Bot):
+        def __init__(self):
+            self.deferred = DeferredQueue(maxsize=8)
+
+    bot = QueueBot()
+    queue = bot.deferred
+    assert len(queue) == 0  # empty, so falsy
+    runner = Runner(bot, None)
+    assert runner.deferred is queue and bot.deferred is queue
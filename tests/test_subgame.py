@@ -0,0 +1,50 @@
+'''
+Checks that skeleton/subgame.py solves spots within the default per-decision budget.
+'''
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python_skeleton'))
+from skeleton.actions import CallAction, CheckAction, RaiseAction
+from skeleton.clock import TimeBudget
+from skeleton.equity import CARD_CODES
+from skeleton.states import BIG_BLIND, SMALL_BLIND, STARTING_STACK, GameState, RoundState
+from skeleton.subgame import solve, warm
+
+
+def facing_bet(street, seed):
+    '''
+    Returns a RoundState where the player to act faces a bet into a raised pot on the given street (2 or 4).
+    '''
+    cards = random.Random(seed).sample(CARD_CODES, 10)
+    round_state = RoundState(0, 0, [SMALL_BLIND, BIG_BLIND], [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND],
+                             [cards[:3], cards[3:6]], cards[6:], None)
+    round_state = round_state.proceed(RaiseAction(40)).proceed(CallAction())
+    if street == 4:
+        round_state = round_state.proceed(CheckAction()).proceed(CheckAction())
+    return round_state.proceed(RaiseAction(40))
+
+
+@pytest.mark.parametrize('street', [2, 4])
+def test_solve_acts_within_default_budget(street):
+    warm()
+    time_budget = TimeBudget()
+    time_budget.sync(180.)
+    acted = 0
+    for seed in range(5):
+        round_state = facing_bet(street, seed)
+        rng = np.random.default_rng(seed)
+        deadline = time_budget.deadline(GameState(0, 180., 1), round_state)
+        budget = deadline.remaining()
+        start = time.perf_counter()
+        action = solve(round_state, round_state.button % 2, deadline, rng=rng)
+        elapsed = time.perf_counter() - start
+        # the last iteration may end just past the deadline
+        acted += type(action) in round_state.legal_actions() and elapsed < budget + 0.002
+    # on a busy machine the test itself can be descheduled for a few ms, so one spot may miss
+    assert acted >= 4
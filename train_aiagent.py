@@ -0,0 +1,243 @@
+'''
+Trains AIAgent's Q-learning weights offline with parallel in-process self-play.
+
+Each worker process plays a match of AIAgent against a copy of itself or one of
+the other bots. The bots' Player objects are driven directly with the same
+RoundStates and callbacks the runner would give them, so there is no engine and
+no sockets. Worker agents start from the current weights and learn from every
+decision with exploration on. After every epoch their weights are averaged,
+weighted by the transitions each one learned from, and written to
+AIAgent/weights.npz, which AIAgent's Player loads at startup. player_chatbot is
+left out since it needs the OpenAI API.
+
+Usage: python train_aiagent.py [--epochs E] [--rounds R] [--workers W] [--opponents BOT ...] [--out PATH] [--resume]
+'''
+import argparse
+import contextlib
+import importlib.util
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import eval7
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# every bot's `from skeleton...` imports resolve to AIAgent's copy, which is kept in sync with the others
+sys.path.insert(0, os.path.join(ROOT, 'AIAgent'))
+from skeleton.actions import CheckAction, FoldAction, RaiseAction
+from skeleton.clock import TimeBudget
+from skeleton.equity import CARD_CODES
+from skeleton.states import BIG_BLIND, SMALL_BLIND, STARTING_STACK, GameState, RoundState, TerminalState
+from skeleton.stats import OpponentStats
+
+BOTS = ('AIAgent', 'all_in_bot', 'davidsbot', 'python_skeleton')
+EVAL7_CARDS = {code: eval7.Card(code) for code in CARD_CODES}
+MODULES = {}
+
+
+def load_module(name):
+    '''
+    Imports a bot's player.py once per process, under a name of its own.
+    '''
+    module = MODULES.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location('bot_' + name, os.path.join(ROOT, name, 'player.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        MODULES[name] = module
+    return module
+
+
+class InlineQueue():
+    '''
+    Stands in for the runner's DeferredQueue by running jobs as soon as they are
+    submitted, since offline there is no opponent's time to wait for.
+    '''
+
+    def submit(self, function, *args):
+        function(*args)
+
+    def flush(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class Seat():
+    '''
+    A bot in an in-process match, with the bookkeeping the runner would do for it.
+    '''
+
+    def __init__(self, bot, game_clock):
+        self.bot = bot
+        self.time_budget = getattr(bot, 'time_budget', None) or TimeBudget()
+        bot.time_budget = self.time_budget
+        bot.ponder_result = None
+        bot.deferred = InlineQueue()
+        self.opponent_stats = getattr(bot, 'opponent_stats', None) or OpponentStats()
+        bot.opponent_stats = self.opponent_stats
+        self.bankroll = 0
+        self.game_clock = game_clock
+
+    def game_state(self, round_num):
+        return GameState(self.bankroll, self.game_clock, round_num)
+
+    def query(self, round_state, view, active, round_num):
+        '''
+        Asks the bot for an action and charges its clock, replacing illegal actions like the engine does.
+        '''
+        legal_actions = round_state.legal_actions()
+        if self.game_clock > 0.:
+            self.time_budget.sync(self.game_clock)
+            start = time.perf_counter()
+            action = self.bot.get_action(self.game_state(round_num), view, active)
+            self.game_clock -= time.perf_counter() - start
+            if self.game_clock > 0. and type(action) in legal_actions:
+                if not isinstance(action, RaiseAction):
+                    return action
+                # the amount goes over the socket as text, so only whole numbers of chips get through
+                amount = str(action.amount)
+                min_raise, max_raise = round_state.raise_bounds()
+                if amount.isdigit() and min_raise <= int(amount) <= max_raise:
+                    return RaiseAction(int(amount))
+        return CheckAction() if CheckAction in legal_actions else FoldAction()
+
+
+def advance(view, action, board):
+    '''
+    Moves a player's view of the round along, dealing it the board of a new street.
+    '''
+    view = view.proceed(action)
+    if isinstance(view, RoundState) and len(view.deck) != view.street:
+        view = RoundState(view.button, view.street, view.pips, view.stacks, view.hands, board[:view.street],
+                          view.previous_state)
+    return view
+
+
+def play_round(seats, round_num, rng):
+    '''
+    Plays one round, with seats[0] on the small blind. Returns the deltas.
+    '''
+    cards = rng.sample(CARD_CODES, 10)
+    hands = [cards[:3], cards[3:6]]
+    board = cards[6:]
+    pips = [SMALL_BLIND, BIG_BLIND]
+    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+    round_state = RoundState(0, 0, pips, stacks, hands, board, None)
+    views = []
+    for active, seat in enumerate(seats):
+        seen = [[], []]
+        seen[active] = hands[active]
+        views.append(RoundState(0, 0, pips, stacks, seen, [], None))
+        seat.opponent_stats.new_round()
+        seat.bot.handle_new_round(seat.game_state(round_num), views[active], active)
+    while isinstance(round_state, RoundState):
+        active = round_state.button % 2
+        action = seats[active].query(round_state, views[active], active, round_num)
+        seats[1 - active].opponent_stats.observe(views[1 - active], action)
+        round_state = round_state.proceed(action)
+        views = [advance(view, action, board) for view in views]
+
+    folded = isinstance(action, FoldAction)
+    if folded:
+        deltas = round_state.deltas
+    else:  # showdown, scored as the engine does
+        scores = [eval7.evaluate([EVAL7_CARDS[card] for card in board + hand]) for hand in hands]
+        stacks = round_state.previous_state.stacks
+        delta = STARTING_STACK - stacks[1] if scores[0] > scores[1] else stacks[0] - STARTING_STACK if scores[0] < scores[1] else 0
+        deltas = [delta, -delta]
+    for active, seat in enumerate(seats):
+        previous_state = views[active].previous_state
+        if not folded:
+            revealed = list(previous_state.hands)
+            revealed[1 - active] = hands[1 - active]
+            previous_state = RoundState(previous_state.button, previous_state.street, previous_state.pips,
+                                        previous_state.stacks, revealed, previous_state.deck, previous_state.previous_state)
+            seat.opponent_stats.showdown(hands[1 - active], board)
+        seat.bankroll += deltas[active]
+        seat.bot.handle_round_over(seat.game_state(round_num), TerminalState(list(deltas), previous_state), active)
+    return deltas
+
+
+def new_agent(weights, epsilon, alpha, seed):
+    '''
+    Returns an AIAgent Player that starts from the given weights and keeps learning and exploring.
+    '''
+    module = load_module('AIAgent')
+    bot = module.Player()
+    bot.myAgent = module.QLearningAgent(epsilon=epsilon, alpha=alpha, numTraining=float('inf'), weights=weights, seed=seed)
+    return bot
+
+
+def work(task):
+    '''
+    Plays one match from the current weights and returns what the learning agents learned.
+    '''
+    weights, opponent, rounds, game_clock, epsilon, alpha, seed = task
+    rng = random.Random(seed)
+    random.seed(seed)  # the bots draw from the global generator
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        trainee = new_agent(weights, epsilon, alpha, seed)
+        other = new_agent(weights, epsilon, alpha, seed + 1) if opponent == 'AIAgent' else load_module(opponent).Player()
+        learners = [trainee] + ([other] if opponent == 'AIAgent' else [])
+        seats = [Seat(trainee, game_clock), Seat(other, game_clock)]
+        start = time.perf_counter()
+        for round_num in range(1, rounds + 1):
+            play_round(seats if round_num % 2 else seats[::-1], round_num, rng)
+        elapsed = time.perf_counter() - start
+    learned = [(bot.myAgent.weights, bot.myAgent.replay.added) for bot in learners]
+    return opponent, learned, seats[0].bankroll, rounds, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python train_aiagent.py')
+    parser.add_argument('--epochs', type=int, default=20, help='Rounds of matches between weight averages')
+    parser.add_argument('--rounds', type=int, default=500, help='Rounds per match')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Worker processes to run')
+    parser.add_argument('--opponents', type=str, nargs='+', default=list(BOTS), choices=BOTS,
+                        help='Bots to play against, taken in turn by the workers; AIAgent means self-play')
+    parser.add_argument('--game-clock', type=float, default=180., help='Seconds on each bot\'s clock per match')
+    parser.add_argument('--epsilon', type=float, default=0.1, help='Exploration rate while training')
+    parser.add_argument('--alpha', type=float, default=0.05, help='Learning rate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=str, default=os.path.join(ROOT, 'AIAgent', 'weights.npz'), help='Weights file')
+    parser.add_argument('--resume', action='store_true', help='Continue from the weights in --out')
+    args = parser.parse_args()
+
+    module = load_module('AIAgent')
+    weights = module.loadWeights(args.out) if args.resume else None
+    if weights is None:
+        weights = np.zeros((module.NUM_KINDS, module.NUM_FEATURES))
+    total_rounds = 0
+    with multiprocessing.Pool(args.workers) as pool:
+        for epoch in range(args.epochs):
+            tasks = [(weights, args.opponents[(epoch * args.workers + worker) % len(args.opponents)], args.rounds,
+                      args.game_clock, args.epsilon, args.alpha, args.seed * 1000003 + epoch * args.workers + worker)
+                     for worker in range(args.workers)]
+            start = time.perf_counter()
+            merged = np.zeros_like(weights)
+            transitions = 0
+            worker_time = 0.
+            results = []
+            for opponent, learned, bankroll, rounds, elapsed in pool.imap_unordered(work, tasks):
+                for learner_weights, count in learned:
+                    merged += count * learner_weights
+                    transitions += count
+                total_rounds += rounds
+                worker_time += elapsed
+                results.append('{} {:+.1f}'.format(opponent, bankroll / rounds))
+            if transitions:
+                weights = merged / transitions
+            module.saveWeights(weights, args.out, rounds=total_rounds)
+            print('epoch {}: {} rounds, chips/round vs {}, {:.0f} transitions/s per core, {:.0f}s wall'.format(
+                epoch + 1, total_rounds, ', '.join(sorted(results)), transitions / worker_time,
+                time.perf_counter() - start))
+    print('Wrote {} ({} bytes)'.format(args.out, os.path.getsize(args.out)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+'''
+Trains a blueprint strategy for B4G Hold'em with external-sampling Monte Carlo CFR.
+
+The game is the real one (3 betting rounds, blinds 5/10, 500-chip stacks, the
+skeleton's RoundState rules) played over the betting abstraction in
+skeleton/betting.py and the card buckets in skeleton/abstraction.py. Each
+iteration deals one hand and traverses the tree once for each player: every
+action of the traversing player is explored and its regrets updated, while the
+opponent's actions are sampled from the current strategy and added to the
+average strategy.
+
+Worker processes train from the latest checkpoint for a round of iterations and
+send back their regret and strategy increments, which are summed into the
+checkpoint. The average strategy is written as the blueprint after every round.
+
+Usage: python train_cfr.py [--iterations N] [--round-iterations R] [--workers W] [--out DIR] [--resume]
+'''
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'python_skeleton'))
+from skeleton.abstraction import bucket_tables, street_buckets
+from skeleton.actions import FoldAction
+from skeleton.betting import HALF_POT, NUM_ACTIONS, SLOT_CODES, abstract_actions, infoset_key
+from skeleton.equity import CARD_CODES, cards_mask, combo_index, parse_cards, river_scores
+from skeleton.states import BIG_BLIND, SMALL_BLIND, STARTING_STACK, RoundState, TerminalState
+
+DEALS_PER_BOARD = 32
+
+
+class Solver():
+    '''
+    Regret and average strategy tables, keyed by infoset_key, with one value per action slot.
+    '''
+
+    def __init__(self):
+        self.regrets = {}
+        self.strategy = {}
+        self.rng = random.Random()
+
+    def current_strategy(self, key, slots):
+        '''
+        Regret matching: play each action in proportion to its positive regret.
+        '''
+        regrets = self.regrets.get(key)
+        if regrets is None:
+            return [1. / len(slots)] * len(slots)
+        positive = [max(0., regrets[slot]) for slot in slots]
+        total = sum(positive)
+        if total <= 0.:
+            return [1. / len(slots)] * len(slots)
+        return [value / total for value in positive]
+
+    def traverse(self, state, betting, raises, traverser, buckets, scores):
+        '''
+        Returns the traverser's expected payoff from a decision, updating the tables on the way.
+        '''
+        active = state.button % 2
+        street = state.street
+        key = infoset_key(street, buckets[active][street // 2], betting)
+        actions = abstract_actions(state, raises)
+        slots = [slot for slot, _ in actions]
+        strategy = self.current_strategy(key, slots)
+
+        if active != traverser:
+            choice = self.rng.choices(range(len(actions)), strategy)[0]
+            sums = self.strategy.setdefault(key, [0.] * NUM_ACTIONS)
+            for slot, probability in zip(slots, strategy):
+                sums[slot] += probability
+            return self.play(state, actions[choice], betting, raises, traverser, buckets, scores)
+
+        values = [self.play(state, action, betting, raises, traverser, buckets, scores) for action in actions]
+        expected = sum(probability * value for probability, value in zip(strategy, values))
+        regrets = self.regrets.setdefault(key, [0.] * NUM_ACTIONS)
+        for slot, value in zip(slots, values):
+            regrets[slot] += value - expected
+        return expected
+
+    def play(self, state, slot_action, betting, raises, traverser, buckets, scores):
+        '''
+        Applies an abstract action and continues the traversal.
+        '''
+        slot, action = slot_action
+        following = state.proceed(action)
+        if isinstance(following, TerminalState):
+            delta = following.deltas[0] if isinstance(action, FoldAction) else showdown(following, scores)
+            return delta if traverser == 0 else -delta
+        betting += SLOT_CODES[slot]
+        raises += slot >= HALF_POT
+        if following.street != state.street:
+            betting += '/'
+            raises = 0
+        return self.traverse(following, betting, raises, traverser, buckets, scores)
+
+    def iterate(self, hands, board):
+        '''
+        Runs one iteration on a deal: a traversal for each player.
+        '''
+        board_scores = river_scores(cards_mask(board))
+        scores = [board_scores[combo_index(parse_cards(hand))] for hand in hands]
+        buckets = [street_buckets(hand, board) for hand in hands]
+        for traverser in (0, 1):
+            root = RoundState(0, 0, [SMALL_BLIND, BIG_BLIND], [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND],
+                              hands, board, None)
+            self.traverse(root, '', 0, traverser, buckets, scores)
+
+
+def showdown(terminal_state, scores):
+    '''
+    Returns player 0's payoff at showdown, as the engine computes it.
+    '''
+    stacks = terminal_state.previous_state.stacks
+    if scores[0] > scores[1]:
+        return STARTING_STACK - stacks[1]
+    if scores[0] < scores[1]:
+        return stacks[0] - STARTING_STACK
+    return 0
+
+
+def save_checkpoint(path, regrets, strategy, iterations):
+    '''
+    Writes the regret and strategy tables, row-aligned and sorted by key, to an .npz file.
+    '''
+    zero = [0.] * NUM_ACTIONS
+    keys = sorted(set(regrets) | set(strategy))
+    np.savez(path, keys=np.array(keys, dtype=np.uint64), iterations=iterations,
+             regrets=np.array([regrets.get(key, zero) for key in keys]).reshape(-1, NUM_ACTIONS),
+             strategy=np.array([strategy.get(key, zero) for key in keys]).reshape(-1, NUM_ACTIONS))
+
+
+def load_checkpoint(path):
+    '''
+    Returns (regrets, strategy, iterations) from a checkpoint, or empty tables if there is none.
+    '''
+    if not os.path.exists(path):
+        return {}, {}, 0
+    with np.load(path) as data:
+        keys = data['keys'].tolist()
+        # rows are stored for the union of both tables, so all-zero rows were never in this one
+        regrets = {key: row for key, row in zip(keys, data['regrets'].tolist()) if any(row)}
+        strategy = {key: row for key, row in zip(keys, data['strategy'].tolist()) if any(row)}
+        return regrets, strategy, int(data['iterations'])
+
+
+def work(task):
+    '''
+    Trains from the checkpoint for a number of iterations and returns the increments.
+    '''
+    checkpoint, iterations, seed = task
+    rng = random.Random(seed)
+    solver = Solver()
+    solver.rng = rng
+    solver.regrets, solver.strategy, _ = load_checkpoint(checkpoint)
+    start_regrets = {key: list(values) for key, values in solver.regrets.items()}
+    start_strategy = {key: list(values) for key, values in solver.strategy.items()}
+    start = time.perf_counter()
+    done = 0
+    while done < iterations:
+        # hands are dealt several times per board, so its river scores are computed once
+        board = rng.sample(CARD_CODES, 4)
+        rest = [card for card in CARD_CODES if card not in board]
+        for _ in range(min(DEALS_PER_BOARD, iterations - done)):
+            cards = rng.sample(rest, 6)
+            solver.iterate([cards[:3], cards[3:]], board)
+            done += 1
+    elapsed = time.perf_counter() - start
+    return increments(solver.regrets, start_regrets), increments(solver.strategy, start_strategy), done, elapsed
+
+
+def increments(table, start):
+    '''
+    Returns {key: table[key] - start[key]} for the keys that changed.
+    '''
+    zero = [0.] * NUM_ACTIONS
+    changed = {}
+    for key, values in table.items():
+        old = start.get(key, zero)
+        if values != old:
+            changed[key] = [value - previous for value, previous in zip(values, old)]
+    return changed
+
+
+def merge(table, delta):
+    '''
+    Adds increments from a worker into a table.
+    '''
+    for key, values in delta.items():
+        current = table.get(key)
+        if current is None:
+            table[key] = list(values)
+        else:
+            for slot in range(NUM_ACTIONS):
+                current[slot] += values[slot]
+
+
+def write_blueprint(path, strategy):
+    '''
+    Writes the normalized average strategy: keys, float32 probabilities per slot, and
+    how much reach-weighted play each information set had.
+    '''
+    keys = np.array(sorted(strategy), dtype=np.uint64)
+    sums = np.array([strategy[key] for key in keys.tolist()], dtype=np.float64).reshape(-1, NUM_ACTIONS)
+    totals = sums.sum(axis=1, keepdims=True)
+    probabilities = np.where(totals > 0., sums / np.where(totals > 0., totals, 1.), 1. / NUM_ACTIONS)
+    np.savez(path, keys=keys, probabilities=probabilities.astype(np.float32), visits=totals[:, 0])
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python train_cfr.py')
+    parser.add_argument('--iterations', type=int, default=1000000, help='Total iterations (deals) to train')
+    parser.add_argument('--round-iterations', type=int, default=2000, help='Iterations per worker between merges')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Worker processes to run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=str, default=os.path.join(ROOT, 'blueprint'), help='Checkpoint and blueprint directory')
+    parser.add_argument('--resume', action='store_true', help='Continue from the checkpoint in --out')
+    args = parser.parse_args()
+    if bucket_tables() is None:
+        parser.error('skeleton/buckets.npz is missing; run python gen_buckets.py first')
+
+    os.makedirs(args.out, exist_ok=True)
+    checkpoint = os.path.join(args.out, 'checkpoint.npz')
+    blueprint = os.path.join(args.out, 'blueprint.npz')
+    if not args.resume and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    regrets, strategy, iterations = load_checkpoint(checkpoint)
+
+    with multiprocessing.Pool(args.workers) as pool:
+        merge_round = 0
+        while iterations < args.iterations:
+            per_worker = min(args.round_iterations, -(-(args.iterations - iterations) // args.workers))
+            tasks = [(checkpoint, per_worker, args.seed * 1000003 + iterations + worker) for worker in range(args.workers)]
+            start = time.perf_counter()
+            worker_time = 0.
+            round_done = 0
+            for regret_delta, strategy_delta, done, elapsed in pool.imap_unordered(work, tasks):
+                merge(regrets, regret_delta)
+                merge(strategy, strategy_delta)
+                iterations += done
+                round_done += done
+                worker_time += elapsed
+            merge_round += 1
+            save_checkpoint(checkpoint, regrets, strategy, iterations)
+            write_blueprint(blueprint, strategy)
+            print('round {}: {} iterations, {} infosets, {:.0f} iterations/s per core, {:.0f}s wall'.format(
+                merge_round, iterations, len(regrets), round_done / worker_time, time.perf_counter() - start))
+    print('Wrote {} ({} bytes)'.format(blueprint, os.path.getsize(blueprint)))
+
+
+if __name__ == '__main__':
+    main()